@@ -0,0 +1,79 @@
+"""
+Compares the eviction policies of cache_results on a skewed (Zipfian)
+workload: hit rate and per-call overhead of a cached trivial function.
+
+Run from the repository root:
+    python benchmarks/bench_cache.py
+"""
+import itertools
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project.cache import (
+    CachePolicy,
+    LFUPolicy,
+    LRUPolicy,
+    SizePolicy,
+    TTLPolicy,
+    cache_results,
+    estimate_size,
+)
+
+KEY_SPACE = 10_000
+REQUESTS = 200_000
+CACHE_SIZE = 500
+ZIPF_EXPONENT = 1.1
+
+
+def zipf_keys(seed: int = 0) -> List[int]:
+    """Draws keys whose popularity follows Zipf's law."""
+    weights = [1 / rank**ZIPF_EXPONENT for rank in range(1, KEY_SPACE + 1)]
+    cum_weights = list(itertools.accumulate(weights))
+    rng = random.Random(seed)
+    keys = rng.choices(range(KEY_SPACE), cum_weights=cum_weights, k=REQUESTS)
+    # Shuffle the ranks, so that popular keys are not simply the small ones
+    permutation = list(range(KEY_SPACE))
+    rng.shuffle(permutation)
+    return [permutation[key] for key in keys]
+
+
+def policies() -> List[CachePolicy]:
+    return [
+        LRUPolicy(CACHE_SIZE),
+        LFUPolicy(CACHE_SIZE),
+        TTLPolicy(ttl=3600, max_size=CACHE_SIZE),
+        SizePolicy(max_bytes=CACHE_SIZE * estimate_size(0)),
+    ]
+
+
+def run(func: Callable[[int], int], keys: List[int]) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    keys = zipf_keys()
+    baseline = run(lambda x: x, keys)
+    print(f"{REQUESTS} requests over {KEY_SPACE} keys, cache size {CACHE_SIZE}")
+    print(f"{'policy':<14}{'hit rate':>10}{'ns/call':>10}")
+    for policy in policies():
+
+        @cache_results(policy=policy)
+        def identity(x: int) -> int:
+            return x
+
+        elapsed = run(identity, keys)
+        info = identity.cache_info()  # type: ignore[attr-defined]
+        hit_rate = info.hits / (info.hits + info.misses)
+        overhead = (elapsed - baseline) / REQUESTS * 1e9
+        print(f"{type(policy).__name__:<14}{hit_rate:>10.1%}{overhead:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
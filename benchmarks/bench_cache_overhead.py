@@ -0,0 +1,60 @@
+"""
+Measures the per-call overhead of cache_results on hits against
+functools.lru_cache, for several kinds of arguments.
+
+Run from the repository root:
+    python benchmarks/bench_cache_overhead.py
+"""
+import functools
+import os
+import sys
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project.cache import cache_results
+
+CALLS = 200_000
+
+# (name, positional args, keyword args); lru_cache cannot take the last one
+CASES: List[Tuple[str, Tuple[Any, ...], Dict[str, Any]]] = [
+    ("one int", (42,), {}),
+    ("three ints", (1, 2, 3), {}),
+    ("str + kwarg", ("key",), {"scale": 2}),
+    ("list of ints", ([1, 2, 3, 4],), {}),
+]
+
+
+def per_call(
+    func: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]
+) -> float:
+    func(*args, **kwargs)
+    elapsed = timeit.timeit(lambda: func(*args, **kwargs), number=CALLS)
+    return elapsed / CALLS * 1e9
+
+
+def main() -> None:
+    def target(*args: Any, **kwargs: Any) -> int:
+        return 0
+
+    baseline_func = target
+    contenders = {
+        "cache_results": cache_results()(target),
+        "thread_safe": cache_results(thread_safe=True)(target),
+        "lru_cache": functools.lru_cache(maxsize=None)(target),
+    }
+    print(f"hit overhead in ns/call over an uncached call, {CALLS} calls")
+    print(f"{'arguments':<16}" + "".join(f"{name:>16}" for name in contenders))
+    for case, args, kwargs in CASES:
+        baseline = per_call(baseline_func, args, kwargs)
+        row = f"{case:<16}"
+        for func in contenders.values():
+            try:
+                row += f"{per_call(func, args, kwargs) - baseline:>16.0f}"
+            except TypeError:
+                row += f"{'unhashable':>16}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Times the tiled operations on matrix files for several tile budgets and
+reports the peak memory they allocate, as seen by tracemalloc, next to the
+size of one matrix.
+
+Run from the repository root:
+    python benchmarks/bench_file_matrix.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project.file_matrix import FileMatrix, file_addition, file_multiply, file_transpose
+from project.matrix_operations import Matrix
+
+N = 768
+TILE_BUDGETS = [256 * 1024, 1024 * 1024, 4 * 1024 * 1024]
+
+
+def main() -> None:
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        a, b = (
+            FileMatrix.from_matrix(
+                os.path.join(directory, name),
+                Matrix(N, N, [rng.uniform(-1, 1) for _ in range(N * N)]),
+            )
+            for name in ("a.bin", "b.bin")
+        )
+        out = os.path.join(directory, "out.bin")
+        print(f"{N}x{N} matrices of {a.nbytes / 2**20:.1f} MiB")
+        print(f"{'budget MiB':>10}{'operation':>15}{'seconds':>10}{'peak MiB':>10}")
+        for tile_budget in TILE_BUDGETS:
+            for name, run in [
+                ("addition", lambda: file_addition(a, b, out, tile_budget)),
+                ("multiply", lambda: file_multiply(a, b, out, tile_budget)),
+                ("transpose", lambda: file_transpose(a, out, tile_budget)),
+            ]:
+                tracemalloc.start()
+                start = time.perf_counter()
+                run().close()
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(
+                    f"{tile_budget / 2**20:>10.2f}{name:>15}{elapsed:>10.3f}"
+                    f"{peak / 2**20:>10.2f}",
+                    flush=True,
+                )
+        a.close()
+        b.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares nested lists with the array-backed Matrix: memory of a large
+matrix and the time of addition, transposition and multiplication.
+
+Run from the repository root:
+    python benchmarks/bench_matrix.py
+"""
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project.matrix_operations import Matrix
+
+MEMORY_SIZE = 2000
+TIME_SIZE = 200
+
+
+def random_lists(n: int, seed: int = 0) -> List[List[float]]:
+    rng = random.Random(seed)
+    return [[rng.random() for _ in range(n)] for _ in range(n)]
+
+
+def list_bytes(rows: List[List[float]]) -> int:
+    return sys.getsizeof(rows) + sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(x) for x in row) for row in rows
+    )
+
+
+def timed(func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    rows = random_lists(MEMORY_SIZE)
+    lists_mb = list_bytes(rows) / 2**20
+    matrix_mb = sys.getsizeof(Matrix.from_lists(rows).data) / 2**20
+    print(f"{MEMORY_SIZE}x{MEMORY_SIZE}: lists {lists_mb:.1f} MiB, ", end="")
+    print(f"Matrix {matrix_mb:.1f} MiB ({lists_mb / matrix_mb:.1f}x less)")
+    del rows
+
+    a_rows, b_rows = random_lists(TIME_SIZE, 1), random_lists(TIME_SIZE, 2)
+    a, b = Matrix.from_lists(a_rows), Matrix.from_lists(b_rows)
+    cases = [
+        (
+            "add",
+            lambda: [[x + y for x, y in zip(r1, r2)] for r1, r2 in zip(a_rows, b_rows)],
+            lambda: a + b,
+        ),
+        ("transpose", lambda: list(map(list, zip(*a_rows))), lambda: a.T),
+        (
+            "multiply",
+            lambda: [
+                [sum(x * y for x, y in zip(row, col)) for col in zip(*b_rows)]
+                for row in a_rows
+            ],
+            lambda: a @ b,
+        ),
+    ]
+    print(f"{TIME_SIZE}x{TIME_SIZE}, ms")
+    print(f"{'operation':<12}{'lists':>10}{'Matrix':>10}")
+    for name, with_lists, with_matrix in cases:
+        print(
+            f"{name:<12}{timed(with_lists) * 1e3:>10.2f}{timed(with_matrix) * 1e3:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
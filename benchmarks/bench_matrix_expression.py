@@ -0,0 +1,55 @@
+"""
+Compares eager chains of Matrix operations with the same expressions
+evaluated lazily into a preallocated output: time and peak extra memory
+as seen by tracemalloc.
+
+Run from the repository root:
+    python benchmarks/bench_matrix_expression.py
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project.matrix_expression import lazy
+from project.matrix_operations import Matrix, multiply
+
+SIZES = [128, 256, 512]
+
+
+def random_matrix(n: int, seed: int) -> Matrix:
+    rng = random.Random(seed)
+    return Matrix(n, n, [rng.uniform(-1, 1) for _ in range(n * n)])
+
+
+def measure(run: Callable[[], object]) -> Tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    print("seconds and peak extra MiB of a @ b.T + 2 * c - d @ a")
+    print(f"{'n':>5}{'eager':>10}{'MiB':>8}{'lazy':>10}{'MiB':>8}")
+    for n in SIZES:
+        a, b, c, d = (random_matrix(n, seed) for seed in range(4))
+        out = Matrix(n, n)
+        eager = measure(lambda: multiply(a, b.T) + c * 2 - multiply(d, a))
+        expr = lazy(a) @ b.T + c * 2 - lazy(d) @ a
+        fused = measure(lambda: expr.evaluate(out=out))
+        print(
+            f"{n:>5}{eager[0]:>10.4f}{eager[1] / 2**20:>8.2f}"
+            f"{fused[0]:>10.4f}{fused[1] / 2**20:>8.2f}",
+            flush=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
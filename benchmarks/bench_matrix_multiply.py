@@ -0,0 +1,84 @@
+"""
+Compares the backends of matrix multiplication on square matrices of
+sizes 64 to 2048: the original nested-list implementation, the blocked
+pure-Python kernel and NumPy. Pure-Python backends take minutes above
+PURE_PYTHON_LIMIT, so they are skipped there. Every result is checked
+against NumPy (or the blocked kernel, if NumPy is not installed).
+
+Run from the repository root:
+    python benchmarks/bench_matrix_multiply.py
+"""
+import math
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project.matrix_operations import Matrix, multiply, numpy
+
+SIZES = [64, 128, 256, 512, 1024, 2048]
+PURE_PYTHON_LIMIT = 512
+
+
+def list_multiply(m1: List[List[float]], m2: List[List[float]]) -> List[List[float]]:
+    """matrix_multiply before the Matrix type."""
+    return [[sum(x * y for x, y in zip(row, col)) for col in zip(*m2)] for row in m1]
+
+
+def random_matrix(n: int, seed: int) -> Matrix:
+    rng = random.Random(seed)
+    return Matrix(n, n, [rng.uniform(-1, 1) for _ in range(n * n)])
+
+
+def max_error(result: Matrix, expected: Matrix) -> float:
+    return max(
+        (
+            abs(x - y)
+            for i in range(result.rows)
+            for x, y in zip(result.row(i), expected.row(i))
+        ),
+        default=0.0,
+    )
+
+
+def main() -> None:
+    backends: Dict[str, Callable[[Matrix, Matrix], Matrix]] = {
+        "lists": lambda a, b: Matrix.from_lists(
+            list_multiply(a.to_lists(), b.to_lists())
+        ),
+        "blocked": lambda a, b: multiply(a, b, "blocked"),
+    }
+    if numpy is not None:
+        backends["numpy"] = lambda a, b: multiply(a, b, "numpy")
+    print("seconds per product; max abs error vs the reference in brackets")
+    print(f"{'n':>6}" + "".join(f"{name:>22}" for name in backends))
+    for n in SIZES:
+        a, b = random_matrix(n, 1), random_matrix(n, 2)
+        results = {}
+        cells = []
+        for name, backend in backends.items():
+            if name != "numpy" and n > PURE_PYTHON_LIMIT:
+                cells.append(f"{'skipped':>22}")
+                continue
+            start = time.perf_counter()
+            results[name] = backend(a, b)
+            cells.append(time.perf_counter() - start)
+        reference = results.get("numpy") or results["blocked"]
+        row = f"{n:>6}"
+        for name, cell in zip(backends, cells):
+            if isinstance(cell, str):
+                row += cell
+            else:
+                error = max_error(results[name], reference)
+                row += f"{cell:>12.4f} [{error:.0e}]".rjust(22)
+        print(row, flush=True)
+        assert all(
+            math.isclose(max_error(result, reference), 0.0, abs_tol=1e-9 * n)
+            for result in results.values()
+        )
+
+
+if __name__ == "__main__":
+    main()
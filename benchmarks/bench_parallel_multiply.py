@@ -0,0 +1,55 @@
+"""
+Measures how parallel_multiply scales with the number of processes:
+speedup over one process and parallel efficiency (speedup / processes),
+for the pure-Python blocked kernel and for NumPy. NumPy's BLAS may
+already use several threads, so expect little from processes there.
+
+Run from the repository root:
+    python benchmarks/bench_parallel_multiply.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project.matrix_operations import Matrix, numpy, parallel_multiply
+from project.thread_pool import ProcessPool
+
+SIZES = {"blocked": 256, "numpy": 2048}
+
+
+def random_matrix(n: int, seed: int) -> Matrix:
+    rng = random.Random(seed)
+    return Matrix(n, n, [rng.uniform(-1, 1) for _ in range(n * n)])
+
+
+def main() -> None:
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, cpus} & set(range(1, max(cpus, 2) + 1)))
+    backends = ["blocked"] + (["numpy"] if numpy is not None else [])
+    print(f"{cpus} CPUs")
+    for backend in backends:
+        n = SIZES[backend]
+        a, b = random_matrix(n, 1), random_matrix(n, 2)
+        print(f"{backend}, n={n}")
+        print(f"{'processes':>10}{'seconds':>10}{'speedup':>10}{'efficiency':>12}")
+        single = None
+        for count in counts:
+            with ProcessPool(count) as pool:
+                # Warm up the workers, e.g. the import of NumPy
+                parallel_multiply(
+                    Matrix(1, 1), Matrix(1, 1), pool=pool, backend=backend
+                )
+                start = time.perf_counter()
+                parallel_multiply(a, b, pool=pool, backend=backend)
+                elapsed = time.perf_counter() - start
+            single = single or elapsed
+            speedup = single / elapsed
+            print(
+                f"{count:>10}{elapsed:>10.3f}{speedup:>10.2f}{speedup / count:>12.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
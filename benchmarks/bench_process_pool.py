@@ -0,0 +1,52 @@
+"""
+Compares how CPU-bound work scales with the number of workers in
+ThreadPool (limited by the GIL) and ProcessPool.
+
+Run from the repository root:
+    python benchmarks/bench_process_pool.py
+"""
+import os
+import sys
+import time
+from typing import Any, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project.thread_pool import ProcessPool, ThreadPool
+
+NUM_TASKS = 64
+TASK_SIZE = 200_000
+
+
+def cpu_bound(n: int) -> int:
+    """A pure-Python loop that holds the GIL for its whole duration."""
+    total = 0
+    for i in range(n):
+        total += i * i % 7
+    return total
+
+
+def measure(pool: Any) -> float:
+    start = time.perf_counter()
+    results: List[int] = list(pool.map(cpu_bound, [TASK_SIZE] * NUM_TASKS))
+    elapsed = time.perf_counter() - start
+    assert len(results) == NUM_TASKS
+    pool.dispose()
+    return elapsed
+
+
+def main() -> None:
+    cores = os.cpu_count() or 1
+    workers = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+    print(f"{NUM_TASKS} tasks of {TASK_SIZE} iterations, {cores} cores")
+    print(f"{'workers':>8}{'threads, s':>12}{'processes, s':>14}{'speedup':>10}")
+    base = None
+    for count in workers:
+        threads = measure(ThreadPool(num_threads=count))
+        processes = measure(ProcessPool(num_processes=count))
+        if base is None:
+            base = processes
+        print(f"{count:>8}{threads:>12.2f}{processes:>14.2f}{base / processes:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
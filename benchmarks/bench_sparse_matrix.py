@@ -0,0 +1,64 @@
+"""
+Compares CSRMatrix with the dense Matrix at several densities: memory,
+addition, transposition and multiplication. The sparse times grow with
+the number of nonzeros; the dense ones do not depend on the density.
+
+Run from the repository root:
+    python benchmarks/bench_sparse_matrix.py
+"""
+import os
+import random
+import sys
+import time
+from typing import Callable, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project.matrix_operations import Matrix, numpy
+from project.sparse_matrix import CSRMatrix, COOMatrix
+
+SIZE = 1000
+DENSITIES = [0.001, 0.005, 0.01, 0.05]
+
+
+def random_coo(n: int, density: float, seed: int) -> COOMatrix:
+    rng = random.Random(seed)
+    count = int(n * n * density)
+    return COOMatrix(
+        n,
+        n,
+        [rng.randrange(n) for _ in range(count)],
+        [rng.randrange(n) for _ in range(count)],
+        [rng.uniform(-1, 1) for _ in range(count)],
+    )
+
+
+def timed(func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def pair(sparse: float, dense: float) -> str:
+    return f"{sparse * 1e3:>9.1f} /{dense * 1e3:>9.1f}"
+
+
+def main() -> None:
+    dense_backend = "numpy" if numpy is not None else "blocked"
+    print(f"{SIZE}x{SIZE}, ms sparse / dense (dense multiply: {dense_backend})")
+    print(
+        f"{'density':>8}{'nnz':>8}{'MiB':>16}{'add':>21}{'transpose':>21}{'multiply':>21}"
+    )
+    for density in DENSITIES:
+        a = random_coo(SIZE, density, 1).to_csr()
+        b = random_coo(SIZE, density, 2).to_csr()
+        da, db = a.to_dense(), b.to_dense()
+        memory: Tuple[float, float] = (a.nbytes / 2**20, da.nbytes / 2**20)
+        row = f"{density:>8.1%}{a.nnz:>8}{memory[0]:>7.2f} /{memory[1]:>7.2f}"
+        row += pair(timed(lambda: a + b), timed(lambda: da + db)).rjust(21)
+        row += pair(timed(lambda: a.T), timed(lambda: da.T.copy())).rjust(21)
+        row += pair(timed(lambda: a @ b), timed(lambda: da @ db)).rjust(21)
+        print(row, flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Finds the size where strassen_multiply starts beating the blocked
+pure-Python kernel, for several crossover settings, and reports the
+error of both against NumPy.
+
+Run from the repository root:
+    python benchmarks/bench_strassen.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project.matrix_operations import Matrix, multiply, numpy, strassen_multiply
+
+SIZES = [64, 128, 192, 256, 384, 512]
+CROSSOVERS = [32, 64, 128]
+
+
+def random_matrix(n: int, seed: int) -> Matrix:
+    rng = random.Random(seed)
+    return Matrix(n, n, [rng.uniform(-1, 1) for _ in range(n * n)])
+
+
+def max_error(result: Matrix, expected: Matrix) -> float:
+    return max(
+        abs(x - y)
+        for i in range(result.rows)
+        for x, y in zip(result.row(i), expected.row(i))
+    )
+
+
+def main() -> None:
+    print("seconds per product, speedup over blocked in brackets")
+    header = f"{'n':>5}{'blocked':>10}"
+    header += "".join(f"{f'strassen/{c}':>20}" for c in CROSSOVERS)
+    print(
+        header
+        + (f"{'error blocked':>15}{f'error s/{CROSSOVERS[-1]}':>16}" if numpy else "")
+    )
+    for n in SIZES:
+        a, b = random_matrix(n, 1), random_matrix(n, 2)
+        start = time.perf_counter()
+        blocked = multiply(a, b, "blocked")
+        baseline = time.perf_counter() - start
+        row = f"{n:>5}{baseline:>10.3f}"
+        strassen = blocked
+        for crossover in CROSSOVERS:
+            start = time.perf_counter()
+            strassen = strassen_multiply(a, b, crossover)
+            elapsed = time.perf_counter() - start
+            row += f"{elapsed:>10.3f} [{baseline / elapsed:.2f}x]".rjust(20)
+        if numpy is not None:
+            exact = multiply(a, b, "numpy")
+            row += (
+                f"{max_error(blocked, exact):>15.1e}{max_error(strassen, exact):>16.1e}"
+            )
+        print(row, flush=True)
+
+
+if __name__ == "__main__":
+    main()
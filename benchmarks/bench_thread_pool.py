@@ -0,0 +1,107 @@
+"""
+Compares the single shared queue of ThreadPool with the work-stealing mode
+on tiny tasks: throughput and acquisitions of the pool lock per second.
+
+Run from the repository root:
+    python benchmarks/bench_thread_pool.py
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+from typing import Any, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project.thread_pool import ThreadPool
+
+NUM_THREADS = 32
+NUM_TASKS = 200_000
+FANOUT_DEPTH = 16
+
+
+class CountingLock:
+    """A lock that counts successful acquisitions."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self.acquisitions += 1
+        return acquired
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *args: Any) -> None:
+        self.release()
+
+
+class CountingThreadPool(ThreadPool):
+    def _make_lock(self) -> Any:
+        return CountingLock()
+
+
+def run_flat(pool: ThreadPool) -> int:
+    """Enqueues tiny tasks from the main thread."""
+    done = threading.Event()
+    counter = itertools.count(1)
+
+    def task() -> None:
+        if next(counter) == NUM_TASKS:
+            done.set()
+
+    for _ in range(NUM_TASKS):
+        pool.enqueue(task)
+    done.wait()
+    return NUM_TASKS
+
+
+def run_fanout(pool: ThreadPool) -> int:
+    """Every task spawns two children until a binary tree of tasks is done."""
+    total = 2 ** (FANOUT_DEPTH + 1) - 1
+    done = threading.Event()
+    counter = itertools.count(1)
+
+    def task(depth: int) -> None:
+        if depth < FANOUT_DEPTH:
+            pool.enqueue(lambda: task(depth + 1))
+            pool.enqueue(lambda: task(depth + 1))
+        if next(counter) == total:
+            done.set()
+
+    pool.enqueue(lambda: task(0))
+    done.wait()
+    return total
+
+
+def measure(work_stealing: bool, workload: Any) -> Tuple[float, float]:
+    pool = CountingThreadPool(num_threads=NUM_THREADS, work_stealing=work_stealing)
+    lock = pool.lock
+    start_acquisitions = lock.acquisitions
+    start = time.perf_counter()
+    tasks = workload(pool)
+    elapsed = time.perf_counter() - start
+    acquisitions = lock.acquisitions - start_acquisitions
+    pool.dispose()
+    return tasks / elapsed, acquisitions / elapsed
+
+
+def main() -> None:
+    print(f"{NUM_THREADS} threads")
+    print(f"{'workload':<10}{'mode':<16}{'tasks/s':>14}{'lock acq/s':>14}")
+    for name, workload in (("flat", run_flat), ("fan-out", run_fanout)):
+        for work_stealing in (False, True):
+            mode = "work-stealing" if work_stealing else "shared queue"
+            throughput, lock_rate = measure(work_stealing, workload)
+            print(f"{name:<10}{mode:<16}{throughput:>14,.0f}{lock_rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compares per-pair calls of scalar_multiply, vector_length and
+angle_vectors with the batch functions, against one query vector and
+pairwise, with NumPy and with the pure-Python fallback.
+
+Run from the repository root:
+    python benchmarks/bench_vector_operations.py
+"""
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project import vector_operations
+from project.vector_operations import (
+    angle_vectors,
+    batch_angle_vectors,
+    batch_scalar_multiply,
+    batch_vector_length,
+    scalar_multiply,
+    vector_length,
+)
+
+COUNT = 20000
+DIMS = [8, 64, 256]
+
+
+def random_vectors(count: int, dim: int, seed: int) -> List[List[float]]:
+    rng = random.Random(seed)
+    return [[rng.uniform(-1, 1) for _ in range(dim)] for _ in range(count)]
+
+
+def timed(func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    numpy = vector_operations.numpy
+    backends = ["pure python"]
+    if numpy is not None:
+        backends += ["numpy", "numpy arrays"]
+    print(f"seconds for {COUNT} vectors, speedup of batches in brackets")
+    print(
+        f"{'dim':>5}{'operation':>14}{'per pair':>10}"
+        + "".join(f"{name:>20}" for name in backends)
+    )
+    for dim in DIMS:
+        vectors, others = random_vectors(COUNT, dim, 1), random_vectors(COUNT, dim, 2)
+        query = others[0]
+        cases = [
+            (
+                "dot query",
+                lambda: [scalar_multiply(v, query) for v in vectors],
+                batch_scalar_multiply,
+                (vectors, query),
+            ),
+            (
+                "length",
+                lambda: [vector_length(v) for v in vectors],
+                batch_vector_length,
+                (vectors,),
+            ),
+            (
+                "angle query",
+                lambda: [angle_vectors(v, query) for v in vectors],
+                batch_angle_vectors,
+                (vectors, query),
+            ),
+            (
+                "angle pairs",
+                lambda: [angle_vectors(v, w) for v, w in zip(vectors, others)],
+                batch_angle_vectors,
+                (vectors, others),
+            ),
+        ]
+        for name, per_pair, batch, args in cases:
+            baseline = timed(per_pair)
+            row = f"{dim:>5}{name:>14}{baseline:>10.4f}"
+            for backend in backends:
+                vector_operations.numpy = None if backend == "pure python" else numpy
+                if backend == "numpy arrays":
+                    # Vectors that are already stored in NumPy arrays
+                    args = tuple(numpy.asarray(arg) for arg in args)
+                elapsed = timed(lambda: batch(*args))
+                row += f"{elapsed:>10.4f} [{baseline / elapsed:.1f}x]".rjust(20)
+            vector_operations.numpy = numpy
+            print(row, flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,625 @@
+import asyncio
+import hashlib
+import inspect
+import marshal
+import pickle
+import random
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
 from collections import OrderedDict
 from functools import wraps
-from typing import Callable, Any, Dict, Tuple, Optional
+from typing import (
+    Callable,
+    Any,
+    Dict,
+    Hashable,
+    List,
+    NamedTuple,
+    Tuple,
+    Optional,
+    Union,
+)
+
+
+class CacheInfo(NamedTuple):
+    """Statistics of a function wrapped with cache_results."""
+
+    hits: int
+    misses: int
+    evictions: int
+    max_size: int
+    current_size: int
+    disk_hits: int = 0
+    compute_time: float = 0.0
+
+    @property
+    def time_saved(self) -> float:
+        """Estimated seconds saved by hits, at the mean cost of a miss."""
+        return self.hits * self.compute_time / self.misses if self.misses else 0.0
+
+    def __add__(self, other: Tuple[Any, ...]) -> "CacheInfo":  # type: ignore[override]
+        """Sums the statistics of two functions."""
+        if not isinstance(other, CacheInfo):
+            return NotImplemented
+        return CacheInfo._make(mine + theirs for mine, theirs in zip(self, other))
+
+
+class CacheEvent(NamedTuple):
+    """A hit or miss of a cached function, passed to the hook of cache_results."""
+
+    name: str
+    # "hit", "disk_hit" or "miss"
+    kind: str
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+    # Seconds spent computing the result of a miss, 0 otherwise
+    duration: float
+
+
+class CachePolicy(ABC):
+    """
+    Storage and eviction strategy used by cache_results.
+
+    A policy owns the cached entries. ``get`` raises KeyError for a missing
+    entry, and ``put`` stores an entry, evicting others if the policy is full,
+    and returns the number of evicted entries. ``max_size`` is the maximum
+    number of entries, 0 meaning no limit on the count.
+    """
+
+    max_size = 0
+
+    @abstractmethod
+    def get(self, key: Any) -> Any:
+        """Returns the value of an entry, or raises KeyError."""
+
+    @abstractmethod
+    def put(self, key: Any, value: Any) -> int:
+        """Stores an entry and returns the number of evicted entries."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Removes all the entries."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """The number of entries."""
+
+    @abstractmethod
+    def clone(self) -> "CachePolicy":
+        """Returns an empty policy with the same settings."""
+
+
+class LRUPolicy(CachePolicy):
+    """Evicts the least recently used entry."""
+
+    def __init__(self, max_size: int = 0) -> None:
+        if max_size < 0:
+            raise ValueError("max_size must not be negative.")
+        self.max_size = max_size
+        self._entries: OrderedDict[Any, Any] = OrderedDict()
+
+    def get(self, key: Any) -> Any:
+        value = self._entries[key]
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any) -> int:
+        entries = self._entries
+        evicted = 0
+        # A recursive call may have stored the key in the meantime
+        if key not in entries and 0 < self.max_size <= len(entries):
+            entries.popitem(last=False)
+            evicted = 1
+        entries[key] = value
+        entries.move_to_end(key)
+        return evicted
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clone(self) -> "LRUPolicy":
+        return LRUPolicy(self.max_size)
+
+
+class LFUPolicy(CachePolicy):
+    """
+    Evicts the least frequently used entry, the least recently used one among
+    equally frequent entries. Entries are kept in buckets by use count, so
+    every operation is O(1).
+    """
+
+    def __init__(self, max_size: int) -> None:
+        if max_size <= 0:
+            raise ValueError("max_size must be positive.")
+        self.max_size = max_size
+        self._entries: Dict[Any, Tuple[Any, int]] = {}
+        self._buckets: Dict[int, OrderedDict[Any, None]] = {}
+        self._min_count = 0
+
+    def _touch(self, key: Any, value: Any, count: int) -> None:
+        """Moves an entry from the bucket of ``count`` to the next one."""
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+            if self._min_count == count:
+                self._min_count = count + 1
+        self._buckets.setdefault(count + 1, OrderedDict())[key] = None
+        self._entries[key] = (value, count + 1)
+
+    def get(self, key: Any) -> Any:
+        value, count = self._entries[key]
+        self._touch(key, value, count)
+        return value
+
+    def put(self, key: Any, value: Any) -> int:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._touch(key, value, entry[1])
+            return 0
+        evicted = 0
+        if len(self._entries) >= self.max_size:
+            bucket = self._buckets[self._min_count]
+            victim, _ = bucket.popitem(last=False)
+            if not bucket:
+                del self._buckets[self._min_count]
+            del self._entries[victim]
+            evicted = 1
+        self._entries[key] = (value, 1)
+        self._buckets.setdefault(1, OrderedDict())[key] = None
+        self._min_count = 1
+        return evicted
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._buckets.clear()
+        self._min_count = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clone(self) -> "LFUPolicy":
+        return LFUPolicy(self.max_size)
+
+
+class TTLPolicy(CachePolicy):
+    """
+    Drops entries ``ttl`` seconds after they were stored. If ``max_size`` is
+    reached, the entry that would expire first is evicted. Expired entries are
+    removed lazily on access and on insertion, so no timer thread is needed.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_size: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if ttl <= 0:
+            raise ValueError("ttl must be positive.")
+        if max_size < 0:
+            raise ValueError("max_size must not be negative.")
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        # Insertion order equals expiry order, since the ttl is the same
+        self._entries: OrderedDict[Any, Tuple[Any, float]] = OrderedDict()
+
+    def get(self, key: Any) -> Any:
+        value, expires_at = self._entries[key]
+        if self._clock() >= expires_at:
+            del self._entries[key]
+            raise KeyError(key)
+        return value
+
+    def put(self, key: Any, value: Any) -> int:
+        entries = self._entries
+        now = self._clock()
+        evicted = 0
+        for _, expires_at in entries.values():
+            if expires_at > now:
+                break
+            evicted += 1
+        for _ in range(evicted):
+            entries.popitem(last=False)
+        entries.pop(key, None)
+        if 0 < self.max_size <= len(entries):
+            entries.popitem(last=False)
+            evicted += 1
+        entries[key] = (value, now + self.ttl)
+        return evicted
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clone(self) -> "TTLPolicy":
+        return TTLPolicy(self.ttl, self.max_size, self._clock)
+
+
+def estimate_size(obj: Any) -> int:
+    """
+    Estimates the memory taken by an object in bytes, following the items of
+    lists, tuples, sets and dicts, e.g. the rows of a matrix. The data of
+    objects supporting the buffer protocol, such as arrays, and of objects
+    with an ``nbytes`` attribute, such as Matrix, is counted as well.
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in obj)
+    else:
+        try:
+            with memoryview(obj) as view:
+                # The size of an object owning its buffer already includes it
+                return max(size, view.nbytes)
+        except TypeError:
+            nbytes = getattr(obj, "nbytes", None)
+            if isinstance(nbytes, int):
+                size += nbytes
+    return size
+
+
+class SizePolicy(CachePolicy):
+    """
+    Keeps the estimated size of the cached results within ``max_bytes`` by
+    evicting the least recently used entries. Results larger than the whole
+    budget are not stored.
+    """
+
+    def __init__(
+        self, max_bytes: int, sizeof: Callable[[Any], int] = estimate_size
+    ) -> None:
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive.")
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._sizeof = sizeof
+        self._entries: OrderedDict[Any, Tuple[Any, int]] = OrderedDict()
+
+    def get(self, key: Any) -> Any:
+        value, _ = self._entries[key]
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any) -> int:
+        entries = self._entries
+        size = self._sizeof(value)
+        old = entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old[1]
+        if size > self.max_bytes:
+            return 0
+        evicted = 0
+        while entries and self.current_bytes + size > self.max_bytes:
+            _, (_, victim_size) = entries.popitem(last=False)
+            self.current_bytes -= victim_size
+            evicted += 1
+        entries[key] = (value, size)
+        self.current_bytes += size
+        return evicted
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clone(self) -> "SizePolicy":
+        return SizePolicy(self.max_bytes, self._sizeof)
+
+
+class _Marker:
+    """A unique object separating the parts of a cache key."""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"<{self.name}>"
+
+
+_LIST = _Marker("list")
+_DICT = _Marker("dict")
+_SET = _Marker("set")
+_KWARGS = _Marker("kwargs")
+
+_ATOMIC_TYPES = frozenset((int, float, str, bytes, bool, type(None)))
 
 
 def make_hashable(obj: Any) -> Any:
-    """Converts a non-hashed object to a hashed one."""
-    if isinstance(obj, (list, dict, set)):
+    """
+    Converts a non-hashed object to a hashed one. Lists, dicts and sets are
+    tagged with their kind, so that e.g. [1, 2] and (1, 2) stay different.
+    """
+    if type(obj) in _ATOMIC_TYPES:
+        return obj
+    if isinstance(obj, list):
+        return (_LIST, tuple([make_hashable(i) for i in obj]))
+    if isinstance(obj, tuple):
+        return tuple([make_hashable(i) for i in obj])
+    if isinstance(obj, dict):
         return (
-            frozenset((make_hashable(k), make_hashable(v)) for k, v in obj.items())
-            if isinstance(obj, dict)
-            else tuple(make_hashable(i) for i in obj)
+            _DICT,
+            frozenset([(make_hashable(k), make_hashable(v)) for k, v in obj.items()]),
         )
+    if isinstance(obj, set):
+        return (_SET, frozenset(obj))
     return obj
 
 
+def _make_key(args: Tuple[Any, ...], kwargs: Dict[str, Any], typed: bool) -> Any:
+    """
+    Builds the cache key of a call: a tuple of the arguments, where only
+    calls with unhashable arguments go through make_hashable. A single
+    atomic argument skips the checks, and its key is the ``args`` tuple
+    itself, the same key as on the slow path. Keyword arguments are sorted
+    by name, so their order does not matter.
+    """
+    if not kwargs and not typed and len(args) == 1 and type(args[0]) in _ATOMIC_TYPES:
+        return args
+    items = args
+    if kwargs:
+        items += (_KWARGS,) + tuple(sorted(kwargs.items()))
+    if typed:
+        items += tuple([type(arg) for arg in args])
+        if kwargs:
+            items += tuple([type(value) for _, value in sorted(kwargs.items())])
+    try:
+        hash(items)
+    except TypeError:
+        return make_hashable(items)
+    return items
+
+
+def _encode_key(obj: Any, out: List[str]) -> None:
+    """
+    Writes a canonical text form of a cache key, which, unlike hash(),
+    does not change between runs. Raises TypeError for unsupported objects.
+    """
+    kind = type(obj)
+    if kind in _ATOMIC_TYPES:
+        out.append(f"{kind.__name__}:{obj!r}")
+    elif kind is tuple:
+        out.append("(")
+        for item in obj:
+            _encode_key(item, out)
+            out.append(",")
+        out.append(")")
+    elif kind is frozenset:
+        items = []
+        for item in obj:
+            encoded: List[str] = []
+            _encode_key(item, encoded)
+            items.append("".join(encoded))
+        out.append("{" + ",".join(sorted(items)) + "}")
+    elif kind is _Marker:
+        out.append(repr(obj))
+    elif kind is type:
+        out.append(f"type:{obj.__module__}.{obj.__qualname__}")
+    else:
+        raise TypeError(f"Cannot persist a key containing {kind.__name__}")
+
+
+def _stable_hash(key: Any) -> Optional[str]:
+    """Returns a hash of a cache key that is the same in every process, if any."""
+    out: List[str] = []
+    try:
+        _encode_key(key, out)
+    except TypeError:
+        return None
+    return hashlib.sha256("".join(out).encode()).hexdigest()
+
+
+def _source_hash(func: Callable[..., Any]) -> str:
+    """Hashes the source of a function, or its bytecode if there is no source."""
+    try:
+        source = inspect.getsource(func).encode()
+    except (OSError, TypeError):
+        source = marshal.dumps(func.__code__)
+    return hashlib.sha256(source).hexdigest()
+
+
+class DiskStore:
+    """
+    A persistent second tier for cache_results, kept in an sqlite database.
+
+    Entries are stored per function, under a stable hash of the call's key,
+    together with a version of the function (a hash of its source code).
+    Entries written by another version are never returned, so changing
+    a function invalidates its stored results. One store may be shared by
+    any number of functions and threads. Values are pickled; a key that
+    cannot be hashed stably or a value that cannot be pickled is simply
+    not stored.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (name TEXT, key TEXT, version TEXT,"
+            " value BLOB, PRIMARY KEY (name, key))"
+        )
+
+    def get(self, name: str, version: str, key: str) -> Any:
+        """Returns a stored value, raising KeyError if there is none."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM entries WHERE name = ? AND key = ? AND version = ?",
+                (name, key, version),
+            ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return pickle.loads(row[0])
+
+    def put(self, name: str, version: str, key: str, value: Any) -> bool:
+        """Stores a value and returns whether it could be pickled."""
+        try:
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return False
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (name, key, version, data),
+            )
+        return True
+
+    def invalidate(self, name: str, version: str) -> int:
+        """Deletes the entries of other versions of a function."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM entries WHERE name = ? AND version != ?", (name, version)
+            )
+        return cursor.rowcount
+
+    def clear(self, name: Optional[str] = None) -> None:
+        """Deletes the entries of one function, or all of them."""
+        with self._lock:
+            if name is None:
+                self._db.execute("DELETE FROM entries")
+            else:
+                self._db.execute("DELETE FROM entries WHERE name = ?", (name,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class _Flight:
+    """A computation in progress that concurrent callers wait for."""
+
+    __slots__ = ("owner", "done", "result", "error")
+
+    def __init__(self) -> None:
+        self.owner = threading.get_ident()
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self) -> Any:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class _CacheState:
+    """
+    The entries, in-flight computations and statistics of a cached function.
+    In thread-safe mode ``lock`` guards all of them.
+    """
+
+    __slots__ = (
+        "policy",
+        "lock",
+        "in_flight",
+        "hits",
+        "misses",
+        "evictions",
+        "disk_hits",
+        "compute_time",
+    )
+
+    def __init__(self, policy: CachePolicy) -> None:
+        self.policy = policy
+        self.lock = threading.Lock()
+        # _Flight objects, or asyncio tasks for coroutine functions
+        self.in_flight: Dict[Any, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self.compute_time = 0.0
+
+    def store(self, key: Any, value: Any, from_disk: bool, elapsed: float) -> None:
+        """Counts a computed or loaded value and puts it into memory."""
+        if from_disk:
+            self.hits += 1
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            self.compute_time += elapsed
+        self.evictions += self.policy.put(key, value)
+
+
+def _print_event(event: CacheEvent) -> None:
+    """The hook behind verbose=True."""
+    if event.kind == "miss":
+        print(f"Cache miss: {event.args}, kwargs: {event.kwargs} - calculating")
+    else:
+        print(f"Cache hit for args: {event.args}, kwargs: {event.kwargs}")
+
+
+def _make_emitter(
+    name: str,
+    verbose: bool,
+    hook: Optional[Callable[[CacheEvent], None]],
+    sample_rate: float,
+) -> Optional[Callable[[str, Any, Any, float], None]]:
+    """Returns the function reporting the events of a cache, if anyone listens."""
+    if not verbose and hook is None:
+        return None
+
+    def emit(kind: str, args: Any, kwargs: Any, duration: float) -> None:
+        event = CacheEvent(name, kind, args, kwargs, duration)
+        if verbose:
+            _print_event(event)
+        if hook is not None and (sample_rate == 1.0 or random.random() < sample_rate):
+            hook(event)
+
+    return emit
+
+
+# Every function wrapped by cache_results, for cache_stats
+_cached_functions: "weakref.WeakSet[Callable[..., Any]]" = weakref.WeakSet()
+
+
+def cache_stats() -> Dict[str, CacheInfo]:
+    """
+    Collects the statistics of all live functions wrapped with cache_results
+    in the process, by module and qualified name. Functions with the same
+    name, e.g. closures created by one factory, are summed together.
+    """
+    stats: Dict[str, CacheInfo] = {}
+    for func in list(_cached_functions):
+        name = f"{func.__module__}.{func.__qualname__}"
+        info = func.cache_info()  # type: ignore[attr-defined]
+        stats[name] = stats[name] + info if name in stats else info
+    return stats
+
+
 def cache_results(
     max_size: int = 0,
     verbose: bool = False,
+    policy: Optional[CachePolicy] = None,
+    thread_safe: bool = False,
+    key: Optional[Callable[..., Hashable]] = None,
+    typed: bool = False,
+    disk: Union[str, DiskStore, None] = None,
+    hook: Optional[Callable[[CacheEvent], None]] = None,
+    sample_rate: float = 1.0,
+    timed: bool = False,
 ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
     """
     Decorator for caching the results of a function based on its input arguments.
@@ -27,38 +630,282 @@ def cache_results(
         The maximum number of results to cache. If set to 0 (default),
         caching is unlimited. If the cache reaches this size,
         the least recently used item will be removed to make space
-        for the new result.
+        for the new result. Every cache hit marks the item as recently used.
     verbose : bool, optional
-        If True, print cache hit/miss messages. Default is False.
+        If True, print cache hit/miss messages. Meant for debugging;
+        use ``hook`` to monitor a cache under load. Default is False.
+    policy : CachePolicy, optional
+        The eviction policy, e.g. LFUPolicy, TTLPolicy or SizePolicy,
+        used instead of the default LRUPolicy(max_size). Every decorated
+        function gets its own empty copy of the policy.
+    thread_safe : bool, optional
+        If True, the wrapper may be called from several threads at once.
+        Concurrent misses for the same arguments are computed only once:
+        the first caller runs the function and the others wait for its
+        result (or exception), which counts as a hit. Default is False.
+        Coroutine functions are always deduplicated this way, see below.
+        One lock guards the cache; it is held only to look up and store
+        entries, never while the function runs.
+    key : callable, optional
+        Called with the arguments of every call; its (hashable) result is
+        used as the cache key instead of the arguments themselves.
+    typed : bool, optional
+        If True, arguments of different types are cached separately,
+        e.g. f(1) and f(1.0). By default equal arguments such as 1, 1.0
+        and True share an entry.
+    disk : str or DiskStore, optional
+        A DiskStore, or the path of its database, used as a persistent
+        second tier. Every computed result is also written to disk; a miss
+        in memory is looked up on disk, and a value found there is put back
+        into memory and counted as a hit. Functions are told apart by their
+        module and qualified name, and a change to the source of a function
+        invalidates its stored results. Default is None.
+    hook : callable, optional
+        Called with a CacheEvent for every hit and miss. Without a hook
+        (and without verbose) no events are created at all.
+    sample_rate : float, optional
+        The fraction of events passed to the hook, chosen at random.
+        Default is 1.0.
+    timed : bool, optional
+        If True, misses are timed for CacheInfo.compute_time and time_saved.
+        Implied by ``hook``. Default is False.
 
     Returns:
     -------
     function
         A wrapped version of the original function that caches its results.
+        The wrapper has two extra methods: ``cache_info()`` returns a
+        CacheInfo with hits, misses, evictions, max_size, current_size,
+        disk_hits and compute_time (the time spent computing timed misses,
+        from which ``time_saved`` estimates the time saved by hits), and
+        ``cache_clear()`` empties the cache (including the entries on disk)
+        and resets the statistics. See also cache_stats.
+
+    A coroutine function is wrapped into a coroutine function that caches
+    the awaited results. Concurrent awaits of the same arguments share one
+    computation, run as a separate task, so cancelling one of the callers
+    does not cancel it for the others.
     """
+    if policy is None:
+        policy = LRUPolicy(max_size)
+    elif max_size:
+        raise ValueError("Pass either max_size or policy, not both.")
+    if key is not None and typed:
+        raise ValueError("Pass either key or typed, not both.")
+    if not 0.0 <= sample_rate <= 1.0:
+        raise ValueError("sample_rate must be between 0 and 1.")
+    key_func = key
+    prototype = policy
+    store = DiskStore(disk) if isinstance(disk, str) else disk
 
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
-        cache: OrderedDict[Tuple[Any, ...], Any] = OrderedDict()
+        state = _CacheState(prototype.clone())
+        name = f"{func.__module__}.{func.__qualname__}"
+        version = _source_hash(func) if store is not None else ""
+        if store is not None:
+            store.invalidate(name, version)
 
-        @wraps(func)
-        def wrapper(*args: Any, **kwargs: Any) -> Any:
-            key = (
-                tuple(make_hashable(arg) for arg in args),
-                frozenset((k, make_hashable(v)) for k, v in kwargs.items()),
-            )
-            if key in cache:
-                if verbose:
-                    print(f"Cache hit for args: {args}, kwargs: {kwargs}")
-                return cache[key]
-            if verbose:
-                print(f"Cache miss: {args}, kwargs: {kwargs} - calculating")
-            result = func(*args, **kwargs)
-            if max_size > 0:
-                if len(cache) >= max_size:
-                    cache.popitem(last=False)
-                cache[key] = result
+        emit = _make_emitter(name, verbose, hook, sample_rate)
+        clock = time.perf_counter if timed or hook is not None else None
+
+        def make_key(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+            if key_func is not None:
+                return key_func(*args, **kwargs)
+            return _make_key(args, kwargs, typed)
+
+        def lookup(key: Any) -> Tuple[Optional[str], bool, Any]:
+            """
+            Looks up a value missing in memory on disk. Returns the stable hash
+            of the key, whether the value was found and the value.
+            """
+            digest = _stable_hash(key) if store is not None else None
+            if digest is not None:
+                try:
+                    result = store.get(name, version, digest)  # type: ignore[union-attr]
+                except KeyError:
+                    pass
+                else:
+                    return digest, True, result
+            return digest, False, None
+
+        def save(digest: Optional[str], result: Any) -> None:
+            if digest is not None:
+                store.put(name, version, digest, result)  # type: ignore[union-attr]
+
+        def compute(key: Any, args: Any, kwargs: Any) -> Tuple[Any, bool, float]:
+            """
+            Finds a value missing in memory. Returns it, whether it was on disk
+            and the time spent computing it.
+            """
+            digest, found, result = lookup(key)
+            elapsed = 0.0
+            if not found:
+                if clock is None:
+                    result = func(*args, **kwargs)
+                else:
+                    start = clock()
+                    result = func(*args, **kwargs)
+                    elapsed = clock() - start
+                save(digest, result)
+            if emit is not None:
+                emit("disk_hit" if found else "miss", args, kwargs, elapsed)
+            return result, found, elapsed
+
+        async def compute_async(
+            key: Any, args: Any, kwargs: Any
+        ) -> Tuple[Any, bool, float]:
+            digest, found, result = lookup(key)
+            elapsed = 0.0
+            if not found:
+                if clock is None:
+                    result = await func(*args, **kwargs)
+                else:
+                    start = clock()
+                    result = await func(*args, **kwargs)
+                    elapsed = clock() - start
+                save(digest, result)
+            if emit is not None:
+                emit("disk_hit" if found else "miss", args, kwargs, elapsed)
+            return result, found, elapsed
+
+        def simple_wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = make_key(args, kwargs)
+            try:
+                result = state.policy.get(key)
+            except KeyError:
+                pass
+            else:
+                state.hits += 1
+                if emit is not None:
+                    emit("hit", args, kwargs, 0.0)
+                return result
+            result, from_disk, elapsed = compute(key, args, kwargs)
+            state.store(key, result, from_disk, elapsed)
+            return result
+
+        def thread_safe_wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = make_key(args, kwargs)
+            owner = False
+            with state.lock:
+                try:
+                    result = state.policy.get(key)
+                except KeyError:
+                    flight = state.in_flight.get(key)
+                    if flight is None:
+                        flight = state.in_flight[key] = _Flight()
+                        owner = True
+                    elif flight.owner != threading.get_ident():
+                        state.hits += 1
+                else:
+                    state.hits += 1
+                    flight = None
+            if flight is None:
+                if emit is not None:
+                    emit("hit", args, kwargs, 0.0)
+                return result
+            if not owner and flight.owner != threading.get_ident():
+                if emit is not None:
+                    emit("hit", args, kwargs, 0.0)
+                return flight.wait()
+
+            # The owner computes the value; so does a recursive call for the
+            # same key, which would otherwise wait for itself.
+            try:
+                result, from_disk, elapsed = compute(key, args, kwargs)
+            except BaseException as exc:
+                if owner:
+                    with state.lock:
+                        del state.in_flight[key]
+                    flight.error = exc
+                    flight.done.set()
+                raise
+            with state.lock:
+                state.store(key, result, from_disk, elapsed)
+                if owner:
+                    del state.in_flight[key]
+            if owner:
+                flight.result = result
+                flight.done.set()
             return result
 
+        async def run_flight(key: Any, args: Any, kwargs: Any) -> Any:
+            """Computes a value in its own task and caches it."""
+            try:
+                result, from_disk, elapsed = await compute_async(key, args, kwargs)
+            except BaseException:
+                with state.lock:
+                    del state.in_flight[key]
+                raise
+            with state.lock:
+                state.store(key, result, from_disk, elapsed)
+                del state.in_flight[key]
+            return result
+
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = make_key(args, kwargs)
+            loop = asyncio.get_running_loop()
+            joined = False
+            with state.lock:
+                try:
+                    result = state.policy.get(key)
+                except KeyError:
+                    flight = state.in_flight.get(key)
+                    if flight is None:
+                        flight = loop.create_task(run_flight(key, args, kwargs))
+                        state.in_flight[key] = flight
+                    elif (
+                        flight is asyncio.current_task()
+                        or flight.get_loop() is not loop
+                    ):
+                        # A recursive call, or one from another event loop
+                        flight = None
+                    else:
+                        state.hits += 1
+                        joined = True
+                else:
+                    state.hits += 1
+                    flight = None
+                    joined = True
+            if joined and emit is not None:
+                emit("hit", args, kwargs, 0.0)
+            if flight is None:
+                if joined:
+                    return result
+                result, from_disk, elapsed = await compute_async(key, args, kwargs)
+                with state.lock:
+                    state.store(key, result, from_disk, elapsed)
+                return result
+            return await asyncio.shield(flight)
+
+        def cache_info() -> CacheInfo:
+            return CacheInfo(
+                state.hits,
+                state.misses,
+                state.evictions,
+                prototype.max_size,
+                len(state.policy),
+                state.disk_hits,
+                state.compute_time,
+            )
+
+        def cache_clear() -> None:
+            with state.lock:
+                state.hits = state.misses = state.evictions = state.disk_hits = 0
+                state.compute_time = 0.0
+                state.policy.clear()
+            if store is not None:
+                store.clear(name)
+
+        if inspect.iscoroutinefunction(func):
+            wrapper = wraps(func)(async_wrapper)
+        else:
+            wrapper = wraps(func)(
+                thread_safe_wrapper if thread_safe else simple_wrapper
+            )
+
+        wrapper.cache_info = cache_info  # type: ignore[attr-defined]
+        wrapper.cache_clear = cache_clear  # type: ignore[attr-defined]
+        _cached_functions.add(wrapper)
         return wrapper
 
     return decorator
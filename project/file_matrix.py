@@ -0,0 +1,296 @@
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, List, Optional, Tuple, Union
+
+from project.matrix_expression import evaluate, lazy
+from project.matrix_operations import Matrix, Number
+
+# Header of a matrix file: magic bytes, rows and cols as little-endian
+# 64-bit integers; the elements follow as little-endian doubles, row by row
+MAGIC = b"PYMATRX1"
+HEADER = struct.Struct("<8sqq")
+ITEMSIZE = 8
+# Bytes of tiles the blocked operations may hold in memory at once
+DEFAULT_TILE_BUDGET = 32 * 1024 * 1024
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+
+class FileMatrix:
+    """
+    A dense matrix of floats stored in a file and accessed through mmap, for
+    matrices that do not fit in memory. Only the tiles read with read_tile()
+    become Python objects; the mapped pages belong to the page cache, which
+    the operating system writes back and evicts as needed.
+
+    Use it as a context manager, or call close() when done.
+    """
+
+    def __init__(self, path: PathLike, writable: bool = False) -> None:
+        """Opens an existing matrix file, read-only unless writable."""
+        self.path = os.fspath(path)
+        self.writable = writable
+        with open(self.path, "r+b" if writable else "rb") as file:
+            header = file.read(HEADER.size)
+            if len(header) != HEADER.size:
+                raise ValueError(f"{self.path} is not a matrix file.")
+            magic, self.rows, self.cols = HEADER.unpack(header)
+            if magic != MAGIC or self.rows < 0 or self.cols < 0:
+                raise ValueError(f"{self.path} is not a matrix file.")
+            size = HEADER.size + self.rows * self.cols * ITEMSIZE
+            if os.fstat(file.fileno()).st_size != size:
+                raise ValueError(f"{self.path} should be {size} bytes long.")
+            access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            self._mmap: Optional[mmap.mmap] = mmap.mmap(file.fileno(), 0, access=access)
+
+    @classmethod
+    def create(cls, path: PathLike, rows: int, cols: int) -> "FileMatrix":
+        """Creates a file for a rows x cols matrix of zeros and opens it."""
+        if rows < 0 or cols < 0:
+            raise ValueError("The sizes of a matrix must not be negative.")
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, rows, cols))
+            file.truncate(HEADER.size + rows * cols * ITEMSIZE)
+        return cls(path, writable=True)
+
+    @classmethod
+    def from_matrix(cls, path: PathLike, m: Matrix) -> "FileMatrix":
+        result = cls.create(path, m.rows, m.cols)
+        result.write_tile(0, 0, m)
+        return result
+
+    @classmethod
+    def from_lists(cls, path: PathLike, m: List[List[Number]]) -> "FileMatrix":
+        return cls.from_matrix(path, Matrix.from_lists(m))
+
+    def to_matrix(self) -> Matrix:
+        """Reads the whole matrix into memory."""
+        return self.read_tile(0, 0, self.rows, self.cols)
+
+    def to_lists(self) -> List[List[float]]:
+        return self.to_matrix().to_lists()
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows, self.cols
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows * self.cols * ITEMSIZE
+
+    def _check_tile(self, row: int, col: int, rows: int, cols: int) -> mmap.mmap:
+        if self._mmap is None:
+            raise ValueError(f"{self.path} is closed.")
+        if not (
+            0 <= row <= row + rows <= self.rows and 0 <= col <= col + cols <= self.cols
+        ):
+            raise ValueError(
+                f"The tile {rows}x{cols} at ({row}, {col}) is out of range for shape {self.shape}."
+            )
+        return self._mmap
+
+    def _position(self, i: int, j: int) -> int:
+        return HEADER.size + (i * self.cols + j) * ITEMSIZE
+
+    def read_tile(self, row: int, col: int, rows: int, cols: int) -> Matrix:
+        """Copies the rows x cols block at (row, col) into a Matrix."""
+        mapped = self._check_tile(row, col, rows, cols)
+        data = array("d", [0.0]) * (rows * cols)
+        # Whole rows are one contiguous range of the file
+        ranges = (
+            [(row, rows * cols)]
+            if cols == self.cols
+            else [(i, cols) for i in range(row, row + rows)]
+        )
+        with memoryview(mapped) as source, memoryview(data).cast("B") as target:
+            position = 0
+            for i, count in ranges:
+                start = self._position(i, col)
+                target[position : position + count * ITEMSIZE] = source[
+                    start : start + count * ITEMSIZE
+                ]
+                position += count * ITEMSIZE
+        if sys.byteorder == "big":  # pragma: no cover
+            data.byteswap()
+        return Matrix(rows, cols, data)
+
+    def write_tile(self, row: int, col: int, tile: Matrix) -> None:
+        """Writes a Matrix into the block of the same shape at (row, col)."""
+        mapped = self._check_tile(row, col, tile.rows, tile.cols)
+        if not self.writable:
+            raise ValueError(f"{self.path} is opened read-only.")
+        if tile.is_contiguous and tile.cols == self.cols:
+            chunks = [(row, tile._flat())]
+        else:
+            chunks = [(row + i, tile.row(i)) for i in range(tile.rows)]
+        for i, values in chunks:
+            if sys.byteorder == "big":  # pragma: no cover
+                values = array("d", values)
+                values.byteswap()
+            start = self._position(i, col)
+            mapped[start : start + len(values) * ITEMSIZE] = values
+
+    def flush(self) -> None:
+        if self._mmap is not None and self.writable:
+            self._mmap.flush()
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self.flush()
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> "FileMatrix":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"FileMatrix({self.path!r}, shape={self.shape})"
+
+
+def _tile_side(tile_budget: int, tiles: int) -> int:
+    """The side of square tiles such that ``tiles`` of them fit the budget."""
+    if tile_budget <= 0:
+        raise ValueError("tile_budget must be positive.")
+    return max(1, math.isqrt(tile_budget // (tiles * ITEMSIZE)))
+
+
+def _bands(
+    rows: int, cols: int, tile_budget: int, tiles: int
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Splits a rows x cols matrix into (row, col, rows, cols) tiles such that
+    ``tiles`` of them fit the budget: bands of whole rows when a row fits,
+    since those are contiguous in the file, pieces of a row otherwise.
+    """
+    if tile_budget <= 0:
+        raise ValueError("tile_budget must be positive.")
+    elements = max(1, tile_budget // (tiles * ITEMSIZE))
+    if cols <= elements:
+        height = elements // max(cols, 1)
+        return [
+            (row, 0, min(height, rows - row), cols) for row in range(0, rows, height)
+        ]
+    return [
+        (row, col, 1, min(elements, cols - col))
+        for row in range(rows)
+        for col in range(0, cols, elements)
+    ]
+
+
+def file_addition(
+    a: FileMatrix,
+    b: FileMatrix,
+    path: PathLike,
+    tile_budget: int = DEFAULT_TILE_BUDGET,
+) -> FileMatrix:
+    """
+    Adds two matrix files into a new file, a tile at a time.
+
+    Parameters:
+    a (FileMatrix), b (FileMatrix): The matrices to add.
+    path: The file to create for the result.
+    tile_budget (int): The bytes of tiles held in memory at once.
+
+    Returns:
+    FileMatrix: The sum, opened for writing.
+    """
+    if a.shape != b.shape:
+        raise ValueError("The sizes of the matrices must match.")
+    result = FileMatrix.create(path, a.rows, a.cols)
+    for row, col, rows, cols in _bands(a.rows, a.cols, tile_budget, 2):
+        tile = a.read_tile(row, col, rows, cols)
+        evaluate(lazy(tile) + b.read_tile(row, col, rows, cols), out=tile)
+        result.write_tile(row, col, tile)
+    result.flush()
+    return result
+
+
+def file_multiply(
+    a: FileMatrix,
+    b: FileMatrix,
+    path: PathLike,
+    tile_budget: int = DEFAULT_TILE_BUDGET,
+) -> FileMatrix:
+    """
+    Multiplies two matrix files into a new file with square tiles: every
+    tile of the result accumulates the products of a row of tiles of ``a``
+    and a column of tiles of ``b`` in place, so three tiles are in memory,
+    plus buffers for the product of the tiles.
+
+    Parameters:
+    a (FileMatrix), b (FileMatrix): The matrices to multiply.
+    path: The file to create for the result.
+    tile_budget (int): The bytes of tiles held in memory at once.
+
+    Returns:
+    FileMatrix: The product, opened for writing.
+    """
+    if a.cols != b.rows:
+        raise ValueError(
+            "The number of columns of the first matrix must match the number of rows of the second matrix."
+        )
+    n, k, m = a.rows, a.cols, b.cols
+    side = _tile_side(tile_budget, 4)
+    result = FileMatrix.create(path, n, m)
+    for row in range(0, n, side):
+        rows = min(side, n - row)
+        for col in range(0, m, side):
+            cols = min(side, m - col)
+            tile = Matrix(rows, cols)
+            for inner in range(0, k, side):
+                depth = min(side, k - inner)
+                left = a.read_tile(row, inner, rows, depth)
+                right = b.read_tile(inner, col, depth, cols)
+                evaluate(lazy(tile) + lazy(left) @ right, out=tile)
+            result.write_tile(row, col, tile)
+    result.flush()
+    return result
+
+
+def file_transpose(
+    a: FileMatrix, path: PathLike, tile_budget: int = DEFAULT_TILE_BUDGET
+) -> FileMatrix:
+    """
+    Transposes a matrix file into a new file. The matrix is halved along its
+    longer side recursively until a block fits the tile budget, so blocks
+    that are close in both files are handled together at every scale and
+    the accesses stay local whatever the page and cache sizes are
+    (a cache-oblivious transpose).
+
+    Parameters:
+    a (FileMatrix): The matrix to transpose.
+    path: The file to create for the result.
+    tile_budget (int): The bytes of tiles held in memory at once.
+
+    Returns:
+    FileMatrix: The transposed matrix, opened for writing.
+    """
+    if tile_budget <= 0:
+        raise ValueError("tile_budget must be positive.")
+    elements = max(1, tile_budget // (2 * ITEMSIZE))
+    result = FileMatrix.create(path, a.cols, a.rows)
+
+    def transpose_block(row: int, col: int, rows: int, cols: int) -> None:
+        if rows * cols <= elements:
+            tile = a.read_tile(row, col, rows, cols)
+            result.write_tile(col, row, tile.T)
+        elif rows >= cols:
+            half = rows // 2
+            transpose_block(row, col, half, cols)
+            transpose_block(row + half, col, rows - half, cols)
+        else:
+            half = cols // 2
+            transpose_block(row, col, rows, half)
+            transpose_block(row, col + half, rows, cols - half)
+
+    if a.rows and a.cols:
+        transpose_block(0, 0, a.rows, a.cols)
+    result.flush()
+    return result
@@ -0,0 +1,350 @@
+import operator
+from array import array
+from typing import Any, List, Optional, Tuple, Union
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+from project.matrix_operations import Matrix, Number
+
+Operand = Union["Expression", Matrix]
+
+# Rows of the result handled at once when NumPy needs a temporary buffer
+BLOCK_ROWS = 64
+
+
+class Expression:
+    """
+    A lazy matrix expression. Combining expressions and matrices with ``+``,
+    ``-``, ``@``, ``*`` by a number and ``.T`` only builds a tree; evaluate()
+    computes it in one pass into a single output buffer:
+
+    - sums of products and matrices are accumulated in place, and a product
+      added to something is computed by a fused kernel (GEMM + add) that
+      never materializes the product;
+    - transpositions are moved down to the matrices, where they are free
+      views, so ``a @ b.T`` or ``(a @ b).T`` copy nothing;
+    - ``out=`` writes the result into an existing matrix, which may be one
+      of the operands, e.g. ``(c + a @ b).evaluate(out=c)``.
+
+    Only the operands of a product that are themselves expressions, such as
+    ``(a + b) @ c``, need temporary matrices.
+    """
+
+    shape: Tuple[int, int]
+
+    def __add__(self, other: Operand) -> "Expression":
+        other_expr = _wrap(other)
+        if other_expr is None:
+            return NotImplemented
+        return _Sum([(1.0, self), (1.0, other_expr)])
+
+    def __radd__(self, other: Matrix) -> "Expression":
+        other_expr = _wrap(other)
+        if other_expr is None:
+            return NotImplemented
+        return other_expr + self
+
+    def __sub__(self, other: Operand) -> "Expression":
+        other_expr = _wrap(other)
+        if other_expr is None:
+            return NotImplemented
+        return _Sum([(1.0, self), (-1.0, other_expr)])
+
+    def __rsub__(self, other: Matrix) -> "Expression":
+        other_expr = _wrap(other)
+        if other_expr is None:
+            return NotImplemented
+        return other_expr - self
+
+    def __mul__(self, k: Number) -> "Expression":
+        if not isinstance(k, (int, float)):
+            return NotImplemented
+        return _Sum([(float(k), self)])
+
+    __rmul__ = __mul__
+
+    def __neg__(self) -> "Expression":
+        return self * -1
+
+    def __matmul__(self, other: Operand) -> "Expression":
+        other_expr = _wrap(other)
+        if other_expr is None:
+            return NotImplemented
+        return _Product(self, other_expr)
+
+    def __rmatmul__(self, other: Matrix) -> "Expression":
+        other_expr = _wrap(other)
+        if other_expr is None:
+            return NotImplemented
+        return _Product(other_expr, self)
+
+    @property
+    def T(self) -> "Expression":
+        return _Transpose(self)
+
+    def evaluate(self, out: Optional[Matrix] = None) -> Matrix:
+        return evaluate(self, out)
+
+
+class _Leaf(Expression):
+    def __init__(self, matrix: Matrix) -> None:
+        self.matrix = matrix
+        self.shape = matrix.shape
+
+
+class _Sum(Expression):
+    """A linear combination of expressions."""
+
+    def __init__(self, terms: List[Tuple[float, Expression]]) -> None:
+        shapes = {term.shape for _, term in terms}
+        if len(shapes) != 1:
+            raise ValueError("The sizes of the matrices must match.")
+        self.terms = terms
+        self.shape = terms[0][1].shape
+
+
+class _Product(Expression):
+    def __init__(self, left: Expression, right: Expression) -> None:
+        if left.shape[1] != right.shape[0]:
+            raise ValueError(
+                "The number of columns of the first matrix must match the number of rows of the second matrix."
+            )
+        self.left = left
+        self.right = right
+        self.shape = (left.shape[0], right.shape[1])
+
+
+class _Transpose(Expression):
+    def __init__(self, operand: Expression) -> None:
+        self.operand = operand
+        self.shape = (operand.shape[1], operand.shape[0])
+
+
+def lazy(m: Union[Matrix, List[List[Number]]]) -> Expression:
+    """Starts an expression from a matrix or a list of rows."""
+    return _Leaf(m if isinstance(m, Matrix) else Matrix.from_lists(m))
+
+
+def _wrap(operand: Any) -> Optional[Expression]:
+    if isinstance(operand, Expression):
+        return operand
+    if isinstance(operand, Matrix):
+        return _Leaf(operand)
+    return None
+
+
+def _transpose(expr: Expression) -> Expression:
+    """Moves a transposition down to the matrices: (ab)^T = b^T a^T."""
+    if isinstance(expr, _Leaf):
+        return _Leaf(expr.matrix.T)
+    if isinstance(expr, _Transpose):
+        return _normalize(expr.operand)
+    if isinstance(expr, _Sum):
+        return _Sum([(k, _transpose(term)) for k, term in expr.terms])
+    if isinstance(expr, _Product):
+        return _Product(_transpose(expr.right), _transpose(expr.left))
+    raise TypeError(f"Unknown expression {expr!r}")
+
+
+def _normalize(expr: Expression) -> Expression:
+    """Removes the transpositions of a tree."""
+    if isinstance(expr, _Transpose):
+        return _transpose(expr.operand)
+    if isinstance(expr, _Sum):
+        return _Sum([(k, _normalize(term)) for k, term in expr.terms])
+    if isinstance(expr, _Product):
+        return _Product(_normalize(expr.left), _normalize(expr.right))
+    return expr
+
+
+def _flatten(expr: Expression, k: float, terms: List[Tuple[float, Expression]]) -> None:
+    """Collects the products and matrices of nested sums with their factors."""
+    if isinstance(expr, _Sum):
+        for factor, term in expr.terms:
+            _flatten(term, k * factor, terms)
+    else:
+        terms.append((k, expr))
+
+
+def _leaves(expr: Expression) -> List[Matrix]:
+    if isinstance(expr, _Leaf):
+        return [expr.matrix]
+    if isinstance(expr, _Sum):
+        return [m for _, term in expr.terms for m in _leaves(term)]
+    if isinstance(expr, _Product):
+        return _leaves(expr.left) + _leaves(expr.right)
+    return _leaves(expr.operand)  # type: ignore[attr-defined]
+
+
+def _same_view(a: Matrix, b: Matrix) -> bool:
+    return (
+        a.data is b.data
+        and a.shape == b.shape
+        and a.offset == b.offset
+        and a.strides == b.strides
+    )
+
+
+def evaluate(expr: Operand, out: Optional[Matrix] = None) -> Matrix:
+    """
+    Computes an expression, see Expression.
+
+    Parameters:
+    expr (Expression): The expression, or a matrix.
+    out (Matrix): The matrix to write the result into, by default a new one.
+        It may be a view, and it may be an operand of the expression.
+
+    Returns:
+    Matrix: The result, ``out`` if it is given.
+    """
+    root = _wrap(expr)
+    if root is None:
+        raise TypeError(f"Cannot evaluate {type(expr).__name__}.")
+    if out is None:
+        out = Matrix(*root.shape)
+    elif out.shape != root.shape:
+        raise ValueError("The sizes of the matrices must match.")
+
+    terms: List[Tuple[float, Expression]] = []
+    _flatten(_normalize(root), 1.0, terms)
+
+    # A term that is ``out`` itself stays in place; any other overlap with
+    # the operands needs a temporary result, computed before ``out`` changes.
+    own_factor: Optional[float] = None
+    for index, (k, term) in enumerate(terms):
+        if isinstance(term, _Leaf) and _same_view(term.matrix, out):
+            own_factor = k
+            del terms[index]
+            break
+    result = None
+    if any(m.data is out.data for _, term in terms for m in _leaves(term)):
+        result = _evaluate_terms(terms, Matrix(*out.shape), False)
+    if own_factor is None:
+        if result is None:
+            return _evaluate_terms(terms, out, False)
+        out.assign(result)
+        return out
+    if own_factor != 1.0:
+        _scale_into(out, own_factor)
+    if result is None:
+        return _evaluate_terms(terms, out, True)
+    _axpy_into(out, result, 1.0, True)
+    return out
+
+
+def _evaluate_terms(
+    terms: List[Tuple[float, Expression]], target: Matrix, accumulate: bool
+) -> Matrix:
+    products = [(k, term) for k, term in terms if isinstance(term, _Product)]
+    others = [(k, term) for k, term in terms if not isinstance(term, _Product)]
+    # NumPy writes the first product straight into the target; the pure
+    # Python kernel instead adds products to what is already there.
+    ordered = products + others if numpy is not None else others + products
+    for k, term in ordered:
+        if isinstance(term, _Product):
+            left = _materialize(term.left)
+            right = _materialize(term.right)
+            _gemm_into(target, left, right, k, accumulate)
+        else:
+            _axpy_into(target, _materialize(term), k, accumulate)
+        accumulate = True
+    return target
+
+
+def _materialize(expr: Expression) -> Matrix:
+    """Returns a matrix, evaluating an expression operand of a product."""
+    if isinstance(expr, _Leaf):
+        return expr.matrix
+    return evaluate(expr)
+
+
+def _rows(m: Matrix) -> List[Tuple[int, int, int]]:
+    """The (start, stop, step) slices of the buffer of every row of a matrix."""
+    slices = []
+    for i in range(m.rows):
+        start = m.offset + i * m.row_stride
+        slices.append((start, start + m.cols * m.col_stride, m.col_stride))
+    return slices
+
+
+def _scratch(target: Matrix) -> Any:
+    """A NumPy buffer for BLOCK_ROWS rows of the target."""
+    return numpy.empty((min(BLOCK_ROWS, target.rows), target.cols))
+
+
+def _scale_into(target: Matrix, k: float) -> None:
+    if numpy is not None:
+        view = target.to_numpy()
+        view *= k
+        return
+    data = target.data
+    for start, stop, step in _rows(target):
+        data[start:stop:step] = array("d", [x * k for x in data[start:stop:step]])
+
+
+def _axpy_into(target: Matrix, x: Matrix, k: float, accumulate: bool) -> None:
+    """target = k * x, or target += k * x if accumulate."""
+    if numpy is not None:
+        view, source = target.to_numpy(), x.to_numpy()
+        if not accumulate:
+            numpy.multiply(source, k, out=view)
+        elif k == 1.0:
+            numpy.add(view, source, out=view)
+        elif k == -1.0:
+            numpy.subtract(view, source, out=view)
+        else:
+            scratch = _scratch(target)
+            for start in range(0, target.rows, BLOCK_ROWS):
+                rows = view[start : start + BLOCK_ROWS]
+                scaled = scratch[: len(rows)]
+                numpy.multiply(source[start : start + BLOCK_ROWS], k, out=scaled)
+                rows += scaled
+        return
+    data = target.data
+    for i, (start, stop, step) in enumerate(_rows(target)):
+        row = x.row(i)
+        if accumulate:
+            values = [t + k * v for t, v in zip(data[start:stop:step], row)]
+        else:
+            values = [k * v for v in row]
+        data[start:stop:step] = array("d", values)
+
+
+def _gemm_into(
+    target: Matrix, a: Matrix, b: Matrix, k: float, accumulate: bool
+) -> None:
+    """target = k * a @ b, or target += k * a @ b if accumulate."""
+    if numpy is not None:
+        view, left, right = target.to_numpy(), a.to_numpy(), b.to_numpy()
+        if not accumulate:
+            numpy.matmul(left, right, out=view)
+            if k != 1.0:
+                view *= k
+            return
+        # A product of a block of rows at a time bounds the temporary memory
+        scratch = _scratch(target)
+        for start in range(0, target.rows, BLOCK_ROWS):
+            rows = view[start : start + BLOCK_ROWS]
+            product = scratch[: len(rows)]
+            numpy.matmul(left[start : start + BLOCK_ROWS], right, out=product)
+            if k != 1.0:
+                product *= k
+            rows += product
+        return
+    columns = b.T if b.T.is_contiguous else b.T.copy()
+    column_rows = [columns.row(j) for j in range(columns.rows)]
+    mul = operator.mul
+    data = target.data
+    for i, (start, stop, step) in enumerate(_rows(target)):
+        row = a.row(i)
+        dots = [sum(map(mul, row, col)) for col in column_rows]
+        if accumulate:
+            values = [t + k * d for t, d in zip(data[start:stop:step], dots)]
+        elif k != 1.0:
+            values = [k * d for d in dots]
+        else:
+            values = dots
+        data[start:stop:step] = array("d", values)
@@ -1,4 +1,562 @@
-from typing import List
+import itertools
+import operator
+import os
+from array import array
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+from project.thread_pool import ProcessPool, SharedBuffer
+
+Number = Union[int, float]
+
+# Backends of multiply: "auto" picks NumPy if it is installed
+BACKENDS = ("auto", "numpy", "blocked", "strassen")
+DEFAULT_BLOCK_SIZE = 64
+# Size below which strassen_multiply switches to the blocked kernel
+DEFAULT_CROSSOVER = 64
+
+
+class Matrix:
+    """
+    A dense matrix of floats stored in one contiguous array('d').
+
+    Element (i, j) lives at ``data[offset + i * row_stride + j * col_stride]``,
+    so transposed matrices are views that share the buffer of the original
+    instead of copying it. A float takes 8 bytes here instead of a pointer
+    and a float object in a nested list, about 4 times less memory.
+    When NumPy is installed, element-wise operations run on NumPy views of
+    the buffers; it is not required.
+
+    Matrices support ``+``, ``-``, ``@``, multiplication by a number and
+    ``==``; the results of operations are new contiguous matrices.
+    """
+
+    __slots__ = ("data", "rows", "cols", "offset", "row_stride", "col_stride")
+
+    def __init__(
+        self, rows: int, cols: int, data: Optional[Iterable[float]] = None
+    ) -> None:
+        """
+        Creates a rows x cols matrix from its elements in row-major order,
+        or filled with zeros. An array('d') is used as the buffer without copying.
+        """
+        if rows < 0 or cols < 0:
+            raise ValueError("The sizes of a matrix must not be negative.")
+        if data is None:
+            buffer = array("d", [0.0]) * (rows * cols)
+        elif isinstance(data, array) and data.typecode == "d":
+            buffer = data
+        else:
+            buffer = array("d", data)
+        if len(buffer) != rows * cols:
+            raise ValueError(
+                f"A {rows}x{cols} matrix needs {rows * cols} elements, got {len(buffer)}."
+            )
+        self.data = buffer
+        self.rows = rows
+        self.cols = cols
+        self.offset = 0
+        self.row_stride = cols
+        self.col_stride = 1
+
+    @classmethod
+    def _view(
+        cls,
+        data: "array[float]",
+        rows: int,
+        cols: int,
+        offset: int,
+        row_stride: int,
+        col_stride: int,
+    ) -> "Matrix":
+        view = cls.__new__(cls)
+        view.data = data
+        view.rows = rows
+        view.cols = cols
+        view.offset = offset
+        view.row_stride = row_stride
+        view.col_stride = col_stride
+        return view
+
+    @classmethod
+    def from_lists(cls, m: List[List[Number]]) -> "Matrix":
+        """Creates a matrix from a list of rows."""
+        cols = len(m[0]) if m else 0
+        if any(len(row) != cols for row in m):
+            raise ValueError("All rows of a matrix must have the same length.")
+        return cls(len(m), cols, itertools.chain.from_iterable(m))
+
+    @classmethod
+    def identity(cls, n: int) -> "Matrix":
+        result = cls(n, n)
+        result.data[:: n + 1] = array("d", [1.0]) * n
+        return result
+
+    @classmethod
+    def from_numpy(cls, a: Any) -> "Matrix":
+        """Copies a two-dimensional NumPy array into a matrix."""
+        rows, cols = a.shape
+        data = array("d")
+        data.frombytes(numpy.ascontiguousarray(a, dtype=numpy.float64).tobytes())
+        return cls(rows, cols, data)
+
+    def to_lists(self) -> List[List[float]]:
+        return [self.row(i).tolist() for i in range(self.rows)]
+
+    def to_numpy(self) -> Any:
+        """Returns a NumPy array sharing the buffer of the matrix."""
+        if numpy is None:
+            raise ImportError("to_numpy requires NumPy.")
+        itemsize = self.data.itemsize
+        return numpy.ndarray(
+            (self.rows, self.cols),
+            dtype=numpy.float64,
+            buffer=self.data,
+            offset=self.offset * itemsize,
+            strides=(self.row_stride * itemsize, self.col_stride * itemsize),
+        )
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows, self.cols
+
+    @property
+    def strides(self) -> Tuple[int, int]:
+        """The distances between rows and between columns, in elements."""
+        return self.row_stride, self.col_stride
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows * self.cols * self.data.itemsize
+
+    @property
+    def is_contiguous(self) -> bool:
+        """Whether the rows are stored one after another without gaps."""
+        return self.col_stride == 1 and self.row_stride == self.cols
+
+    @property
+    def T(self) -> "Matrix":
+        return self.transpose()
+
+    def transpose(self) -> "Matrix":
+        """Returns the transposed matrix as a view sharing this buffer."""
+        return Matrix._view(
+            self.data,
+            self.cols,
+            self.rows,
+            self.offset,
+            self.col_stride,
+            self.row_stride,
+        )
+
+    def copy(self) -> "Matrix":
+        """Returns a contiguous copy."""
+        if self.is_contiguous:
+            start = self.offset
+            return Matrix(
+                self.rows, self.cols, self.data[start : start + self.rows * self.cols]
+            )
+        data = array("d")
+        for i in range(self.rows):
+            data.extend(self.row(i))
+        return Matrix(self.rows, self.cols, data)
+
+    def submatrix(self, row: int, col: int, rows: int, cols: int) -> "Matrix":
+        """Returns the rows x cols block starting at (row, col) as a view."""
+        if not (
+            0 <= row
+            and 0 <= col
+            and 0 <= rows
+            and 0 <= cols
+            and row + rows <= self.rows
+            and col + cols <= self.cols
+        ):
+            raise IndexError(f"The block does not fit into shape {self.shape}.")
+        return Matrix._view(
+            self.data,
+            rows,
+            cols,
+            self.offset + row * self.row_stride + col * self.col_stride,
+            self.row_stride,
+            self.col_stride,
+        )
+
+    def assign(self, other: "Matrix") -> None:
+        """Copies the elements of a matrix of the same shape into this one."""
+        if self.shape != other.shape:
+            raise ValueError("The sizes of the matrices must match.")
+        for i in range(self.rows):
+            start = self.offset + i * self.row_stride
+            stop = start + self.cols * self.col_stride
+            self.data[start : stop : self.col_stride] = other.row(i)
+
+    def row(self, i: int) -> "array[float]":
+        """Returns a copy of the i-th row."""
+        start = self.offset + i * self.row_stride
+        if self.col_stride == 1:
+            return self.data[start : start + self.cols]
+        stop = start + self.cols * self.col_stride
+        return self.data[start : stop : self.col_stride]
+
+    def _flat(self) -> "array[float]":
+        """The elements of a contiguous matrix, without copying if possible."""
+        size = self.rows * self.cols
+        if self.offset == 0 and len(self.data) == size:
+            return self.data
+        return self.data[self.offset : self.offset + size]
+
+    def col(self, j: int) -> "array[float]":
+        """Returns a copy of the j-th column."""
+        return self.transpose().row(j)
+
+    def _index(self, key: Tuple[int, int]) -> int:
+        i, j = key
+        if i < 0:
+            i += self.rows
+        if j < 0:
+            j += self.cols
+        if not (0 <= i < self.rows and 0 <= j < self.cols):
+            raise IndexError(f"Index {key} is out of range for shape {self.shape}.")
+        return self.offset + i * self.row_stride + j * self.col_stride
+
+    def __getitem__(self, key: Tuple[int, int]) -> float:
+        return self.data[self._index(key)]
+
+    def __setitem__(self, key: Tuple[int, int], value: float) -> None:
+        self.data[self._index(key)] = value
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self.shape == other.shape and all(
+            self.row(i) == other.row(i) for i in range(self.rows)
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Matrix({self.to_lists()!r})"
+
+    def _elementwise(self, other: "Matrix", op: Any, ufunc: str) -> "Matrix":
+        if self.shape != other.shape:
+            raise ValueError("The sizes of the matrices must match.")
+        if numpy is not None:
+            result = Matrix(self.rows, self.cols)
+            getattr(numpy, ufunc)(
+                self.to_numpy(), other.to_numpy(), out=result.to_numpy()
+            )
+            return result
+        if self.is_contiguous and other.is_contiguous:
+            return Matrix(self.rows, self.cols, map(op, self._flat(), other._flat()))
+        data = array("d")
+        for i in range(self.rows):
+            data.extend(map(op, self.row(i), other.row(i)))
+        return Matrix(self.rows, self.cols, data)
+
+    def __add__(self, other: "Matrix") -> "Matrix":
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self._elementwise(other, operator.add, "add")
+
+    def __sub__(self, other: "Matrix") -> "Matrix":
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self._elementwise(other, operator.sub, "subtract")
+
+    def __mul__(self, k: Number) -> "Matrix":
+        if not isinstance(k, (int, float)):
+            return NotImplemented
+        if numpy is not None:
+            result = Matrix(self.rows, self.cols)
+            numpy.multiply(self.to_numpy(), k, out=result.to_numpy())
+            return result
+        data = array("d")
+        for i in range(self.rows):
+            data.extend([x * k for x in self.row(i)])
+        return Matrix(self.rows, self.cols, data)
+
+    __rmul__ = __mul__
+
+    def __neg__(self) -> "Matrix":
+        return self * -1
+
+    def __matmul__(self, other: "Matrix") -> "Matrix":
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return multiply(self, other)
+
+
+def multiply(
+    a: Matrix, b: Matrix, backend: str = "auto", block_size: int = DEFAULT_BLOCK_SIZE
+) -> Matrix:
+    """
+    Multiplies two matrices.
+
+    Parameters:
+    a (Matrix): The first matrix.
+    b (Matrix): The second matrix.
+    backend (str): "numpy", "blocked" (pure Python), "strassen" (see
+        strassen_multiply) or "auto", which picks NumPy when it is installed.
+    block_size (int): The number of columns of the result computed together
+        by the blocked backend.
+
+    Returns:
+    Matrix: The product.
+
+    Exceptions:
+    ValueError: If the number of columns of the first matrix does not match the number of rows of the second matrix.
+    """
+    if a.cols != b.rows:
+        raise ValueError(
+            "The number of columns of the first matrix must match the number of rows of the second matrix."
+        )
+    if backend == "auto":
+        backend = "numpy" if numpy is not None else "blocked"
+    if backend == "numpy":
+        if numpy is None:
+            raise ImportError("The numpy backend requires NumPy.")
+        result = Matrix(a.rows, b.cols)
+        numpy.matmul(a.to_numpy(), b.to_numpy(), out=result.to_numpy())
+        return result
+    if backend == "blocked":
+        return _multiply_blocked(a, b, block_size)
+    if backend == "strassen":
+        return strassen_multiply(a, b, block_size=block_size)
+    raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}.")
+
+
+def strassen_multiply(
+    a: Matrix,
+    b: Matrix,
+    crossover: int = DEFAULT_CROSSOVER,
+    backend: str = "blocked",
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Matrix:
+    """
+    Multiplies two matrices with Strassen's algorithm: a product of two
+    n x n matrices takes 7 products of n/2 x n/2 quadrants instead of 8,
+    at the price of 18 additions. Products of at most ``crossover`` rows
+    are computed by ``backend``. The operands are padded with zeros to a
+    square of size ``s * 2**d`` with ``s <= crossover``, the smallest one
+    that fits both; padding to a power of two could almost double it.
+
+    The error is larger than that of the usual algorithm, though still
+    bounded by (n/n0)^log2(12) * (n0^2 + 5 * n0) * u * ||A|| * ||B||
+    (Higham), with n0 the size of the leaves and u the unit roundoff.
+
+    Parameters:
+    a (Matrix): The first matrix.
+    b (Matrix): The second matrix.
+    crossover (int): The size of the largest product left to ``backend``.
+    backend (str): The backend of multiply for the leaves.
+    block_size (int): See multiply.
+
+    Returns:
+    Matrix: The product.
+    """
+    if a.cols != b.rows:
+        raise ValueError(
+            "The number of columns of the first matrix must match the number of rows of the second matrix."
+        )
+    if crossover < 1:
+        raise ValueError("crossover must be positive.")
+    if backend == "strassen":
+        raise ValueError("The leaves of strassen_multiply need another backend.")
+    size = max(a.rows, a.cols, b.cols)
+    if size <= crossover:
+        return multiply(a, b, backend, block_size)
+
+    leaf, depth = size, 0
+    while leaf > crossover:
+        leaf = -(-leaf // 2)
+        depth += 1
+    padded = leaf << depth
+
+    def pad(m: Matrix) -> Matrix:
+        if m.shape == (padded, padded):
+            return m
+        result = Matrix(padded, padded)
+        result.submatrix(0, 0, m.rows, m.cols).assign(m)
+        return result
+
+    product = _strassen(pad(a), pad(b), crossover, backend, block_size)
+    return product.submatrix(0, 0, a.rows, b.cols).copy()
+
+
+def _strassen(
+    a: Matrix, b: Matrix, crossover: int, backend: str, block_size: int
+) -> Matrix:
+    """Multiplies square matrices whose size halves evenly down to the leaves."""
+    n = a.rows
+    if n <= crossover:
+        return multiply(a, b, backend, block_size)
+    h = n // 2
+    a11, a12 = a.submatrix(0, 0, h, h), a.submatrix(0, h, h, h)
+    a21, a22 = a.submatrix(h, 0, h, h), a.submatrix(h, h, h, h)
+    b11, b12 = b.submatrix(0, 0, h, h), b.submatrix(0, h, h, h)
+    b21, b22 = b.submatrix(h, 0, h, h), b.submatrix(h, h, h, h)
+
+    def product(x: Matrix, y: Matrix) -> Matrix:
+        return _strassen(x, y, crossover, backend, block_size)
+
+    m1 = product(a11 + a22, b11 + b22)
+    m2 = product(a21 + a22, b11)
+    m3 = product(a11, b12 - b22)
+    m4 = product(a22, b21 - b11)
+    m5 = product(a11 + a12, b22)
+    m6 = product(a21 - a11, b11 + b12)
+    m7 = product(a12 - a22, b21 + b22)
+
+    result = Matrix(n, n)
+    result.submatrix(0, 0, h, h).assign(m1 + m4 - m5 + m7)
+    result.submatrix(0, h, h, h).assign(m3 + m5)
+    result.submatrix(h, 0, h, h).assign(m2 + m4)
+    result.submatrix(h, h, h, h).assign(m1 - m2 + m3 + m6)
+    return result
+
+
+def _multiply_blocked(a: Matrix, b: Matrix, block_size: int) -> Matrix:
+    """
+    Multiplies matrices in pure Python. Every element of the result is a dot
+    product of a row of ``a`` and a row of the contiguous transpose of ``b``;
+    the columns of the result are computed in blocks, so that the rows of the
+    transpose used by a block stay in the CPU cache while all rows of ``a``
+    pass by.
+    """
+    if block_size < 1:
+        raise ValueError("block_size must be positive.")
+    n, m = a.rows, b.cols
+    rows = [a.row(i) for i in range(n)]
+    # b.T is already contiguous when b is a transposed view, e.g. in a @ c.T
+    columns = b.T if b.T.is_contiguous else b.T.copy()
+    tiles = [
+        [columns.row(j) for j in range(start, min(start + block_size, m))]
+        for start in range(0, m, block_size)
+    ]
+    mul = operator.mul
+    result = Matrix(n, m)
+    out = result.data
+    for start, tile in zip(range(0, m, block_size), tiles):
+        stop = start + len(tile)
+        for i, row in enumerate(rows):
+            out[i * m + start : i * m + stop] = array(
+                "d", [sum(map(mul, row, col)) for col in tile]
+            )
+    return result
+
+
+def parallel_multiply(
+    a: Matrix,
+    b: Matrix,
+    processes: Optional[int] = None,
+    pool: Optional[ProcessPool] = None,
+    backend: str = "auto",
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Matrix:
+    """
+    Multiplies two matrices in several processes. The operands and the
+    result are placed in shared memory, and every task computes a block of
+    rows of the result in place, so no matrix is pickled.
+
+    Parameters:
+    a (Matrix): The first matrix.
+    b (Matrix): The second matrix.
+    processes (int): The number of processes of a temporary pool, by default
+        the number of CPUs. Ignored if ``pool`` is given.
+    pool (ProcessPool): A pool to run the tasks in.
+    backend (str): The backend of multiply used by the tasks.
+    block_size (int): See multiply.
+
+    Returns:
+    Matrix: The product.
+    """
+    if a.cols != b.rows:
+        raise ValueError(
+            "The number of columns of the first matrix must match the number of rows of the second matrix."
+        )
+    if backend == "auto":
+        backend = "numpy" if numpy is not None else "blocked"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}.")
+    n, k, m = a.rows, a.cols, b.cols
+    if n * k * m == 0:
+        return Matrix(n, m)
+
+    own_pool = pool is None
+    if pool is None:
+        pool = ProcessPool(processes or os.cpu_count() or 1)
+    shared_a = SharedBuffer.from_data(a.copy().data)
+    shared_b = SharedBuffer.from_data(b.copy().data)
+    shared_out = SharedBuffer(n * m * 8)
+    try:
+        # A few blocks per process even out the differences between them
+        blocks = min(n, pool.num_processes * 4)
+        bounds = [n * i // blocks for i in range(blocks + 1)]
+        futures = [
+            pool.submit(
+                _multiply_rows,
+                shared_a,
+                shared_b,
+                shared_out,
+                (n, k, m),
+                start,
+                stop,
+                backend,
+                block_size,
+            )
+            for start, stop in zip(bounds, bounds[1:])
+        ]
+        for future in futures:
+            future.result()
+        data = array("d")
+        data.frombytes(shared_out.buf)
+    finally:
+        if own_pool:
+            pool.dispose()
+        for buffer in (shared_a, shared_b, shared_out):
+            buffer.release()
+    return Matrix(n, m, data)
+
+
+def _multiply_rows(
+    shared_a: SharedBuffer,
+    shared_b: SharedBuffer,
+    shared_out: SharedBuffer,
+    shape: Tuple[int, int, int],
+    start: int,
+    stop: int,
+    backend: str,
+    block_size: int,
+) -> None:
+    """Computes rows start to stop of a product in a worker process."""
+    n, k, m = shape
+    itemsize = 8
+    try:
+        if backend == "numpy":
+            rows = numpy.frombuffer(shared_a.buf, dtype=numpy.float64).reshape(n, k)
+            other = numpy.frombuffer(shared_b.buf, dtype=numpy.float64).reshape(k, m)
+            out = numpy.frombuffer(shared_out.buf, dtype=numpy.float64).reshape(n, m)
+            numpy.matmul(rows[start:stop], other, out=out[start:stop])
+            del rows, other, out
+        else:
+            a = array("d")
+            a.frombytes(shared_a.buf[start * k * itemsize : stop * k * itemsize])
+            b = array("d")
+            b.frombytes(shared_b.buf)
+            result = multiply(
+                Matrix(stop - start, k, a), Matrix(k, m, b), backend, block_size
+            )
+            shared_out.buf[start * m * itemsize : stop * m * itemsize] = memoryview(
+                result.data
+            ).cast("B")
+    finally:
+        # Unmap the blocks, a long-lived worker would otherwise keep them
+        for buffer in (shared_a, shared_b, shared_out):
+            buffer.release()
 
 
 def matrix_addition(m1: List[List[float]], m2: List[List[float]]) -> List[List[float]]:
@@ -14,6 +572,9 @@ def matrix_addition(m1: List[List[float]], m2: List[List[float]]) -> List[List[f
 
     Exceptions:
     ValueError: If the dimensions of the matrices do not match.
+
+    The elements keep their types; for large matrices of floats, adding
+    Matrix objects is faster and takes less memory.
     """
     if len(m1) != len(m2) or any(len(row1) != len(row2) for row1, row2 in zip(m1, m2)):
         raise ValueError("The sizes of the matrices must match.")
@@ -21,19 +582,33 @@ def matrix_addition(m1: List[List[float]], m2: List[List[float]]) -> List[List[f
     return [[x + y for x, y in zip(row1, row2)] for row1, row2 in zip(m1, m2)]
 
 
-def matrix_multiply(m1: List[List[float]], m2: List[List[float]]) -> List[List[float]]:
+def matrix_multiply(
+    m1: List[List[float]],
+    m2: List[List[float]],
+    backend: str = "auto",
+    processes: int = 1,
+) -> List[List[float]]:
     """
     Multiplies two matrices.
 
     Parameters:
     m1 (List[List[float]]): The first matrix.
     m2 (List[List[float]]): The second matrix.
+    backend (str): The backend of multiply: "auto", "numpy", "blocked" or
+        "strassen".
+    processes (int): If above 1, the product is computed by parallel_multiply
+        in that many processes.
 
     Returns:
     List[List[float]]: The result of multiplying two matrices.
 
     Exceptions:
     ValueError: If the number of columns of the first matrix does not match the number of rows of the second matrix.
+
+    With the "auto" backend in one process, matrices that hold anything but
+    floats, e.g. ints, complex numbers or fractions, are multiplied exactly
+    and the elements keep their types. Otherwise the matrices are converted
+    to Matrix objects of floats.
     """
     # Check for empty matrices
     if not m1 or not m2:
@@ -46,7 +621,18 @@ def matrix_multiply(m1: List[List[float]], m2: List[List[float]]) -> List[List[f
         )
 
     # Multiply the matrices
-    return [[sum(x * y for x, y in zip(row, col)) for col in zip(*m2)] for row in m1]
+    if (
+        backend == "auto"
+        and processes <= 1
+        and not all(type(x) is float for m in (m1, m2) for row in m for x in row)
+    ):
+        return [
+            [sum(x * y for x, y in zip(row, col)) for col in zip(*m2)] for row in m1
+        ]
+    a, b = Matrix.from_lists(m1), Matrix.from_lists(m2)
+    if processes > 1:
+        return parallel_multiply(a, b, processes, backend=backend).to_lists()
+    return multiply(a, b, backend).to_lists()
 
 
 def transpose_matrix(m: List[List[float]]) -> List[List[float]]:
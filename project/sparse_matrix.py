@@ -0,0 +1,389 @@
+import bisect
+import itertools
+from array import array
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+from project.matrix_operations import Matrix, Number
+
+# Type code of the index arrays: 64-bit signed integers on every platform
+INDEX_TYPE = "q"
+
+
+def _check_lists(m: List[List[Number]]) -> int:
+    """Returns the number of columns of a list of rows."""
+    cols = len(m[0]) if m else 0
+    if any(len(row) != cols for row in m):
+        raise ValueError("All rows of a matrix must have the same length.")
+    return cols
+
+
+class COOMatrix:
+    """
+    A sparse matrix in coordinate format: three parallel arrays with the row,
+    the column and the value of every stored element. It is cheap to build
+    element by element and to transpose; convert it with to_csr() for
+    arithmetic. Repeated coordinates are summed by to_csr().
+    """
+
+    __slots__ = ("rows", "cols", "row_indices", "col_indices", "values")
+
+    def __init__(
+        self,
+        rows: int,
+        cols: int,
+        row_indices: Iterable[int] = (),
+        col_indices: Iterable[int] = (),
+        values: Iterable[float] = (),
+    ) -> None:
+        self.rows = rows
+        self.cols = cols
+        self.row_indices = array(INDEX_TYPE, row_indices)
+        self.col_indices = array(INDEX_TYPE, col_indices)
+        self.values = array("d", values)
+        if not len(self.row_indices) == len(self.col_indices) == len(self.values):
+            raise ValueError("Every element needs a row, a column and a value.")
+        if any(not 0 <= i < rows for i in self.row_indices) or any(
+            not 0 <= j < cols for j in self.col_indices
+        ):
+            raise ValueError(f"An index is out of range for shape {self.shape}.")
+
+    @classmethod
+    def from_lists(cls, m: List[List[Number]]) -> "COOMatrix":
+        """Creates a matrix from a list of rows, storing only the nonzeros."""
+        cols = _check_lists(m)
+        coo = cls(len(m), cols)
+        for i, row in enumerate(m):
+            for j, x in enumerate(row):
+                if x:
+                    coo.row_indices.append(i)
+                    coo.col_indices.append(j)
+                    coo.values.append(x)
+        return coo
+
+    def to_lists(self) -> List[List[float]]:
+        dense = [[0.0] * self.cols for _ in range(self.rows)]
+        for i, j, x in zip(self.row_indices, self.col_indices, self.values):
+            dense[i][j] += x
+        return dense
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows, self.cols
+
+    @property
+    def nnz(self) -> int:
+        """The number of stored elements."""
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        return self.nnz * (2 * self.row_indices.itemsize + self.values.itemsize)
+
+    @property
+    def T(self) -> "COOMatrix":
+        return self.transpose()
+
+    def transpose(self) -> "COOMatrix":
+        """Returns the transposed matrix, sharing the arrays of this one."""
+        result = COOMatrix(self.cols, self.rows)
+        result.row_indices = self.col_indices
+        result.col_indices = self.row_indices
+        result.values = self.values
+        return result
+
+    def to_csr(self) -> "CSRMatrix":
+        """Converts the matrix to CSR, summing repeated coordinates."""
+        rows: List[Dict[int, float]] = [{} for _ in range(self.rows)]
+        for i, j, x in zip(self.row_indices, self.col_indices, self.values):
+            row = rows[i]
+            row[j] = row.get(j, 0.0) + x
+        return CSRMatrix._from_rows(
+            self.rows, self.cols, (sorted(row.items()) for row in rows)
+        )
+
+    def __repr__(self) -> str:
+        return f"COOMatrix(shape={self.shape}, nnz={self.nnz})"
+
+
+class CSRMatrix:
+    """
+    A sparse matrix in compressed sparse row format. The columns and values
+    of the nonzeros of row i are ``indices[indptr[i]:indptr[i + 1]]`` and
+    ``data[indptr[i]:indptr[i + 1]]``, sorted by column. Zeros are never
+    stored, so memory and the time of operations grow with the number of
+    nonzeros rather than with rows * cols.
+
+    Supports ``+`` and ``-`` with CSR matrices (giving CSR) and dense Matrix
+    objects (giving Matrix), ``@`` with CSR (giving CSR) and dense Matrix
+    objects on either side (giving Matrix), multiplication by a number and
+    transposition, none of which densify a sparse result.
+    """
+
+    __slots__ = ("rows", "cols", "indptr", "indices", "data")
+
+    def __init__(
+        self,
+        rows: int,
+        cols: int,
+        indptr: Iterable[int],
+        indices: Iterable[int],
+        data: Iterable[float],
+    ) -> None:
+        """
+        Creates a matrix from its arrays, which must follow the layout above.
+        Use from_lists or COOMatrix.to_csr to build one from elements.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.indptr = array(INDEX_TYPE, indptr)
+        self.indices = array(INDEX_TYPE, indices)
+        self.data = array("d", data)
+        if len(self.indptr) != rows + 1 or len(self.indices) != len(self.data):
+            raise ValueError("The arrays of a CSR matrix do not match its shape.")
+        if self.indptr[0] != 0 or self.indptr[-1] != len(self.data):
+            raise ValueError("The arrays of a CSR matrix do not match its shape.")
+
+    @classmethod
+    def _from_rows(
+        cls, rows: int, cols: int, row_items: Iterable[Iterable[Tuple[int, float]]]
+    ) -> "CSRMatrix":
+        """Builds a matrix from the sorted (column, value) pairs of every row."""
+        result = cls(rows, cols, [0] * (rows + 1), (), ())
+        indices, data, indptr = result.indices, result.data, result.indptr
+        for i, items in enumerate(row_items):
+            for j, x in items:
+                if x:
+                    indices.append(j)
+                    data.append(x)
+            indptr[i + 1] = len(data)
+        return result
+
+    @classmethod
+    def from_lists(cls, m: List[List[Number]]) -> "CSRMatrix":
+        """Creates a matrix from a list of rows, storing only the nonzeros."""
+        cols = _check_lists(m)
+        return cls._from_rows(len(m), cols, (enumerate(row) for row in m))
+
+    @classmethod
+    def from_dense(cls, m: Matrix) -> "CSRMatrix":
+        return cls._from_rows(
+            m.rows, m.cols, (enumerate(m.row(i)) for i in range(m.rows))
+        )
+
+    def to_lists(self) -> List[List[float]]:
+        return self.to_dense().to_lists()
+
+    def to_dense(self) -> Matrix:
+        result = Matrix(self.rows, self.cols)
+        out = result.data
+        for i in range(self.rows):
+            base = i * self.cols
+            for j, x in zip(*self._row(i)):
+                out[base + j] = x
+        return result
+
+    def to_coo(self) -> COOMatrix:
+        row_indices = itertools.chain.from_iterable(
+            itertools.repeat(i, self.indptr[i + 1] - self.indptr[i])
+            for i in range(self.rows)
+        )
+        return COOMatrix(self.rows, self.cols, row_indices, self.indices, self.data)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows, self.cols
+
+    @property
+    def nnz(self) -> int:
+        """The number of stored (nonzero) elements."""
+        return len(self.data)
+
+    @property
+    def density(self) -> float:
+        """The fraction of nonzero elements."""
+        return self.nnz / (self.rows * self.cols) if self.rows * self.cols else 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.indptr) * self.indptr.itemsize + self.nnz * (
+            self.indices.itemsize + self.data.itemsize
+        )
+
+    def _row(self, i: int) -> Tuple["array[int]", "array[float]"]:
+        """The columns and values of the nonzeros of a row."""
+        start, stop = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:stop], self.data[start:stop]
+
+    def __getitem__(self, key: Tuple[int, int]) -> float:
+        i, j = key
+        if not (0 <= i < self.rows and 0 <= j < self.cols):
+            raise IndexError(f"Index {key} is out of range for shape {self.shape}.")
+        start, stop = self.indptr[i], self.indptr[i + 1]
+        position = bisect.bisect_left(self.indices, j, start, stop)
+        if position < stop and self.indices[position] == j:
+            return self.data[position]
+        return 0.0
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CSRMatrix):
+            return NotImplemented
+        return (
+            self.shape == other.shape
+            and self.indptr == other.indptr
+            and self.indices == other.indices
+            and self.data == other.data
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"CSRMatrix(shape={self.shape}, nnz={self.nnz})"
+
+    @property
+    def T(self) -> "CSRMatrix":
+        return self.transpose()
+
+    def transpose(self) -> "CSRMatrix":
+        """
+        Returns the transposed matrix, by a counting sort of the nonzeros by
+        column in O(rows + cols + nnz).
+        """
+        counts = [0] * (self.cols + 1)
+        for j in self.indices:
+            counts[j + 1] += 1
+        indptr = list(itertools.accumulate(counts))
+        indices = array(INDEX_TYPE, bytes(self.indices.itemsize * self.nnz))
+        data = array("d", bytes(self.data.itemsize * self.nnz))
+        # The next free position in every row of the result
+        free = indptr[:-1]
+        position = 0
+        for i in range(self.rows):
+            for _ in range(self.indptr[i + 1] - self.indptr[i]):
+                j = self.indices[position]
+                target = free[j]
+                indices[target] = i
+                data[target] = self.data[position]
+                free[j] = target + 1
+                position += 1
+        return CSRMatrix(self.cols, self.rows, indptr, indices, data)
+
+    def _combine(self, other: "CSRMatrix", sign: float) -> "CSRMatrix":
+        if self.shape != other.shape:
+            raise ValueError("The sizes of the matrices must match.")
+
+        def rows() -> Iterable[List[Tuple[int, float]]]:
+            for i in range(self.rows):
+                merged = dict(zip(*self._row(i)))
+                for j, x in zip(*other._row(i)):
+                    merged[j] = merged.get(j, 0.0) + sign * x
+                yield sorted(merged.items())
+
+        return CSRMatrix._from_rows(self.rows, self.cols, rows())
+
+    def _add_dense(self, other: Matrix, sign: float) -> Matrix:
+        """Returns other + sign * self."""
+        if self.shape != other.shape:
+            raise ValueError("The sizes of the matrices must match.")
+        result = other.copy()
+        out = result.data
+        for i in range(self.rows):
+            base = i * self.cols
+            for j, x in zip(*self._row(i)):
+                out[base + j] += sign * x
+        return result
+
+    def __add__(self, other: Union["CSRMatrix", Matrix]) -> Any:
+        if isinstance(other, CSRMatrix):
+            return self._combine(other, 1.0)
+        if isinstance(other, Matrix):
+            return self._add_dense(other, 1.0)
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other: Union["CSRMatrix", Matrix]) -> Any:
+        if isinstance(other, CSRMatrix):
+            return self._combine(other, -1.0)
+        if isinstance(other, Matrix):
+            return self._add_dense(-other, 1.0)
+        return NotImplemented
+
+    def __rsub__(self, other: Matrix) -> Any:
+        if isinstance(other, Matrix):
+            return self._add_dense(other, -1.0)
+        return NotImplemented
+
+    def __mul__(self, k: Number) -> "CSRMatrix":
+        if not isinstance(k, (int, float)):
+            return NotImplemented
+        if not k:
+            return CSRMatrix(self.rows, self.cols, [0] * (self.rows + 1), (), ())
+        return CSRMatrix(
+            self.rows, self.cols, self.indptr, self.indices, [x * k for x in self.data]
+        )
+
+    __rmul__ = __mul__
+
+    def __neg__(self) -> "CSRMatrix":
+        return self * -1
+
+    def __matmul__(self, other: Union["CSRMatrix", Matrix]) -> Any:
+        if not isinstance(other, (CSRMatrix, Matrix)):
+            return NotImplemented
+        if self.cols != other.rows:
+            raise ValueError(
+                "The number of columns of the first matrix must match the number of rows of the second matrix."
+            )
+        if isinstance(other, CSRMatrix):
+            return self._multiply_sparse(other)
+        return self._multiply_dense(other)
+
+    def __rmatmul__(self, other: Matrix) -> Any:
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        # A @ S = (S.T @ A.T).T
+        return (self.transpose() @ other.T).T.copy()
+
+    def _multiply_sparse(self, other: "CSRMatrix") -> "CSRMatrix":
+        """
+        Gustavson's algorithm: row i of the product is the sum of the rows k
+        of ``other`` scaled by the nonzeros (i, k) of this matrix.
+        """
+
+        def rows() -> Iterable[List[Tuple[int, float]]]:
+            for i in range(self.rows):
+                accumulator: Dict[int, float] = {}
+                for k, x in zip(*self._row(i)):
+                    for j, y in zip(*other._row(k)):
+                        accumulator[j] = accumulator.get(j, 0.0) + x * y
+                yield sorted(accumulator.items())
+
+        return CSRMatrix._from_rows(self.rows, other.cols, rows())
+
+    def _multiply_dense(self, other: Matrix) -> Matrix:
+        """Computes every row of the product from the rows of ``other`` it needs."""
+        n, m = self.rows, other.cols
+        result = Matrix(n, m)
+        if numpy is not None:
+            dense = other.to_numpy()
+            out = result.to_numpy()
+            indices = numpy.frombuffer(self.indices, dtype=numpy.int64)
+            data = numpy.frombuffer(self.data, dtype=numpy.float64)
+            for i in range(n):
+                start, stop = self.indptr[i], self.indptr[i + 1]
+                if start < stop:
+                    numpy.matmul(
+                        data[start:stop], dense[indices[start:stop]], out=out[i]
+                    )
+            return result
+        for i in range(n):
+            row = [0.0] * m
+            for k, x in zip(*self._row(i)):
+                row = [total + x * y for total, y in zip(row, other.row(k))]
+            result.data[i * m : (i + 1) * m] = array("d", row)
+        return result
@@ -1,61 +1,1372 @@
+import asyncio
+import bisect
+import heapq
+import itertools
+import math
+import multiprocessing
+import os
+import pickle
+import random
 import threading
-from typing import List, Callable, Tuple
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
+from multiprocessing import resource_tracker, shared_memory
+from queue import Full, SimpleQueue
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 
+BeforeHook = Callable[[Callable[[], Any]], None]
+AfterHook = Callable[[Callable[[], Any], Optional[BaseException]], None]
 
-class ThreadPool:
-    def __init__(self, num_threads: int) -> None:
+
+class _Task:
+    """A queued unit of work: a callable, an optional future and deadline."""
+
+    __slots__ = ("fn", "future", "deadline", "enqueued_at")
+
+    def __init__(
+        self,
+        fn: Callable[[], Any],
+        future: Optional[Future] = None,
+        deadline: Optional[float] = None,
+    ) -> None:
+        self.fn = fn
+        self.future = future
+        self.deadline = deadline
+        self.enqueued_at = 0.0
+
+    def start(self) -> bool:
+        """Marks the future as running. Returns False if it was cancelled."""
+        return self.future is None or self.future.set_running_or_notify_cancel()
+
+    def run(self) -> Optional[BaseException]:
+        """
+        Runs the callable and resolves the future, if any. An exception raised
+        by the callable is returned instead of being propagated.
+        """
+        try:
+            result = self.fn()
+        except BaseException as exc:
+            if self.future is not None:
+                self.future.set_exception(exc)
+            return exc
+        if self.future is not None:
+            self.future.set_result(result)
+        return None
+
+    def cancel(self) -> None:
+        """Cancels the future of a task that will never run."""
+        if self.future is not None:
+            self.future.cancel()
+
+    def expire(self) -> None:
+        """Reports the task as expired through its future instead of running it."""
+        future = self.future
+        if future is not None and future.set_running_or_notify_cancel():
+            future.set_exception(
+                TimeoutError("The task expired before it could be started.")
+            )
+
+
+class _TaskQueue:
+    """
+    Heap-based scheduler behind ThreadPool: a FIFO deque per priority level
+    and a heap of the levels that currently hold tasks. Lower priority values
+    run first. Tasks of one priority are pushed and popped in O(1), only a
+    new level costs O(log levels).
+    """
+
+    def __init__(self) -> None:
+        self._levels: Dict[int, Deque[_Task]] = {}
+        self._heap: List[int] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _level(self, priority: int) -> Deque[_Task]:
+        level = self._levels.get(priority)
+        if level is None:
+            level = self._levels[priority] = deque()
+            heapq.heappush(self._heap, priority)
+        return level
+
+    def append(self, task: _Task, priority: int = 0) -> None:
+        self._level(priority).append(task)
+        self._size += 1
+
+    def extend(self, tasks: List[_Task], priority: int = 0) -> None:
+        self._level(priority).extend(tasks)
+        self._size += len(tasks)
+
+    def popleft(self) -> _Task:
+        """
+        Removes and returns the oldest task of the most urgent level.
+
+        :raises IndexError: If the queue is empty.
+        """
+        priority = self._heap[0]
+        level = self._levels[priority]
+        task = level.popleft()
+        self._size -= 1
+        if not level:
+            heapq.heappop(self._heap)
+            del self._levels[priority]
+        return task
+
+    def popleft_level(self, count: int) -> List[_Task]:
+        """
+        Removes and returns up to ``count`` oldest tasks of the most urgent
+        level, never mixing priorities.
+
+        :raises IndexError: If the queue is empty.
+        """
+        priority = self._heap[0]
+        level = self._levels[priority]
+        tasks = [level.popleft() for _ in range(min(count, len(level)))]
+        self._size -= len(tasks)
+        if not level:
+            heapq.heappop(self._heap)
+            del self._levels[priority]
+        return tasks
+
+    def clear(self) -> Iterator[_Task]:
+        """Empties the queue and returns an iterator over the removed tasks."""
+        levels = [self._levels[priority] for priority in sorted(self._levels)]
+        self._levels = {}
+        self._heap = []
+        self._size = 0
+        return itertools.chain.from_iterable(levels)
+
+    def drop_oldest(self) -> _Task:
+        """
+        Removes and returns the oldest task of the least urgent level.
+
+        :raises IndexError: If the queue is empty.
+        """
+        priority = max(self._heap)
+        level = self._levels[priority]
+        task = level.popleft()
+        self._size -= 1
+        if not level:
+            self._heap.remove(priority)
+            heapq.heapify(self._heap)
+            del self._levels[priority]
+        return task
+
+
+class Histogram:
+    """
+    Histogram of durations in seconds. Buckets grow exponentially from
+    10 microseconds to about 80 seconds; longer values go to the last bucket.
+    """
+
+    BOUNDS = tuple(1e-5 * 2**i for i in range(24))
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, value: float) -> None:
+        """Adds a duration to the histogram."""
+        self.counts[bisect.bisect_left(self.BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: "Histogram") -> None:
+        """Adds all the durations recorded by another histogram."""
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.total += other.total
+
+    @property
+    def mean(self) -> float:
+        """Mean duration, or 0 for an empty histogram."""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """
+        Returns the upper bound of the bucket holding the q-th percentile.
+
+        :param q: Percentile in the range (0, 100].
+        """
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.BOUNDS + (math.inf,), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+class PoolMetrics(NamedTuple):
+    """A snapshot of the runtime metrics of a ThreadPool."""
+
+    queue_depth: int
+    workers: int
+    busy_workers: int
+    tasks_run: int
+    tasks_expired: int
+    tasks_dropped: int
+    exceptions: int
+    wait_time: Histogram
+    run_time: Histogram
+
+
+class _WorkerStats:
+    """Counters owned by a single worker, so updating them needs no lock."""
+
+    __slots__ = ("run", "expired", "exceptions", "busy", "wait_time", "run_time")
+
+    def __init__(self) -> None:
+        self.run = 0
+        self.expired = 0
+        self.exceptions = 0
+        self.busy = 0
+        self.wait_time = Histogram()
+        self.run_time = Histogram()
+
+    def merge(self, other: "_WorkerStats") -> None:
+        """Adds the counters of another worker."""
+        self.run += other.run
+        self.expired += other.expired
+        self.exceptions += other.exceptions
+        self.busy += other.busy
+        self.wait_time.merge(other.wait_time)
+        self.run_time.merge(other.run_time)
+
+
+def _run_chunk(fn: Callable[[Any], Any], chunk: List[Any]) -> List[Any]:
+    """Applies a function to every item of a chunk."""
+    return [fn(item) for item in chunk]
+
+
+def _iter_chunk_results(
+    submit_chunks: Callable[[List[List[Any]]], List[Future]],
+    chunks: Iterator[List[Any]],
+    window: int,
+    ordered: bool,
+) -> Iterator[Any]:
+    """
+    Generator behind the map() methods of the pools: keeps up to ``window``
+    chunks in flight and yields their results in order or as they complete.
+
+    :param submit_chunks: Submits a batch of chunks at once and returns
+        a future for the list of results of every chunk.
+    """
+    pending: Deque[Future] = deque()
+    completed: "SimpleQueue[Future]" = SimpleQueue()
+
+    def submit(count: int) -> None:
+        batch = list(itertools.islice(chunks, count))
+        if not batch:
+            return
+        for future in submit_chunks(batch):
+            if not ordered:
+                future.add_done_callback(completed.put)
+            pending.append(future)
+
+    try:
+        submit(window)
+        while pending:
+            if ordered:
+                future = pending.popleft()
+            else:
+                future = completed.get()
+                pending.remove(future)
+            results = future.result()
+            submit(1)
+            yield from results
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _drain(queue: Deque[_Task]) -> List[_Task]:
+    """Empties a deque that its owner may still be popping from."""
+    tasks = []
+    while True:
+        try:
+            tasks.append(queue.popleft())
+        except IndexError:
+            return tasks
+
+
+class _AsyncBridge(ABC):
+    """
+    Awaitable front end shared by the pools. Results are delivered to the
+    running event loop by done callbacks of the futures, so no thread polls.
+    """
+
+    @abstractmethod
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Schedules ``fn(*args, **kwargs)`` and returns a future for its result."""
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Runs ``fn(*args, **kwargs)`` in the pool and awaits its result without
+        blocking the event loop, also when a bounded queue is full.
+
+        :param fn: A callable to be executed by the pool.
+        :return: The result of the call.
+        """
+        call = partial(fn, *args, **kwargs) if args or kwargs else fn
+        future = self._try_submit(call)
+        if future is None:
+            # Waiting for room, or running the task under "caller_runs",
+            # happens in an executor thread instead of the event loop.
+            loop = asyncio.get_running_loop()
+            future = await loop.run_in_executor(None, self.submit, call)
+        return await asyncio.wrap_future(future)
+
+    def _try_submit(self, fn: Callable[[], Any]) -> Optional[Future]:
+        """
+        Like submit(), but returns None instead of blocking or running the
+        task in the calling thread.
+        """
+        return self.submit(fn)
+
+    async def completions(self, futures: Iterable[Future]) -> AsyncIterator[Future]:
+        """
+        Asynchronously yields the given futures as they complete.
+
+        :param futures: Futures returned by submit() or schedule().
+        :return: An async iterator over the completed futures.
+        """
+        loop = asyncio.get_running_loop()
+        completed: "asyncio.Queue[Future]" = asyncio.Queue()
+
+        def on_done(future: Future) -> None:
+            try:
+                loop.call_soon_threadsafe(completed.put_nowait, future)
+            except RuntimeError:
+                # The event loop has been closed in the meantime
+                pass
+
+        pending = list(futures)
+        for future in pending:
+            future.add_done_callback(on_done)
+        for _ in range(len(pending)):
+            yield await completed.get()
+
+
+class ThreadPool(_AsyncBridge):
+    REJECT_POLICIES = ("block", "raise", "drop_oldest", "caller_runs")
+
+    def __init__(
+        self,
+        num_threads: int,
+        work_stealing: bool = False,
+        max_threads: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        spawn_threshold: int = 0,
+        max_queue_size: int = 0,
+        reject_policy: str = "block",
+        queue_timeout: Optional[float] = None,
+        collect_metrics: bool = False,
+    ) -> None:
         """
         Initializes the thread pool with a specified number of threads.
 
-        :param num_threads: Number of threads in the pool.
+        :param num_threads: Number of threads in the pool. For an elastic pool
+            this is the minimum number of threads that are always kept.
+        :param max_threads: Upper bound for the number of threads. When it is
+            above ``num_threads``, a new thread is spawned whenever more than
+            ``spawn_threshold`` queued tasks cannot be taken by idle threads.
+            Defaults to ``num_threads``, i.e. a fixed-size pool.
+        :param idle_timeout: Seconds after which an idle thread beyond
+            ``num_threads`` retires. None keeps spawned threads forever.
+        :param spawn_threshold: Queue depth that must be exceeded to spawn.
+        :param max_queue_size: Capacity of the shared queue. If set to 0
+            (default), the queue is unbounded.
+        :param reject_policy: What a producer does when the queue is full:
+            ``"block"`` waits for free space, ``"raise"`` raises queue.Full,
+            ``"drop_oldest"`` cancels the oldest task of the least urgent
+            priority, and ``"caller_runs"`` runs the task in the calling
+            thread. Tasks that workers put into their local deques in
+            work-stealing mode are never rejected. run() waits or runs the
+            task in an executor thread, never in the event loop.
+        :param queue_timeout: Longest time in seconds a blocked producer
+            waits before queue.Full is raised. None waits forever.
+        :param collect_metrics: If True, the wait and run times of tasks are
+            recorded into the histograms reported by metrics(). Counters and
+            gauges are always maintained.
+        :param work_stealing: If True, every worker owns a local deque. Tasks
+            enqueued from inside a worker go to its local deque without taking
+            the pool lock, and idle workers steal from the deques of others.
+            Local deques ignore priorities, so only tasks of the default
+            priority are enqueued there, and a worker refills its deque
+            only with tasks of the most urgent level of the shared queue.
         """
+        if max_threads is None:
+            max_threads = num_threads
+        if max_threads < num_threads:
+            raise ValueError("max_threads must not be less than num_threads.")
+        if max_queue_size < 0:
+            raise ValueError("max_queue_size must not be negative.")
+        if reject_policy not in self.REJECT_POLICIES:
+            raise ValueError(f"Unknown reject policy '{reject_policy}'.")
         self.num_threads = num_threads
-        self.tasks: List[Callable[[], None]] = []
-        self.threads = []
-        self.lock = threading.Lock()
+        self.max_threads = max_threads
+        self.idle_timeout = idle_timeout
+        self.spawn_threshold = spawn_threshold
+        self.work_stealing = work_stealing
+        self.max_queue_size = max_queue_size
+        self.reject_policy = reject_policy
+        self.queue_timeout = queue_timeout
+        self.collect_metrics = collect_metrics
+        self.tasks_dropped = 0
+        self.tasks = _TaskQueue()
+        self.threads: List[threading.Thread] = []
+        self.lock = self._make_lock()
         self.condition = threading.Condition(self.lock)
+        self._not_full = threading.Condition(self.lock)
+        self._blocked = 0
         self._shutdown = False
+        self._local = threading.local()
+        self._local_queues: List[Deque[_Task]] = []
+        self._idle = 0
+        self._live = 0
+        self._worker_stats: List[_WorkerStats] = []
+        self._retired_stats = _WorkerStats()
+        self._caller_stats = _WorkerStats()
+        self._before_hooks: List[BeforeHook] = []
+        self._after_hooks: List[AfterHook] = []
 
         # Start worker threads
-        for _ in range(self.num_threads):
-            thread = threading.Thread(target=self._worker)
-            thread.daemon = True
-            thread.start()
-            self.threads.append(thread)
+        with self.condition:
+            for _ in range(self.num_threads):
+                self._spawn_worker()
+
+    @property
+    def worker_count(self) -> int:
+        """Number of worker threads that are currently alive."""
+        return self._live
+
+    @property
+    def tasks_run(self) -> int:
+        """Number of tasks executed by the workers so far."""
+        return self._total_stats().run
+
+    @property
+    def tasks_expired(self) -> int:
+        """Number of tasks dropped because their deadline had passed."""
+        return self._total_stats().expired
+
+    def _total_stats(self) -> _WorkerStats:
+        """Sums the counters of all the workers, past and present."""
+        total = _WorkerStats()
+        total.merge(self._retired_stats)
+        total.merge(self._caller_stats)
+        for stats in list(self._worker_stats):
+            total.merge(stats)
+        return total
+
+    def metrics(self) -> PoolMetrics:
+        """
+        Returns a snapshot of the pool metrics: queue depth (including local
+        deques), live and busy workers, task outcome counters, the number of
+        exceptions raised by tasks and, if ``collect_metrics`` is enabled,
+        histograms of queue wait and run times.
+        """
+        total = self._total_stats()
+        depth = len(self.tasks) + sum(len(queue) for queue in self._local_queues)
+        return PoolMetrics(
+            queue_depth=depth,
+            workers=self._live,
+            busy_workers=total.busy,
+            tasks_run=total.run,
+            tasks_expired=total.expired,
+            tasks_dropped=self.tasks_dropped,
+            exceptions=total.exceptions,
+            wait_time=total.wait_time,
+            run_time=total.run_time,
+        )
+
+    def add_hooks(
+        self, before: Optional[BeforeHook] = None, after: Optional[AfterHook] = None
+    ) -> None:
+        """
+        Registers tracing hooks that run in the worker thread around every task.
+
+        :param before: Called with the task callable before it starts.
+        :param after: Called with the task callable and the exception it raised,
+            or None if it succeeded.
+        """
+        with self.condition:
+            if before is not None:
+                self._before_hooks = self._before_hooks + [before]
+            if after is not None:
+                self._after_hooks = self._after_hooks + [after]
+
+    def _make_lock(self) -> Any:
+        """
+        Creates the lock guarding the shared queue.
+        Subclasses may override it, e.g. to count lock acquisitions.
+        """
+        return threading.Lock()
+
+    def _spawn_worker(self) -> None:
+        """
+        Starts a new worker thread. Must be called with the lock held.
+        """
+        thread = threading.Thread(target=self._worker)
+        thread.daemon = True
+        self._live += 1
+        # A starting worker counts as idle until it registers itself
+        self._idle += 1
+        self.threads.append(thread)
+        thread.start()
+
+    def _retire_worker(
+        self, stats: _WorkerStats, local_queue: Optional[Deque[_Task]]
+    ) -> None:
+        """
+        Forgets a worker that retired after being idle. Must be called with
+        the lock held.
+        """
+        self.threads.remove(threading.current_thread())
+        self._worker_stats.remove(stats)
+        self._retired_stats.merge(stats)
+        if local_queue is not None:
+            self._local_queues = [
+                queue for queue in self._local_queues if queue is not local_queue
+            ]
 
     def _worker(self) -> None:
         """
         Worker method that runs in each thread. Waits for tasks and executes them.
         """
+        stats = _WorkerStats()
+        local_queue: Optional[Deque[_Task]] = None
+        if self.work_stealing:
+            local_queue = deque()
+            self._local.queue = local_queue
+        with self.condition:
+            self._idle -= 1
+            self._worker_stats.append(stats)
+            if local_queue is not None:
+                # Copy on write: thieves iterate over the list without the lock
+                self._local_queues = self._local_queues + [local_queue]
+
         while True:
-            with self.condition:
-                while not self.tasks and not self._shutdown:
-                    self.condition.wait()
-                if self._shutdown and not self.tasks:
-                    break
-                task = self.tasks.pop(0)
-            task()
+            task = self._next_task(local_queue)
+            if task is None:
+                with self.condition:
+                    if not self._shutdown:
+                        self._retire_worker(stats, local_queue)
+                break
+            self._execute(task, stats)
 
-    def enqueue(self, task: Callable[[], None]) -> None:
+    def _execute(self, task: _Task, stats: _WorkerStats) -> None:
         """
-        Adds a task to the queue. The task will be executed by an available thread.
+        Runs a task with the hooks around it and records the outcome in
+        ``stats``. Exceptions raised by the task or the hooks are counted and
+        never leave this method, so they cannot kill the worker.
+        """
+        if task.deadline is not None and time.monotonic() > task.deadline:
+            task.expire()
+            stats.expired += 1
+            return
+        if not task.start():
+            return
 
-        :param task: A function to be executed by the thread pool.
+        stats.busy += 1
+        started = 0.0
+        if self.collect_metrics:
+            started = time.perf_counter()
+            stats.wait_time.record(started - task.enqueued_at)
+        try:
+            for before in self._before_hooks:
+                before(task.fn)
+        except Exception:
+            stats.exceptions += 1
+        error = task.run()
+        if error is not None:
+            stats.exceptions += 1
+        if self.collect_metrics:
+            stats.run_time.record(time.perf_counter() - started)
+        try:
+            for after in self._after_hooks:
+                after(task.fn, error)
+        except Exception:
+            stats.exceptions += 1
+        stats.run += 1
+        stats.busy -= 1
+
+    def _next_task(self, local_queue: Optional[Deque[_Task]]) -> Optional[_Task]:
+        """
+        Returns the next task for a worker or None once the pool is shut down
+        and no work is left, or once the worker has been idle for
+        ``idle_timeout`` while the pool is above its minimum size.
+        In work-stealing mode the local deque and the
+        deques of other workers are tried first without taking the lock.
         """
+        if local_queue is not None:
+            try:
+                return local_queue.pop()
+            except IndexError:
+                pass
+            task = self._steal(local_queue)
+            if task is not None:
+                return task
+
         with self.condition:
-            if not self._shutdown:
-                self.tasks.append(task)
+            timed_out = False
+            while True:
+                if self.tasks:
+                    if self._blocked:
+                        self._not_full.notify_all()
+                    if local_queue is not None:
+                        return self._take_batch(local_queue)
+                    return self.tasks.popleft()
+                # Announce idleness before the last scan, so a worker that
+                # pushes to its local deque afterwards knows to notify us.
+                self._idle += 1
+                if local_queue is not None:
+                    task = self._steal(local_queue)
+                    if task is not None:
+                        self._idle -= 1
+                        return task
+                can_retire = self._live > self.num_threads
+                if self._shutdown or (timed_out and can_retire):
+                    self._idle -= 1
+                    if not self._shutdown:
+                        self._live -= 1
+                    return None
+                timeout = self.idle_timeout if can_retire else None
+                timed_out = not self.condition.wait(timeout)
+                self._idle -= 1
+
+    def _take_batch(self, local_queue: Deque[_Task]) -> _Task:
+        """
+        Takes the oldest task of the shared queue and moves a fair share of
+        the following ones of the same priority into the local deque of a
+        worker, so that one lock acquisition feeds several tasks. The owner
+        pops from the right end, so the batch is pushed in reverse to keep it
+        in FIFO order. Must be called with the lock held.
+        """
+        share = min(len(self.tasks) // (len(self._local_queues) or 1), 64)
+        batch = self.tasks.popleft_level(max(share, 1))
+        local_queue.extend(reversed(batch[1:]))
+        return batch[0]
+
+    def _steal(self, own_queue: Deque[_Task]) -> Optional[_Task]:
+        """
+        Takes the oldest task from the local deque of another worker.
+        Owners pop from the opposite end, so thieves rarely touch hot tasks.
+        """
+        queues = self._local_queues
+        count = len(queues)
+        if count < 2:
+            return None
+        start = random.randrange(count)
+        for i in range(count):
+            queue = queues[(start + i) % count]
+            if queue is own_queue:
+                continue
+            try:
+                return queue.popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _put(self, task: _Task, priority: int = 0, wait: bool = True) -> bool:
+        """
+        Places a task either into the local deque of the calling worker
+        (work-stealing mode) or into the shared queue.
+
+        :param wait: If False, a full queue whose policy would block the
+            producer or run the task in it rejects the task instead.
+        :return: False if the task was rejected.
+        :raises RuntimeError: If the pool has been disposed.
+        """
+        if self.collect_metrics:
+            task.enqueued_at = time.perf_counter()
+        local_queue = getattr(self._local, "queue", None)
+        if local_queue is not None and priority == 0 and not self._shutdown:
+            local_queue.append(task)
+            if self._idle:
+                with self.condition:
+                    self.condition.notify()
+            return True
+
+        with self.condition:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit tasks after the pool is disposed.")
+            admitted = True
+            if self.max_queue_size and len(self.tasks) >= self.max_queue_size:
+                if not wait and self.reject_policy in ("block", "caller_runs"):
+                    return False
+                admitted = self._make_room(self._queue_deadline())
+            if admitted:
+                self.tasks.append(task, priority)
                 self.condition.notify()
+                self._maybe_spawn()
+        if not admitted:
+            self._run_in_caller([task])
+        return True
 
-    def dispose(self) -> None:
+    def _put_many(self, tasks: List[_Task], priority: int = 0) -> None:
         """
-        Shuts down the thread pool. It waits for all current tasks to complete,
-        but no new tasks will be accepted.
+        Places several tasks into a queue with a single lock acquisition.
+
+        :raises RuntimeError: If the pool has been disposed.
         """
+        if self.collect_metrics:
+            now = time.perf_counter()
+            for task in tasks:
+                task.enqueued_at = now
+        local_queue = getattr(self._local, "queue", None)
+        if local_queue is not None and priority == 0 and not self._shutdown:
+            local_queue.extend(tasks)
+            if self._idle:
+                with self.condition:
+                    self.condition.notify(len(tasks))
+            return
+
+        with self.condition:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit tasks after the pool is disposed.")
+            if not self.max_queue_size:
+                self.tasks.extend(tasks, priority)
+                self.condition.notify(len(tasks))
+                self._maybe_spawn()
+                return
+
+            deadline = self._queue_deadline()
+            rejected = []
+            for task in tasks:
+                if len(self.tasks) >= self.max_queue_size:
+                    # Let the workers start on what has been pushed so far
+                    self.condition.notify(len(self.tasks))
+                    if not self._make_room(deadline):
+                        rejected.append(task)
+                        continue
+                self.tasks.append(task, priority)
+            self.condition.notify(len(self.tasks))
+            self._maybe_spawn()
+        if rejected:
+            self._run_in_caller(rejected)
+
+    def _queue_deadline(self) -> Optional[float]:
+        """Returns the moment a blocked producer gives up waiting."""
+        if self.queue_timeout is None:
+            return None
+        return time.monotonic() + self.queue_timeout
+
+    def _make_room(self, deadline: Optional[float]) -> bool:
+        """
+        Applies the reject policy to a full shared queue. Must be called with
+        the lock held. Returns False if the caller has to run the task itself.
+
+        :raises queue.Full: If the policy is "raise" or a blocked producer
+            runs out of time.
+        :raises RuntimeError: If the pool is disposed while waiting.
+        """
+        if self.reject_policy == "raise":
+            raise Full("The task queue is full.")
+        if self.reject_policy == "caller_runs":
+            return False
+        if self.reject_policy == "drop_oldest":
+            self.tasks.drop_oldest().cancel()
+            self.tasks_dropped += 1
+            return True
+
+        self._blocked += 1
+        try:
+            while len(self.tasks) >= self.max_queue_size and not self._shutdown:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    raise Full("Timed out waiting for free space in the task queue.")
+                self._not_full.wait(timeout)
+        finally:
+            self._blocked -= 1
+        if self._shutdown:
+            raise RuntimeError("Cannot submit tasks after the pool is disposed.")
+        return True
+
+    def _run_in_caller(self, tasks: List[_Task]) -> None:
+        """
+        Runs rejected tasks in the calling thread, which throttles the producer.
+        """
+        stats = _WorkerStats()
+        for task in tasks:
+            self._execute(task, stats)
+        with self.condition:
+            self._caller_stats.merge(stats)
+
+    def _maybe_spawn(self) -> None:
+        """
+        Spawns workers while more than ``spawn_threshold`` queued tasks cannot
+        be picked up by idle workers and the pool is below ``max_threads``,
+        so a large batch grows the pool at once. A starting worker counts as
+        idle. Must be called with the lock held.
+        """
+        while (
+            self._live < self.max_threads
+            and len(self.tasks) - self._idle > self.spawn_threshold
+        ):
+            self._spawn_worker()
+
+    def enqueue(
+        self,
+        task: Callable[[], None],
+        priority: int = 0,
+        deadline: Optional[float] = None,
+    ) -> None:
+        """
+        Adds a task to the queue. The task will be executed by an available thread.
+
+        :param task: A function to be executed by the thread pool.
+        :param priority: Tasks with lower values are started first.
+        :param deadline: A ``time.monotonic()`` timestamp. If the task has not
+            been started by then, it is dropped and counted as expired.
+        """
+        try:
+            self._put(_Task(task, deadline=deadline), priority)
+        except RuntimeError:
+            pass
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """
+        Schedules ``fn(*args, **kwargs)`` and returns a future for its result.
+
+        The returned future supports ``result(timeout)``, ``exception()`` and
+        ``add_done_callback``. Exceptions raised by ``fn`` are stored in the
+        future instead of being propagated into the worker thread.
+
+        :param fn: A callable to be executed by the thread pool.
+        :return: A future that will hold the result of the call.
+        """
+        task, future = self._make_task(
+            partial(fn, *args, **kwargs) if args or kwargs else fn
+        )
+        self._put(task)
+        return future
+
+    def _try_submit(self, fn: Callable[[], Any]) -> Optional[Future]:
+        task, future = self._make_task(fn)
+        return future if self._put(task, wait=False) else None
+
+    def schedule(
+        self,
+        task: Callable[[], Any],
+        priority: int = 0,
+        deadline: Optional[float] = None,
+    ) -> Future:
+        """
+        Like enqueue(), but returns a future for the result of the task.
+        A task that expires resolves its future with a TimeoutError.
+
+        :param task: A function to be executed by the thread pool.
+        :param priority: Tasks with lower values are started first.
+        :param deadline: A ``time.monotonic()`` timestamp after which the task
+            is no longer started.
+        :return: A future that will hold the result of the task.
+        """
+        item, future = self._make_task(task, deadline)
+        self._put(item, priority)
+        return future
+
+    def _make_task(
+        self, fn: Callable[[], Any], deadline: Optional[float] = None
+    ) -> Tuple[_Task, Future]:
+        """
+        Wraps a call into a task that resolves the returned future.
+        """
+        future: Future = Future()
+        return _Task(fn, future, deadline), future
+
+    def enqueue_many(
+        self,
+        tasks: Iterable[Callable[[], None]],
+        batch_size: int = 1024,
+        priority: int = 0,
+    ) -> None:
+        """
+        Adds many tasks to the queue. The iterable is consumed lazily in
+        batches, and every batch is pushed with a single lock acquisition.
+
+        :param tasks: Functions to be executed by the thread pool.
+        :param batch_size: Number of tasks pushed per lock acquisition.
+        :param priority: Priority shared by all the tasks.
+        """
+        if batch_size < 1:
+            raise ValueError("The batch size must be positive.")
+        iterator = iter(tasks)
+        while True:
+            batch = [_Task(task) for task in itertools.islice(iterator, batch_size)]
+            if not batch:
+                return
+            try:
+                self._put_many(batch, priority)
+            except RuntimeError:
+                return
+
+    def map(
+        self,
+        fn: Callable[[Any], Any],
+        iterable: Iterable[Any],
+        chunksize: int = 1,
+        ordered: bool = True,
+        priority: int = 0,
+    ) -> Iterator[Any]:
+        """
+        Applies ``fn`` to every item of ``iterable`` in the pool and lazily
+        yields the results.
+
+        Items are grouped into chunks of ``chunksize`` that run as a single
+        task. Only a bounded window of chunks is in flight at any time, so
+        the iterable is never materialized, and newly read chunks are pushed
+        with a single lock acquisition.
+
+        :param fn: A function of one argument.
+        :param iterable: Arguments for ``fn``; may be a generator.
+        :param chunksize: Number of items processed by one task.
+        :param ordered: If True, results follow the input order; otherwise
+            chunks are yielded as soon as they complete.
+        :param priority: Priority of the chunk tasks.
+        :return: An iterator over the results.
+        :raises ValueError: If chunksize is not positive.
+        """
+        if chunksize < 1:
+            raise ValueError("The chunk size must be positive.")
+        iterator = iter(iterable)
+        chunks = iter(lambda: list(itertools.islice(iterator, chunksize)), [])
+        # Enough chunks to keep an elastic pool busy at its full size
+        window = 2 * max(self.max_threads, 1)
+
+        def submit_chunks(batch: List[List[Any]]) -> List[Future]:
+            tasks, futures = [], []
+            for chunk in batch:
+                task, future = self._make_task(partial(_run_chunk, fn, chunk))
+                tasks.append(task)
+                futures.append(future)
+            self._put_many(tasks, priority)
+            return futures
+
+        return _iter_chunk_results(submit_chunks, chunks, window, ordered)
+
+    def dispose(
+        self,
+        wait: bool = True,
+        cancel_pending: bool = False,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """
+        Shuts down the thread pool. No new tasks will be accepted.
+
+        :param wait: If True, block until the workers have finished.
+        :param cancel_pending: If True, tasks that have not started yet are
+            removed from the queues and their futures are cancelled, so only
+            the running tasks are waited for. Otherwise the backlog is drained.
+        :param timeout: Longest time in seconds to wait for the workers.
+            None waits for as long as it takes.
+        :return: True if all the workers have finished.
+        """
+        cancelled: List[Iterable[_Task]] = []
         with self.condition:
             self._shutdown = True
+            if cancel_pending:
+                cancelled.append(self.tasks.clear())
+                for local_queue in self._local_queues:
+                    cancelled.append(_drain(local_queue))
             self.condition.notify_all()
+            self._not_full.notify_all()
+
+        for task in itertools.chain.from_iterable(cancelled):
+            task.cancel()
+
+        if wait:
+            # Wait for all threads to complete
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for thread in list(self.threads):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                thread.join(None if remaining is None else max(remaining, 0))
+        return not any(thread.is_alive() for thread in self.threads)
+
+    def __enter__(self) -> "ThreadPool":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.dispose()
+
+
+class SharedBuffer:
+    """
+    A block of shared memory that is passed to worker processes by name
+    instead of being pickled. Use it for large arguments of ProcessPool tasks;
+    a worker sees the same bytes through ``buf`` without copying them.
+    """
+
+    def __init__(self, size: int, name: Optional[str] = None) -> None:
+        """
+        Creates a new block of ``size`` bytes, or attaches to the existing
+        block ``name`` created by another process.
+        """
+        self.size = size
+        self._owner = name is None
+        self._memory = shared_memory.SharedMemory(
+            name=name, create=self._owner, size=size
+        )
+
+    @classmethod
+    def from_data(cls, data: Any) -> "SharedBuffer":
+        """Creates a block holding a copy of a bytes-like object."""
+        view = memoryview(data).cast("B")
+        buffer = cls(view.nbytes)
+        buffer.buf[:] = view
+        return buffer
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    @property
+    def buf(self) -> memoryview:
+        """A writable view of the block."""
+        view = self._memory.buf
+        if view is None:
+            raise ValueError("The shared buffer has been released.")
+        return view[: self.size]
+
+    def release(self) -> None:
+        """
+        Closes the block and frees it if this process has created it.
+        A worker may release a block it no longer needs to unmap it.
+        """
+        if _attached_buffers.get(self.name) is self:
+            del _attached_buffers[self.name]
+        try:
+            self._memory.close()
+        except BufferError:
+            # Views of the block are still alive; the mapping goes with them
+            pass
+        if self._owner:
+            self._owner = False
+            self._memory.unlink()
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _attach_shared_buffer, (self.name, self.size)
+
+
+_attached_buffers: Dict[str, SharedBuffer] = {}
+
+
+def _attach_shared_buffer(name: str, size: int) -> SharedBuffer:
+    """Attaches a worker process to a shared block, once per block."""
+    buffer = _attached_buffers.get(name)
+    if buffer is None:
+        buffer = _attached_buffers[name] = SharedBuffer(size, name)
+    return buffer
+
+
+def _process_worker(tasks: Any, results: Any, cancelled: Any) -> None:
+    """
+    Main loop of a ProcessPool worker. Receives pickled batches of
+    ``(task_id, fn, args, kwargs)`` and sends back the outcomes of the tasks
+    that have an id; fire-and-forget tasks have None instead. Once
+    ``cancelled`` is set, the remaining batches are skipped and the ids of
+    their tasks are sent back without an outcome.
+    """
+    while True:
+        payload = tasks.get()
+        if payload is None:
+            break
+        batch = pickle.loads(payload)
+        if cancelled.is_set():
+            skipped = [
+                (task_id, None, None) for task_id, *_ in batch if task_id is not None
+            ]
+            if skipped:
+                results.put(pickle.dumps(skipped, pickle.HIGHEST_PROTOCOL))
+            continue
+        outcomes = []
+        for task_id, fn, args, kwargs in batch:
+            try:
+                outcome = (task_id, True, fn(*args, **kwargs))
+            except BaseException as exc:
+                outcome = (task_id, False, _portable_exception(exc))
+            if task_id is not None:
+                outcomes.append(outcome)
+        if outcomes:
+            try:
+                results.put(pickle.dumps(outcomes, pickle.HIGHEST_PROTOCOL))
+            except Exception as exc:
+                error = _portable_exception(exc)
+                failed = [(task_id, False, error) for task_id, _, _ in outcomes]
+                results.put(pickle.dumps(failed, pickle.HIGHEST_PROTOCOL))
+
+
+def _portable_exception(exc: BaseException) -> BaseException:
+    """Returns the exception itself if it can be pickled, otherwise a stand-in."""
+    try:
+        pickle.dumps(exc)
+    except Exception:
+        return RuntimeError(f"{type(exc).__name__}: {exc}")
+    return exc
+
+
+class ProcessPool(_AsyncBridge):
+    def __init__(self, num_processes: int) -> None:
+        """
+        Initializes the pool with a specified number of persistent worker
+        processes. Unlike ThreadPool, tasks run in parallel regardless of the
+        GIL, so CPU-bound work scales with the number of cores. Tasks and
+        their arguments must be picklable; large buffers can be passed through
+        shared memory with share().
+
+        :param num_processes: Number of worker processes in the pool.
+        """
+        self.num_processes = num_processes
+        self.processes: List[multiprocessing.Process] = []
+        self._tasks: "multiprocessing.Queue[Optional[bytes]]" = multiprocessing.Queue()
+        self._results: "multiprocessing.Queue[Optional[bytes]]" = (
+            multiprocessing.Queue()
+        )
+        self._futures: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        self._buffers: List[SharedBuffer] = []
+        self._shutdown = False
+        self._lock = threading.Lock()
+        self._cancelled = multiprocessing.Event()
+        self._finisher: Optional[threading.Thread] = None
+
+        if os.name == "posix":
+            # Workers must share the resource tracker of the parent. Otherwise
+            # each one starts its own tracker that reports attached shared
+            # buffers as leaked and unlinks them on exit.
+            resource_tracker.ensure_running()
+
+        # Start worker processes
+        for _ in range(self.num_processes):
+            process = multiprocessing.Process(
+                target=_process_worker,
+                args=(self._tasks, self._results, self._cancelled),
+            )
+            process.daemon = True
+            process.start()
+            self.processes.append(process)
+
+        self._collector = threading.Thread(target=self._collect)
+        self._collector.daemon = True
+        self._collector.start()
+
+    def _collect(self) -> None:
+        """
+        Resolves futures with the outcomes sent back by the workers.
+        Runs in a thread of the parent process.
+        """
+        while True:
+            payload = self._results.get()
+            if payload is None:
+                break
+            for task_id, ok, value in pickle.loads(payload):
+                future = self._futures.pop(task_id)
+                if ok is None:
+                    # Skipped by a worker after dispose(cancel_pending=True)
+                    future.cancel()
+                    continue
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _send(self, batch: List[Tuple[Any, ...]]) -> None:
+        """
+        Pickles a batch of tasks in the calling thread, so that unpicklable
+        tasks fail right away, and hands it to the workers as one message.
+
+        :raises RuntimeError: If the pool has been disposed.
+        """
+        payload = pickle.dumps(batch, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit tasks after the pool is disposed.")
+            self._tasks.put(payload)
+
+    def _new_future(self) -> Tuple[int, Future]:
+        task_id = next(self._ids)
+        future: Future = Future()
+        self._futures[task_id] = future
+        return task_id, future
+
+    def enqueue(self, task: Callable[[], None]) -> None:
+        """
+        Adds a task to the queue. The task will be executed by an available process.
+
+        :param task: A picklable function to be executed by the pool.
+        """
+        try:
+            self._send([(None, task, (), {})])
+        except RuntimeError:
+            pass
+
+    def enqueue_many(
+        self, tasks: Iterable[Callable[[], None]], batch_size: int = 1024
+    ) -> None:
+        """
+        Adds many tasks to the queue. The iterable is consumed lazily and
+        every batch of tasks is transferred to a worker as one message.
+
+        :param tasks: Picklable functions to be executed by the pool.
+        :param batch_size: Number of tasks per message.
+        """
+        if batch_size < 1:
+            raise ValueError("The batch size must be positive.")
+        iterator = iter(tasks)
+        while True:
+            batch: List[Tuple[Any, ...]] = [
+                (None, task, (), {}) for task in itertools.islice(iterator, batch_size)
+            ]
+            if not batch:
+                return
+            try:
+                self._send(batch)
+            except RuntimeError:
+                return
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """
+        Schedules ``fn(*args, **kwargs)`` in a worker process and returns
+        a future for its result.
+
+        :param fn: A picklable callable to be executed by the pool.
+        :return: A future that will hold the result of the call.
+        """
+        task_id, future = self._new_future()
+        try:
+            self._send([(task_id, fn, args, kwargs)])
+        except BaseException:
+            del self._futures[task_id]
+            raise
+        return future
+
+    def map(
+        self,
+        fn: Callable[[Any], Any],
+        iterable: Iterable[Any],
+        chunksize: int = 1,
+        ordered: bool = True,
+    ) -> Iterator[Any]:
+        """
+        Applies ``fn`` to every item of ``iterable`` in the worker processes
+        and lazily yields the results. Every chunk of ``chunksize`` items is
+        transferred and executed as a single task.
+
+        :param fn: A picklable function of one argument.
+        :param iterable: Picklable arguments for ``fn``; may be a generator.
+        :param chunksize: Number of items per task.
+        :param ordered: If True, results follow the input order; otherwise
+            chunks are yielded as soon as they complete.
+        :return: An iterator over the results.
+        :raises ValueError: If chunksize is not positive.
+        """
+        if chunksize < 1:
+            raise ValueError("The chunk size must be positive.")
+        iterator = iter(iterable)
+        chunks = iter(lambda: list(itertools.islice(iterator, chunksize)), [])
+        window = 2 * max(self.num_processes, 1)
+
+        def submit_chunks(batch: List[List[Any]]) -> List[Future]:
+            futures = []
+            for chunk in batch:
+                # One message per chunk lets idle workers pick up the next one
+                futures.append(self.submit(_run_chunk, fn, chunk))
+            return futures
+
+        return _iter_chunk_results(submit_chunks, chunks, window, ordered)
+
+    def share(self, data: Any) -> SharedBuffer:
+        """
+        Copies a bytes-like object into shared memory. The returned buffer can
+        be passed to tasks as an argument; it is freed on dispose().
+        """
+        buffer = SharedBuffer.from_data(data)
+        self._buffers.append(buffer)
+        return buffer
+
+    def allocate(self, size: int) -> SharedBuffer:
+        """
+        Allocates a zero-filled shared block, e.g. for results written by
+        the tasks. It is freed on dispose().
+        """
+        buffer = SharedBuffer(size)
+        self._buffers.append(buffer)
+        return buffer
+
+    def dispose(
+        self,
+        wait: bool = True,
+        cancel_pending: bool = False,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """
+        Shuts down the pool. No new tasks will be accepted. Shared buffers are
+        freed once the workers have exited.
+
+        :param wait: If True, block until the workers have finished.
+        :param cancel_pending: If True, the workers skip the tasks they have not
+            started yet and the futures of those tasks are cancelled; tasks
+            that are already running complete normally. Otherwise the backlog
+            is drained.
+        :param timeout: Longest time in seconds to wait for the workers.
+            None waits for as long as it takes.
+        :return: True if all the workers have finished.
+        """
+        with self._lock:
+            if self._finisher is None:
+                self._shutdown = True
+                if cancel_pending:
+                    self._cancelled.set()
+                for _ in self.processes:
+                    self._tasks.put(None)
+                self._finisher = threading.Thread(target=self._finish)
+                self._finisher.daemon = True
+                self._finisher.start()
+            finisher = self._finisher
+
+        if wait:
+            finisher.join(timeout)
+        return not finisher.is_alive()
+
+    def _finish(self) -> None:
+        """
+        Waits for the workers to exit and releases the resources of the pool.
+        """
+        for process in self.processes:
+            process.join()
+        self._results.put(None)
+        self._collector.join()
+        # Only left if a worker died without reporting its tasks
+        for future in self._futures.values():
+            future.cancel()
+        for buffer in self._buffers:
+            buffer.release()
+
+    def __enter__(self) -> "ProcessPool":
+        return self
 
-        # Wait for all threads to complete
-        for thread in self.threads:
-            thread.join()
+    def __exit__(self, *args: Any) -> None:
+        self.dispose()
@@ -1,5 +1,14 @@
 import math
-from typing import List
+import numbers
+import operator
+from typing import Any, List, Sequence, Tuple, Union
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+Vectors = Sequence[Sequence[float]]
 
 
 def scalar_multiply(v1: List[float], v2: List[float]) -> float:
@@ -56,17 +65,184 @@ def angle_vectors(v1: List[float], v2: List[float]) -> float:
     ValueError: If the length of either vector is zero.
 
     """
-    length_v1 = vector_length(v1)
-    length_v2 = vector_length(v2)
+    if not v1 or not v2:
+        raise ValueError("The vector must not be empty.")
+    if len(v1) != len(v2):
+        raise ValueError("The dimensions of the vectors must match.")
+
+    # The dot product and both lengths in one pass over the vectors
+    dot_product, square_v1, square_v2 = _dot_and_squares(v1, v2)
+    return _angle(dot_product, math.sqrt(square_v1), math.sqrt(square_v2))
+
 
+def _dot_and_squares(
+    v1: Sequence[float], v2: Sequence[float]
+) -> Tuple[float, float, float]:
+    dot_product = square_v1 = square_v2 = 0.0
+    for x, y in zip(v1, v2):
+        dot_product += x * y
+        square_v1 += x * x
+        square_v2 += y * y
+    return dot_product, square_v1, square_v2
+
+
+def _angle(dot_product: float, length_v1: float, length_v2: float) -> float:
     if length_v1 == 0 or length_v2 == 0:
         raise ValueError(
             "The length of one of the vectors is zero, the angle cannot be determined."
         )
-
-    # Scalar multiply
-    dot_product = scalar_multiply(v1, v2)
     cos_angle = dot_product / (length_v1 * length_v2)
     cos_angle = max(-1.0, min(1.0, cos_angle))
-
     return math.acos(cos_angle)
+
+
+def _is_vector(other: Union[Sequence[float], Vectors]) -> bool:
+    """Whether ``other`` is one vector rather than a sequence of vectors."""
+    if numpy is not None and isinstance(other, numpy.ndarray):
+        return other.ndim == 1
+    return not len(other) or isinstance(other[0], numbers.Real)
+
+
+def _check_batch(vectors: Vectors, others: Vectors) -> None:
+    """Checks that all the vectors of a batch have the same dimension."""
+    dim = len(vectors[0])
+    if any(len(v) != dim for v in vectors) or any(len(w) != dim for w in others):
+        raise ValueError("The dimensions of the vectors must match.")
+
+
+def _arrays(
+    vectors: Vectors, other: Union[Sequence[float], Vectors]
+) -> Tuple[Any, Any]:
+    """Converts the operands of a batch to NumPy arrays of matching shapes."""
+    try:
+        a = numpy.asarray(vectors, dtype=float)
+        b = numpy.asarray(other, dtype=float)
+    except ValueError:
+        raise ValueError("The dimensions of the vectors must match.") from None
+    if a.ndim != 2 or b.shape not in ((a.shape[1],), a.shape):
+        raise ValueError("The dimensions of the vectors must match.")
+    return a, b
+
+
+def _row_dots(a: Any, b: Any) -> Any:
+    """The dot products of the rows of a with b, a vector or rows of the same shape."""
+    if b.ndim == 1:
+        return a @ b
+    return numpy.einsum("ij,ij->i", a, b)
+
+
+def batch_scalar_multiply(
+    vectors: Vectors, other: Union[Sequence[float], Vectors]
+) -> List[float]:
+    """
+    Calculates the scalar products of many vectors at once.
+
+    Parameters:
+    vectors (Sequence[Sequence[float]]): The vectors, e.g. a list of lists or
+        a 2-D NumPy array.
+    other: One query vector to multiply every vector by, or a sequence of
+        as many vectors as ``vectors``, multiplied pairwise.
+
+    Returns:
+    List[float]: The scalar product of every vector.
+
+    Exceptions:
+    ValueError: If the dimensions or the numbers of the vectors do not match
+    """
+    query = _is_vector(other)
+    if not query and len(other) != len(vectors):
+        raise ValueError("The numbers of vectors must match.")
+    if not len(vectors):
+        return []
+    if numpy is not None:
+        a, b = _arrays(vectors, other)
+        return _row_dots(a, b).tolist()
+    mul = operator.mul
+    if query:
+        _check_batch(vectors, [other])
+        return [sum(map(mul, v, other)) for v in vectors]
+    _check_batch(vectors, other)
+    return [sum(map(mul, v, w)) for v, w in zip(vectors, other)]
+
+
+def batch_vector_length(vectors: Vectors) -> List[float]:
+    """
+    Calculates the lengths (norms) of many vectors at once.
+
+    Parameters:
+    vectors (Sequence[Sequence[float]]): The vectors.
+
+    Returns:
+    List[float]: The length of every vector.
+
+    Exceptions:
+    ValueError: If the vectors are empty or their dimensions do not match.
+    """
+    if not len(vectors):
+        return []
+    if not len(vectors[0]):
+        raise ValueError("The vector must not be empty.")
+    if numpy is not None:
+        a, _ = _arrays(vectors, vectors[0])
+        return numpy.sqrt(_row_dots(a, a)).tolist()
+    _check_batch(vectors, ())
+    mul = operator.mul
+    return [math.sqrt(sum(map(mul, v, v))) for v in vectors]
+
+
+def batch_angle_vectors(
+    vectors: Vectors, other: Union[Sequence[float], Vectors]
+) -> List[float]:
+    """
+    Calculates the angles (in radians) of many pairs of vectors at once.
+    Without NumPy, every pair is handled in one pass that computes the dot
+    product and the lengths together, and the length of a query vector is
+    computed once.
+
+    Parameters:
+    vectors (Sequence[Sequence[float]]): The vectors.
+    other: One query vector to measure every vector against, or a sequence
+        of as many vectors as ``vectors``, taken pairwise.
+
+    Returns:
+    List[float]: The angle of every pair in radians.
+
+    Raises:
+    ValueError: If a vector is empty or has a zero length, or if the
+        dimensions or the numbers of the vectors do not match.
+    """
+    query = _is_vector(other)
+    if not query and len(other) != len(vectors):
+        raise ValueError("The numbers of vectors must match.")
+    if not len(vectors):
+        return []
+    if numpy is not None:
+        a, b = _arrays(vectors, other)
+        if not a.shape[1]:
+            raise ValueError("The vector must not be empty.")
+        lengths = numpy.sqrt(_row_dots(a, a)) * numpy.sqrt(_row_dots(b, b))
+        if not numpy.all(lengths):
+            raise ValueError(
+                "The length of one of the vectors is zero, the angle cannot be determined."
+            )
+        cos_angles = numpy.clip(_row_dots(a, b) / lengths, -1.0, 1.0)
+        return numpy.arccos(cos_angles).tolist()
+
+    others: Vectors = [other] if query else other
+    _check_batch(vectors, others)
+    if not len(vectors[0]):
+        raise ValueError("The vector must not be empty.")
+    angles = []
+    if query:
+        length_query = math.sqrt(sum(x * x for x in other))
+        for v in vectors:
+            dot_product = square = 0.0
+            for x, y in zip(v, other):
+                dot_product += x * y
+                square += x * x
+            angles.append(_angle(dot_product, math.sqrt(square), length_query))
+        return angles
+    for v, w in zip(vectors, others):
+        dot_product, square_v, square_w = _dot_and_squares(v, w)
+        angles.append(_angle(dot_product, math.sqrt(square_v), math.sqrt(square_w)))
+    return angles
@@ -0,0 +1,48 @@
+import pytest
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "numpy_modules(*modules): modules whose NumPy the backend fixture disables",
+    )
+
+
+@pytest.fixture(params=["numpy", "pure python"])
+def backend(request, monkeypatch):
+    """
+    Runs a test with and without NumPy. The pure Python run sets ``numpy`` to
+    None in every module listed by the numpy_modules marker, e.g.
+    ``pytestmark = pytest.mark.numpy_modules(sparse_matrix, matrix_operations)``.
+    """
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+        return request.param
+    marker = request.node.get_closest_marker("numpy_modules")
+    if marker is None or not marker.args:
+        pytest.fail("The backend fixture needs a numpy_modules marker.")
+    for module in marker.args:
+        monkeypatch.setattr(module, "numpy", None)
+    return request.param
+
+
+@pytest.fixture
+def random_lists():
+    """
+    Returns a function making a rows x cols list of rows from a seed: floats
+    between -1 and 1, or with integers=True ints between -9 and 9, for which
+    results are exact.
+    """
+
+    def make(rows, cols, seed, integers=False):
+        rng = random.Random(seed)
+        if integers:
+            return [[rng.randint(-9, 9) for _ in range(cols)] for _ in range(rows)]
+        return [[rng.uniform(-1, 1) for _ in range(cols)] for _ in range(rows)]
+
+    return make
@@ -1,9 +1,27 @@
+import asyncio
+import subprocess
+import threading
+import time
 import pytest
 import sys
 import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from project.cache import cache_results
+from project.cache import (
+    CacheEvent,
+    CacheInfo,
+    CachePolicy,
+    DiskStore,
+    LFUPolicy,
+    LRUPolicy,
+    SizePolicy,
+    TTLPolicy,
+    cache_results,
+    cache_stats,
+    estimate_size,
+    make_hashable,
+)
+from project.matrix_operations import Matrix
 
 
 @cache_results(max_size=3, verbose=True)
@@ -86,3 +104,574 @@ def test_cache_iteration_tracking(capfd):
     assert "Cache hit" in captured.out
 
     assert len(iterations) == 4
+
+
+def test_cache_hit_refreshes_recency():
+    calls = []
+
+    @cache_results(max_size=2)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    square(1)
+    square(2)
+    square(1)  # 1 becomes the most recently used
+    square(3)  # evicts 2, not 1
+    square(1)
+    assert calls == [1, 2, 3]
+
+    square(2)
+    assert calls == [1, 2, 3, 2]
+
+
+def test_cache_unlimited_by_default():
+    calls = []
+
+    @cache_results()
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    for _ in range(2):
+        for i in range(100):
+            square(i)
+
+    assert len(calls) == 100
+    assert square.cache_info().current_size == 100
+    assert square.cache_info().evictions == 0
+
+
+def test_cache_info_and_clear():
+    @cache_results(max_size=2)
+    def identity(x):
+        return x
+
+    identity(None)
+    identity(None)
+    identity(1)
+    identity(2)
+
+    assert identity.cache_info() == CacheInfo(
+        hits=1, misses=3, evictions=1, max_size=2, current_size=2
+    )
+
+    identity.cache_clear()
+    assert identity.cache_info() == CacheInfo(0, 0, 0, 2, 0)
+
+
+def test_lfu_policy_evicts_least_frequent():
+    calls = []
+
+    @cache_results(policy=LFUPolicy(max_size=2))
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    for x in (1, 1, 1, 2, 3):  # 3 evicts 2, the least frequently used
+        square(x)
+    square(1)
+    square(2)
+    assert calls == [1, 2, 3, 2]
+    assert square.cache_info().evictions == 2
+
+
+def test_ttl_policy_expires_entries():
+    now = [0.0]
+    calls = []
+
+    @cache_results(policy=TTLPolicy(ttl=10, clock=lambda: now[0]))
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    square(1)
+    now[0] = 5
+    square(1)
+    square(2)
+    assert calls == [1, 2]
+
+    now[0] = 11  # 1 has expired, 2 is still fresh
+    square(1)
+    square(2)
+    assert calls == [1, 2, 1]
+
+
+def test_size_policy_respects_byte_budget():
+    row_size = estimate_size([0.0] * 100)
+
+    @cache_results(policy=SizePolicy(max_bytes=3 * row_size))
+    def row(x):
+        return [float(x)] * 100
+
+    for x in range(10):
+        row(x)
+
+    info = row.cache_info()
+    assert info.current_size == 3
+    assert info.evictions == 7
+
+
+def test_size_policy_counts_matrix_data():
+    matrix = Matrix(100, 100)
+    assert estimate_size(matrix) > matrix.nbytes
+    assert estimate_size(matrix.data) >= matrix.nbytes
+    assert estimate_size(memoryview(matrix.data)) >= matrix.nbytes
+
+    @cache_results(policy=SizePolicy(max_bytes=3 * matrix.nbytes))
+    def filled(x):
+        return Matrix(100, 100, [x] * 10000)
+
+    for x in range(5):
+        filled(x)
+
+    info = filled.cache_info()
+    assert info.current_size == 2
+    assert info.evictions == 3
+
+
+def test_policy_is_copied_per_function():
+    cache = cache_results(policy=LRUPolicy(max_size=10))
+
+    @cache
+    def double(x):
+        return 2 * x
+
+    @cache
+    def triple(x):
+        return 3 * x
+
+    assert double(2) == 4
+    assert triple(2) == 6
+
+    with pytest.raises(ValueError):
+        cache_results(max_size=1, policy=LRUPolicy())
+
+
+def test_policy_must_implement_every_method():
+    class NoClone(CachePolicy):
+        def get(self, key):
+            raise KeyError(key)
+
+        def put(self, key, value):
+            return 0
+
+        def clear(self):
+            pass
+
+        def __len__(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        NoClone()
+
+
+def test_thread_safe_computes_each_key_once():
+    calls = {}
+    calls_lock = threading.Lock()
+
+    @cache_results(thread_safe=True)
+    def slow_square(x):
+        with calls_lock:
+            calls[x] = calls.get(x, 0) + 1
+        time.sleep(0.01)
+        return x * x
+
+    errors = []
+    start = threading.Barrier(32)
+
+    def hammer(offset):
+        start.wait()
+        for i in range(200):
+            x = (i + offset) % 20
+            if slow_square(x) != x * x:
+                errors.append(x)
+
+    threads = [threading.Thread(target=hammer, args=(n,)) for n in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert calls == {x: 1 for x in range(20)}
+    info = slow_square.cache_info()
+    assert info.misses == 20
+    assert info.hits == 32 * 200 - 20
+    assert info.current_size == 20
+
+
+def test_thread_safe_capacity_holds_for_the_whole_cache():
+    @cache_results(max_size=4, thread_safe=True)
+    def identity(x):
+        return x
+
+    # Keys with the same hash modulo a power of two
+    for _ in range(2):
+        for x in (0, 16, 32, 48):
+            identity(x)
+    assert identity.cache_info() == CacheInfo(4, 4, 0, 4, 4)
+
+    for x in range(100):
+        identity(x)
+    assert identity.cache_info().current_size == 4
+
+    @cache_results(policy=SizePolicy(max_bytes=10000), thread_safe=True)
+    def blob(x):
+        return b"x" * 900
+
+    blob(1)
+    blob(1)
+    assert blob.cache_info().hits == 1
+
+
+def test_thread_safe_bounded_cache_under_load():
+    calls = []
+
+    @cache_results(max_size=8, thread_safe=True)
+    def slow_square(x):
+        calls.append(x)
+        time.sleep(0.001)
+        return x * x
+
+    errors = []
+    start = threading.Barrier(16)
+
+    def hammer(offset):
+        start.wait()
+        for i in range(200):
+            x = (i * 7 + offset) % 30
+            if slow_square(x) != x * x:
+                errors.append(x)
+
+    threads = [threading.Thread(target=hammer, args=(n,)) for n in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    info = slow_square.cache_info()
+    assert info.current_size <= 8
+    assert info.hits + info.misses == 16 * 200
+    assert info.misses == len(calls)
+    assert info.evictions == info.misses - info.current_size
+
+
+def test_thread_safe_shares_exceptions_with_waiters():
+    release = threading.Event()
+    calls = []
+
+    @cache_results(thread_safe=True)
+    def failing(x):
+        calls.append(x)
+        release.wait()
+        raise RuntimeError(x)
+
+    errors = []
+
+    def call():
+        try:
+            failing(1)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert len(errors) == 5
+    assert failing.cache_info().current_size == 0
+
+
+def test_thread_safe_allows_recursion():
+    @cache_results(thread_safe=True, max_size=64)
+    def fib(n):
+        return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+    assert fib(30) == 832040
+    assert fib.cache_info().misses == 31
+
+
+def test_lists_and_tuples_do_not_collide():
+    @cache_results()
+    def kind(x):
+        return type(x).__name__
+
+    assert kind([1, 2]) == "list"
+    assert kind((1, 2)) == "tuple"
+    assert kind({1: 2}) == "dict"
+    assert kind(((1, 2),)) == "tuple"
+    assert kind(([1, 2],)) == "tuple"
+    assert make_hashable([1, 2]) != make_hashable((1, 2))
+    assert make_hashable({1, 2}) != make_hashable(frozenset({1, 2}))
+
+
+def test_keyword_order_does_not_matter():
+    @cache_results()
+    def pair(a, b):
+        return (a, b)
+
+    assert pair(a=1, b=[2]) == pair(b=[2], a=1)
+    assert pair.cache_info().misses == 1
+    assert pair(1, b=2) == (1, 2)
+    assert pair.cache_info().misses == 2
+
+
+def test_typed():
+    @cache_results(typed=True)
+    def describe(x):
+        return type(x).__name__
+
+    assert describe(1) == "int"
+    assert describe(1.0) == "float"
+    assert describe(True) == "bool"
+    assert describe.cache_info().misses == 3
+
+
+def test_untyped_equal_arguments_share_an_entry():
+    @cache_results()
+    def describe(x):
+        return type(x).__name__
+
+    assert describe(1) == describe(1.0) == describe(True) == "int"
+    assert describe.cache_info() == CacheInfo(2, 1, 0, 0, 1)
+
+    @cache_results()
+    def describe_float(x):
+        return type(x).__name__
+
+    assert describe_float(1.0) == describe_float(True) == describe_float(1)
+    assert describe_float.cache_info() == CacheInfo(2, 1, 0, 0, 1)
+
+
+def test_custom_key():
+    @cache_results(key=lambda user, request_id: user["id"])
+    def load(user, request_id):
+        return user["name"]
+
+    assert load({"id": 1, "name": "Ann"}, request_id=1) == "Ann"
+    assert load({"id": 1, "name": "Ann"}, request_id=2) == "Ann"
+    assert load.cache_info() == CacheInfo(1, 1, 0, 0, 1)
+
+    with pytest.raises(ValueError):
+        cache_results(key=lambda x: x, typed=True)
+
+
+def make_disk_square(path, calls, max_size=0):
+    @cache_results(max_size=max_size, disk=path)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    return square
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    calls = []
+    square = make_disk_square(path, calls)
+    assert [square(x) for x in range(5)] == [0, 1, 4, 9, 16]
+
+    restarted = make_disk_square(path, calls)
+    assert [restarted(x) for x in range(5)] == [0, 1, 4, 9, 16]
+    assert calls == list(range(5))
+    assert restarted.cache_info() == CacheInfo(5, 0, 0, 0, 5, 5)
+
+    restarted.cache_clear()
+    restarted(1)
+    assert calls == [0, 1, 2, 3, 4, 1]
+
+
+def test_disk_tier_promotes_evicted_entries(tmp_path):
+    calls = []
+    square = make_disk_square(str(tmp_path / "cache.sqlite"), calls, max_size=1)
+    square(1)
+    square(2)
+    assert square(1) == 1
+    assert calls == [1, 2]
+    info = square.cache_info()
+    assert (info.hits, info.disk_hits, info.misses) == (1, 1, 2)
+
+
+def test_disk_store_versions(tmp_path):
+    store = DiskStore(str(tmp_path / "cache.sqlite"))
+    assert store.put("f", "v1", "key", [1, 2])
+    assert store.get("f", "v1", "key") == [1, 2]
+    with pytest.raises(KeyError):
+        store.get("f", "v2", "key")
+    assert not store.put("f", "v1", "lock", threading.Lock())
+
+    assert store.invalidate("f", "v2") == 1
+    assert len(store) == 0
+    store.close()
+
+
+def test_disk_tier_across_processes(tmp_path):
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1])\n"
+        "from project.cache import cache_results\n"
+        "@cache_results(disk=sys.argv[2])\n"
+        "def total(data):\n"
+        "    return sum(data['values']) + len(data['tags'])\n"
+        "print(total({'values': [1, 2], 'tags': {'a', 'b', 'c'}}),"
+        " total.cache_info().disk_hits)\n"
+    )
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    path = str(tmp_path / "cache.sqlite")
+    outputs = []
+    for seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        outputs.append(
+            subprocess.run(
+                [sys.executable, "-c", script, root, path],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            .stdout.splitlines()[-1]
+            .split()
+        )
+    assert outputs == [["6", "0"], ["6", "1"]]
+
+
+def test_async_results_are_cached():
+    calls = []
+
+    @cache_results(max_size=2)
+    async def fetch(x):
+        calls.append(x)
+        await asyncio.sleep(0)
+        return x * 10
+
+    async def main():
+        return [await fetch(x) for x in (1, 1, 2, 3, 1)]
+
+    assert asyncio.run(main()) == [10, 10, 20, 30, 10]
+    assert calls == [1, 2, 3, 1]
+    assert fetch.cache_info() == CacheInfo(1, 4, 2, 2, 2)
+
+
+def test_async_concurrent_awaits_share_one_call():
+    calls = []
+
+    @cache_results()
+    async def fetch(x):
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        return x * 10
+
+    async def main():
+        return await asyncio.gather(*(fetch(x % 3) for x in range(30)))
+
+    assert asyncio.run(main()) == [x % 3 * 10 for x in range(30)]
+    assert sorted(calls) == [0, 1, 2]
+    info = fetch.cache_info()
+    assert (info.hits, info.misses) == (27, 3)
+
+
+def test_async_errors_and_cancellation():
+    calls = []
+
+    @cache_results()
+    async def fetch(x):
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        if x < 0:
+            raise ValueError(x)
+        return x
+
+    async def main():
+        errors = await asyncio.gather(fetch(-1), fetch(-1), return_exceptions=True)
+        assert [type(error) for error in errors] == [ValueError, ValueError]
+
+        first = asyncio.ensure_future(fetch(5))
+        second = asyncio.ensure_future(fetch(5))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == 5
+        assert first.cancelled()
+
+    asyncio.run(main())
+    assert calls == [-1, 5]
+    assert fetch.cache_info().current_size == 1
+
+
+def test_hook_receives_events():
+    events = []
+
+    @cache_results(hook=events.append)
+    def slow_double(x):
+        time.sleep(0.01)
+        return 2 * x
+
+    slow_double(1)
+    slow_double(1)
+    slow_double(x=2)
+
+    assert [(e.kind, e.args, e.kwargs) for e in events] == [
+        ("miss", (1,), {}),
+        ("hit", (1,), {}),
+        ("miss", (), {"x": 2}),
+    ]
+    assert all(isinstance(e, CacheEvent) for e in events)
+    assert events[0].name.endswith("slow_double")
+    assert events[0].duration >= 0.01
+    assert events[1].duration == 0.0
+
+    info = slow_double.cache_info()
+    assert info.compute_time >= 0.02
+    assert info.time_saved == pytest.approx(info.compute_time / 2)
+
+
+def test_hook_sampling():
+    events = []
+
+    @cache_results(hook=events.append, sample_rate=0.0)
+    def identity(x):
+        return x
+
+    for x in range(100):
+        identity(x % 10)
+    assert events == []
+    assert identity.cache_info().hits == 90
+
+    with pytest.raises(ValueError):
+        cache_results(sample_rate=2.0)
+
+
+def test_misses_are_timed_only_on_request():
+    def square(x):
+        time.sleep(0.001)
+        return x * x
+
+    plain = cache_results()(square)
+    timed = cache_results(timed=True)(square)
+    plain(3)
+    timed(3)
+    assert plain.cache_info().compute_time == 0.0
+    assert timed.cache_info().compute_time > 0.0
+
+
+def test_cache_stats_aggregates_functions():
+    def make_counter():
+        @cache_results()
+        def counter(x):
+            return x
+
+        return counter
+
+    first, second = make_counter(), make_counter()
+    first(1)
+    first(1)
+    second(2)
+
+    name = f"{__name__}.{make_counter.__qualname__}.<locals>.counter"
+    info = cache_stats()[name]
+    assert (info.hits, info.misses, info.current_size) == (1, 2, 2)
@@ -0,0 +1,107 @@
+import pytest
+import sys
+import os
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project import matrix_expression, matrix_operations
+from project.file_matrix import (
+    FileMatrix,
+    file_addition,
+    file_multiply,
+    file_transpose,
+)
+from project.matrix_operations import (
+    Matrix,
+    matrix_addition,
+    matrix_multiply,
+    transpose_matrix,
+)
+
+
+pytestmark = pytest.mark.numpy_modules(matrix_expression, matrix_operations)
+
+
+def test_file_format(tmp_path):
+    m = [[1, 2, 3], [4, 5, 6]]
+    with FileMatrix.from_lists(tmp_path / "m.bin", m) as f:
+        assert f.shape == (2, 3) and f.nbytes == 48
+        assert f.to_lists() == m
+    assert os.path.getsize(tmp_path / "m.bin") == 24 + 48
+
+    with FileMatrix(tmp_path / "m.bin") as f:
+        assert f.read_tile(0, 1, 2, 2).to_lists() == [[2, 3], [5, 6]]
+        with pytest.raises(ValueError):
+            f.write_tile(0, 0, Matrix(1, 1))
+        with pytest.raises(ValueError):
+            f.read_tile(1, 1, 2, 2)
+
+    with FileMatrix(tmp_path / "m.bin", writable=True) as f:
+        f.write_tile(1, 0, Matrix.from_lists([[7, 8]]))
+        f.write_tile(0, 1, Matrix.from_lists([[0, 0], [0, 0]]).T)
+    with FileMatrix(tmp_path / "m.bin") as f:
+        assert f.to_lists() == [[1, 0, 0], [7, 0, 0]]
+    f.close()
+    with pytest.raises(ValueError):
+        f.to_matrix()
+
+    (tmp_path / "bad.bin").write_bytes(b"not a matrix at all, no way")
+    with pytest.raises(ValueError):
+        FileMatrix(tmp_path / "bad.bin")
+    with open(tmp_path / "m.bin", "ab") as file:
+        file.write(b"x")
+    with pytest.raises(ValueError):
+        FileMatrix(tmp_path / "m.bin")
+
+    with FileMatrix.create(tmp_path / "empty.bin", 0, 4) as f:
+        assert f.to_lists() == []
+
+
+@pytest.mark.parametrize("tile_budget", [8, 64, 200, 1 << 20])
+def test_file_operations(backend, tmp_path, tile_budget, random_lists):
+    a_lists = random_lists(7, 5, 1, integers=True)
+    b_lists = random_lists(7, 5, 2, integers=True)
+    c_lists = random_lists(5, 6, 3, integers=True)
+    a = FileMatrix.from_lists(tmp_path / "a.bin", a_lists)
+    b = FileMatrix.from_lists(tmp_path / "b.bin", b_lists)
+    c = FileMatrix.from_lists(tmp_path / "c.bin", c_lists)
+
+    with file_addition(a, b, tmp_path / "sum.bin", tile_budget) as result:
+        assert result.to_lists() == matrix_addition(a_lists, b_lists)
+    with file_multiply(a, c, tmp_path / "product.bin", tile_budget) as result:
+        assert result.to_lists() == matrix_multiply(a_lists, c_lists)
+    with file_transpose(a, tmp_path / "t.bin", tile_budget) as result:
+        assert result.to_lists() == transpose_matrix(a_lists)
+
+    with pytest.raises(ValueError):
+        file_addition(a, c, tmp_path / "x.bin", tile_budget)
+    with pytest.raises(ValueError):
+        file_multiply(a, b, tmp_path / "x.bin", tile_budget)
+    with pytest.raises(ValueError):
+        file_transpose(a, tmp_path / "x.bin", 0)
+    for f in (a, b, c):
+        f.close()
+
+
+def test_tile_budget(tmp_path, random_lists):
+    n, tile_budget = 128, 16 * 1024
+    a_lists = random_lists(n, n, 1, integers=True)
+    b_lists = random_lists(n, n, 2, integers=True)
+    a = FileMatrix.from_lists(tmp_path / "a.bin", a_lists)
+    b = FileMatrix.from_lists(tmp_path / "b.bin", b_lists)
+
+    for operation in (file_addition, file_multiply):
+        tracemalloc.start()
+        result = operation(a, b, tmp_path / "result.bin", tile_budget)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result.close()
+        # A whole matrix takes 128 KiB
+        assert peak < 3 * tile_budget
+    tracemalloc.start()
+    file_transpose(a, tmp_path / "result.bin", tile_budget).close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < 3 * tile_budget
+    a.close()
+    b.close()
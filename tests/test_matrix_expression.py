@@ -0,0 +1,122 @@
+import pytest
+import sys
+import os
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project import matrix_expression, matrix_operations
+from project.matrix_expression import evaluate, lazy
+from project.matrix_operations import Matrix, multiply
+
+
+pytestmark = pytest.mark.numpy_modules(matrix_expression, matrix_operations)
+
+
+@pytest.fixture
+def random_matrix(random_lists):
+    def make(rows, cols, seed):
+        return Matrix.from_lists(random_lists(rows, cols, seed, integers=True))
+
+    return make
+
+
+def test_fused_multiply_add(backend, random_matrix):
+    a, b, c = random_matrix(5, 3, 1), random_matrix(3, 4, 2), random_matrix(5, 4, 3)
+    expected = multiply(a, b) + c
+
+    assert (lazy(a) @ b + c).evaluate() == expected
+    assert evaluate(c + lazy(a) @ b) == expected
+    assert (lazy(a) @ b - c).evaluate() == multiply(a, b) - c
+    assert (c - lazy(a) @ b * 2).evaluate() == c - multiply(a, b) * 2
+    assert (-(lazy(a) @ b) + c * 3).evaluate() == c * 3 - multiply(a, b)
+
+    # Products of expressions and chains
+    d = random_matrix(4, 4, 4)
+    assert ((lazy(a) @ b + c) @ d).evaluate() == multiply(expected, d)
+    assert (lazy(a) @ b @ d).evaluate() == multiply(multiply(a, b), d)
+
+    # A matrix evaluates to a copy
+    assert evaluate(a) == a and evaluate(a).data is not a.data
+
+
+def test_transpose(backend, random_matrix):
+    a, b = random_matrix(5, 3, 1), random_matrix(4, 3, 2)
+
+    assert (lazy(a) @ b.T).evaluate() == multiply(a, b.T.copy())
+    assert (lazy(a) @ lazy(b).T).evaluate() == multiply(a, b.T.copy())
+    assert (lazy(b) @ a.T).T.evaluate() == multiply(a, b.T.copy())
+    assert (lazy(a) @ b.T + (lazy(b) @ a.T).T).T.evaluate() == (
+        multiply(b, a.T.copy()) * 2
+    )
+    assert lazy(a).T.T.evaluate() == a
+    assert (lazy(a).T * 2).evaluate() == (a * 2).T.copy()
+
+
+def test_out(backend, random_matrix):
+    a, b, c = random_matrix(5, 3, 1), random_matrix(3, 4, 2), random_matrix(5, 4, 3)
+    expected = multiply(a, b) + c
+
+    out = Matrix(5, 4)
+    assert (lazy(a) @ b + c).evaluate(out=out) is out
+    assert out == expected
+
+    # A view as the target
+    big = Matrix(7, 6)
+    (lazy(a) @ b + c).evaluate(out=big.submatrix(1, 2, 5, 4))
+    assert big.submatrix(1, 2, 5, 4) == expected
+    assert list(big.row(0)) == [0.0] * 6 and list(big.col(0)) == [0.0] * 7
+
+    # In place: the target is also an operand
+    target = c.copy()
+    (target + lazy(a) @ b).evaluate(out=target)
+    assert target == expected
+
+    target = c.copy()
+    (lazy(target) * 2 - lazy(a) @ b).evaluate(out=target)
+    assert target == c * 2 - multiply(a, b)
+
+    square = random_matrix(4, 4, 4)
+    target = square.copy()
+    (lazy(target) @ target + target.T).evaluate(out=target)
+    assert target == multiply(square, square) + square.T.copy()
+
+    # A scaled target that other terms also read
+    target = Matrix.from_lists([[1, 2], [3, 4]])
+    (2 * lazy(target) + lazy(target) @ Matrix.identity(2)).evaluate(out=target)
+    assert target.to_lists() == [[3, 6], [9, 12]]
+
+    target = square.copy()
+    (lazy(target) * -1 + lazy(target) @ target - target.T).evaluate(out=target)
+    assert target == multiply(square, square) - square - square.T.copy()
+
+    with pytest.raises(ValueError):
+        (lazy(a) @ b).evaluate(out=Matrix(4, 5))
+
+
+def test_shape_errors(backend, random_matrix):
+    a, b = random_matrix(2, 3, 1), random_matrix(2, 3, 2)
+
+    with pytest.raises(ValueError):
+        lazy(a) @ b
+    with pytest.raises(ValueError):
+        lazy(a) + b.T
+    with pytest.raises(TypeError):
+        evaluate([[1, 2]])
+    assert (lazy([[1, 2]]) + lazy([[3, 4]])).evaluate().to_lists() == [[4, 6]]
+
+
+def test_peak_memory(random_matrix):
+    n = 256
+    a, b, c = random_matrix(n, n, 1), random_matrix(n, n, 2), random_matrix(n, n, 3)
+    out = Matrix(n, n)
+    expr = lazy(a) @ b.T + c * 2 - lazy(b) @ a
+    expected = multiply(a, b.T.copy()) + c * 2 - multiply(b, a)
+
+    tracemalloc.start()
+    expr.evaluate(out=out)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Intermediates would each take a whole matrix
+    assert peak < out.nbytes / 2
+    assert out == expected
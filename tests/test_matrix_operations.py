@@ -1,12 +1,25 @@
 import pytest
 
 import math
+from fractions import Fraction
 
 import sys
 import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from project.matrix_operations import matrix_addition, matrix_multiply, transpose_matrix
+from project import matrix_operations
+from project.matrix_operations import (
+    Matrix,
+    matrix_addition,
+    matrix_multiply,
+    multiply,
+    parallel_multiply,
+    strassen_multiply,
+    transpose_matrix,
+)
+from project.thread_pool import ProcessPool
+
+pytestmark = pytest.mark.numpy_modules(matrix_operations)
 
 
 def test_matrix_addition():
@@ -22,6 +35,10 @@ def test_matrix_addition():
     # Boundary case: empty matrices
     assert matrix_addition([], []) == []
 
+    # The elements keep their types and precision
+    result = matrix_addition([[2**60 + 1, 2]], [[0, 1]])
+    assert result == [[2**60 + 1, 3]] and isinstance(result[0][1], int)
+
     # Exception: size mismatch
     try:
         matrix_addition([[1]], [[1, 2]])
@@ -31,7 +48,7 @@ def test_matrix_addition():
         assert False, "Expected ValueError for mismatched sizes"
 
 
-def test_matrix_multiply():
+def test_matrix_multiply(backend):
     # The normal case (square matrices)
     assert matrix_multiply([[1, 2], [3, 4]], [[5, 6], [7, 8]]) == [[19, 22], [43, 50]]
 
@@ -57,6 +74,16 @@ def test_matrix_multiply():
     # Boundary case: empty matrices
     assert matrix_multiply([], []) == []
 
+    # The elements keep their types and precision
+    result = matrix_multiply([[2**60 + 1, 2]], [[1], [3]])
+    assert result == [[2**60 + 7]] and isinstance(result[0][0], int)
+    assert matrix_multiply([[1j, 2]], [[1j], [1]]) == [[1 + 0j]]
+    assert matrix_multiply([[Fraction(1, 3)]], [[3]]) == [[Fraction(1)]]
+
+    # Floats, or a chosen backend, go through Matrix
+    assert matrix_multiply([[0.5, 2.0]], [[4.0], [0.25]]) == [[2.5]]
+    assert matrix_multiply([[1, 2]], [[3], [4]], "blocked") == [[11.0]]
+
     # Exception: size mismatch
     try:
         matrix_multiply([[1]], [[1], [2]])
@@ -81,3 +108,200 @@ def test_transpose_matrix():
 
     # Boundary case: an empty matrix
     assert transpose_matrix([]) == []
+
+    # Any elements, which are not converted
+    assert transpose_matrix([["a", "b"]]) == [["a"], ["b"]]
+    assert transpose_matrix([[2**60 + 1]]) == [[2**60 + 1]]
+
+
+def test_matrix_layout():
+    m = Matrix.from_lists([[1, 2, 3], [4, 5, 6]])
+    assert m.shape == (2, 3)
+    assert m.strides == (3, 1)
+    assert m.nbytes == 6 * 8
+    assert m[1, 2] == 6.0
+    assert m[-1, 0] == 4.0
+    assert m.to_lists() == [[1, 2, 3], [4, 5, 6]]
+    assert Matrix(2, 2) == Matrix.from_lists([[0, 0], [0, 0]])
+    assert Matrix.identity(2) == Matrix(2, 2, [1, 0, 0, 1])
+
+    with pytest.raises(IndexError):
+        m[2, 0]
+    with pytest.raises(ValueError):
+        Matrix(2, 2, [1, 2, 3])
+    with pytest.raises(ValueError):
+        Matrix.from_lists([[1, 2], [3]])
+
+
+def test_matrix_transpose_is_a_view():
+    m = Matrix.from_lists([[1, 2, 3], [4, 5, 6]])
+    t = m.T
+    assert t.data is m.data
+    assert t.shape == (3, 2)
+    assert t.strides == (1, 3)
+    assert not t.is_contiguous
+    assert t.to_lists() == [[1, 4], [2, 5], [3, 6]]
+    assert t.T == m
+
+    m[0, 1] = 20
+    assert t[1, 0] == 20
+
+    copy = t.copy()
+    assert copy.is_contiguous
+    assert copy.data is not m.data
+    assert copy == t
+
+
+def test_matrix_operators(backend):
+    a = Matrix.from_lists([[1, 2], [3, 4]])
+    b = Matrix.from_lists([[5, 6], [7, 8]])
+    assert a + b == Matrix.from_lists([[6, 8], [10, 12]])
+    assert b - a == Matrix.from_lists([[4, 4], [4, 4]])
+    assert 2 * a == a * 2 == Matrix.from_lists([[2, 4], [6, 8]])
+    assert -a == Matrix.from_lists([[-1, -2], [-3, -4]])
+    assert a @ b == Matrix.from_lists([[19, 22], [43, 50]])
+    assert a.T @ b == Matrix.from_lists([[26, 30], [38, 44]])
+    assert a @ Matrix.identity(2) == a
+    assert a != b
+
+    with pytest.raises(ValueError):
+        a + Matrix(2, 3)
+    with pytest.raises(ValueError):
+        a @ Matrix(3, 2)
+
+
+def test_matrix_numpy_interop():
+    numpy = pytest.importorskip("numpy")
+    m = Matrix.from_lists([[1, 2, 3], [4, 5, 6]])
+    view = m.T.to_numpy()
+    assert view.tolist() == [[1, 4], [2, 5], [3, 6]]
+    view[0, 1] = 40
+    assert m[1, 0] == 40
+    assert Matrix.from_numpy(numpy.arange(6).reshape(2, 3)) == Matrix(2, 3, range(6))
+
+
+def test_matrix_memory():
+    size = 200
+    rows = [[float(i * size + j) for j in range(size)] for i in range(size)]
+    list_bytes = sys.getsizeof(rows) + sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(x) for x in row) for row in rows
+    )
+    m = Matrix.from_lists(rows)
+    assert sys.getsizeof(m.data) * 3.5 < list_bytes
+
+
+def reference_multiply(m1, m2):
+    return [[sum(x * y for x, y in zip(row, col)) for col in zip(*m2)] for row in m1]
+
+
+@pytest.mark.parametrize(
+    "backend_name, block_size",
+    [("blocked", 1), ("blocked", 8), ("blocked", 64), ("numpy", 0), ("auto", 0)],
+)
+def test_multiply_backends_match_reference(backend_name, block_size, random_lists):
+    if backend_name == "numpy":
+        pytest.importorskip("numpy")
+    m1, m2 = random_lists(37, 53, 1), random_lists(53, 29, 2)
+    expected = reference_multiply(m1, m2)
+    a, b = Matrix.from_lists(m1), Matrix.from_lists(m2)
+    result = multiply(a, b, backend_name, block_size or 64)
+    assert result.shape == (37, 29)
+    for row, expected_row in zip(result.to_lists(), expected):
+        assert row == pytest.approx(expected_row, rel=1e-12, abs=1e-12)
+
+    # Strided operands give the same product
+    transposed = multiply(b.T, a.T, backend_name, block_size or 64)
+    for row, expected_row in zip(transposed.T.to_lists(), expected):
+        assert row == pytest.approx(expected_row, rel=1e-12, abs=1e-12)
+
+
+def test_multiply_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        multiply(Matrix(1, 1), Matrix(1, 1), "gpu")
+    with pytest.raises(ValueError):
+        multiply(Matrix(1, 1), Matrix(1, 1), "blocked", block_size=0)
+
+
+@pytest.mark.parametrize("backend_name", ["blocked", "numpy"])
+def test_parallel_multiply(backend_name, random_lists):
+    if backend_name == "numpy":
+        pytest.importorskip("numpy")
+    a = Matrix.from_lists(random_lists(23, 17, 3))
+    b = Matrix.from_lists(random_lists(17, 11, 4))
+    expected = multiply(a, b, "blocked")
+    with ProcessPool(2) as pool:
+        result = parallel_multiply(a, b, pool=pool, backend=backend_name)
+        assert result.shape == (23, 11)
+        for row, expected_row in zip(result.to_lists(), expected.to_lists()):
+            assert row == pytest.approx(expected_row, rel=1e-12, abs=1e-12)
+        # Strided operands and a reused pool
+        again = parallel_multiply(b.T, a.T, pool=pool, backend=backend_name)
+        for row, expected_row in zip(again.T.to_lists(), expected.to_lists()):
+            assert row == pytest.approx(expected_row, rel=1e-12, abs=1e-12)
+
+    assert parallel_multiply(Matrix(0, 3), Matrix(3, 2), processes=2) == Matrix(0, 2)
+    with pytest.raises(ValueError):
+        parallel_multiply(Matrix(2, 3), Matrix(2, 3), processes=2)
+
+
+def test_matrix_multiply_in_processes(random_lists):
+    m1, m2 = random_lists(9, 7, 5), random_lists(7, 5, 6)
+    result = matrix_multiply(m1, m2, processes=2)
+    for row, expected_row in zip(result, reference_multiply(m1, m2)):
+        assert row == pytest.approx(expected_row)
+
+
+def strassen_error_bound(n, leaf, norm_a, norm_b):
+    # Higham's bound for Strassen's algorithm with leaves of size leaf
+    unit_roundoff = 2.0**-53
+    growth = (n / leaf) ** math.log2(12) * (leaf**2 + 5 * leaf) - 5 * n
+    return growth * unit_roundoff * norm_a * norm_b
+
+
+@pytest.mark.parametrize(
+    "shape, crossover", [((16, 16, 16), 4), ((37, 53, 29), 8), ((50, 50, 50), 7)]
+)
+def test_strassen_within_error_bound(backend, shape, crossover, random_lists):
+    n, k, m = shape
+    m1, m2 = random_lists(n, k, 7), random_lists(k, m, 8)
+    expected = reference_multiply(m1, m2)
+    result = strassen_multiply(Matrix.from_lists(m1), Matrix.from_lists(m2), crossover)
+    assert result.shape == (n, m)
+
+    size = max(shape)
+    leaf = size
+    while leaf > crossover:
+        leaf = -(-leaf // 2)
+    norm_a = max(sum(abs(x) for x in row) for row in m1)
+    norm_b = max(sum(abs(x) for x in row) for row in m2)
+    bound = strassen_error_bound(size, leaf, norm_a, norm_b)
+    error = max(
+        abs(x - y)
+        for row, expected_row in zip(result.to_lists(), expected)
+        for x, y in zip(row, expected_row)
+    )
+    assert error <= bound
+
+
+def test_strassen_exact_on_integers():
+    m1 = [[(i * 7 + j) % 5 - 2 for j in range(21)] for i in range(19)]
+    m2 = [[(i + 3 * j) % 7 - 3 for j in range(13)] for i in range(21)]
+    a, b = Matrix.from_lists(m1), Matrix.from_lists(m2)
+    assert strassen_multiply(a, b, crossover=2).to_lists() == reference_multiply(m1, m2)
+    assert multiply(a, b, "strassen") == multiply(a, b, "blocked")
+
+    with pytest.raises(ValueError):
+        strassen_multiply(a, b, crossover=0)
+    with pytest.raises(ValueError):
+        strassen_multiply(a, b, backend="strassen")
+
+
+def test_submatrix_views():
+    m = Matrix(4, 4, range(16))
+    block = m.submatrix(1, 2, 2, 2)
+    assert block.to_lists() == [[6, 7], [10, 11]]
+    block.assign(Matrix(2, 2, [0, 0, 0, 0]))
+    assert m.row(2).tolist() == [8, 9, 0, 0]
+    assert m.T.submatrix(2, 0, 2, 3).to_lists() == [[2, 0, 0], [3, 0, 0]]
+    with pytest.raises(IndexError):
+        m.submatrix(3, 3, 2, 2)
@@ -0,0 +1,112 @@
+import pytest
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from project import matrix_operations, sparse_matrix
+from project.matrix_operations import Matrix, matrix_multiply
+from project.sparse_matrix import COOMatrix, CSRMatrix
+
+pytestmark = pytest.mark.numpy_modules(sparse_matrix, matrix_operations)
+
+
+def random_sparse(rows, cols, density, seed):
+    rng = random.Random(seed)
+    return [
+        [
+            rng.choice([-2, -1, 1, 3]) if rng.random() < density else 0
+            for _ in range(cols)
+        ]
+        for _ in range(rows)
+    ]
+
+
+def test_conversions():
+    m = [[0, 2, 0], [0, 0, 0], [1, 0, 3]]
+    csr = CSRMatrix.from_lists(m)
+    assert csr.shape == (3, 3)
+    assert csr.nnz == 3
+    assert list(csr.indptr) == [0, 1, 1, 3]
+    assert list(csr.indices) == [1, 0, 2]
+    assert list(csr.data) == [2, 1, 3]
+    assert csr.to_lists() == m
+    assert csr[2, 2] == 3
+    assert csr[1, 1] == 0
+    assert csr.density == pytest.approx(1 / 3)
+    assert CSRMatrix.from_dense(Matrix.from_lists(m)) == csr
+
+    coo = csr.to_coo()
+    assert list(coo.row_indices) == [0, 2, 2]
+    assert coo.to_lists() == m
+    assert coo.to_csr() == csr
+    assert COOMatrix.from_lists(m).to_csr() == csr
+
+    assert CSRMatrix.from_lists([]).shape == (0, 0)
+    with pytest.raises(ValueError):
+        CSRMatrix.from_lists([[1, 2], [3]])
+    with pytest.raises(IndexError):
+        csr[3, 0]
+
+
+def test_coo_sums_repeated_coordinates():
+    coo = COOMatrix(2, 2, [0, 1, 0, 1], [1, 0, 1, 0], [1.0, 2.0, 3.0, -2.0])
+    csr = coo.to_csr()
+    assert csr.to_lists() == [[0, 4], [0, 0]]
+    assert csr.nnz == 1
+
+    with pytest.raises(ValueError):
+        COOMatrix(2, 2, [0, 2], [0, 0], [1.0, 1.0])
+    with pytest.raises(ValueError):
+        COOMatrix(2, 2, [0], [0, 1], [1.0])
+
+
+def test_transpose():
+    m = random_sparse(7, 11, 0.3, 1)
+    expected = [list(row) for row in zip(*m)]
+    assert CSRMatrix.from_lists(m).T.to_lists() == expected
+    assert CSRMatrix.from_lists(m).T.T == CSRMatrix.from_lists(m)
+    coo = COOMatrix.from_lists(m)
+    assert coo.T.to_lists() == expected
+    assert coo.T.values is coo.values
+
+
+def test_addition():
+    m1, m2 = random_sparse(6, 8, 0.3, 2), random_sparse(6, 8, 0.3, 3)
+    a, b = CSRMatrix.from_lists(m1), CSRMatrix.from_lists(m2)
+    expected = [[x + y for x, y in zip(r1, r2)] for r1, r2 in zip(m1, m2)]
+    assert (a + b).to_lists() == expected
+    assert (a - b).to_lists() == [
+        [x - y for x, y in zip(r1, r2)] for r1, r2 in zip(m1, m2)
+    ]
+    assert (a - a).nnz == 0
+    assert (2 * a).to_lists() == [[2 * x for x in row] for row in m1]
+    assert (0 * a).nnz == 0
+
+    dense = Matrix.from_lists(m2)
+    assert (a + dense).to_lists() == expected
+    assert (dense + a).to_lists() == expected
+    assert (a - dense) == -(dense - a)
+
+    with pytest.raises(ValueError):
+        a + CSRMatrix.from_lists([[1]])
+
+
+def test_multiplication(backend):
+    m1, m2 = random_sparse(9, 13, 0.2, 4), random_sparse(13, 5, 0.3, 5)
+    expected = matrix_multiply(m1, m2, "blocked")
+    a, b = CSRMatrix.from_lists(m1), CSRMatrix.from_lists(m2)
+    assert (a @ b).to_lists() == expected
+    assert (a @ Matrix.from_lists(m2)).to_lists() == expected
+    assert (Matrix.from_lists(m1) @ b).to_lists() == expected
+    assert (a @ Matrix.from_lists(m2).T.T).to_lists() == expected
+
+    with pytest.raises(ValueError):
+        a @ a
+
+
+def test_memory_scales_with_nonzeros():
+    m = random_sparse(200, 200, 0.01, 6)
+    csr = CSRMatrix.from_lists(m)
+    assert csr.nbytes == 201 * 8 + csr.nnz * 16
+    assert csr.nbytes * 10 < Matrix.from_lists(m).nbytes
@@ -1,11 +1,16 @@
+import asyncio
+import itertools
+import queue
+import threading
 import time
 import pytest
 import sys
 import os
+from functools import partial
 from typing import Tuple
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from project.thread_pool import ThreadPool
+from project.thread_pool import ProcessPool, ThreadPool, _AsyncBridge
 
 
 def test_enqueue_and_execution():
@@ -65,3 +70,700 @@ def test_thread_pool_works_with_timeout():
         pool.enqueue(example_task)
 
     pool.dispose()
+
+
+def test_submit_returns_result():
+    pool = ThreadPool(num_threads=2)
+
+    futures = [pool.submit(pow, i, 2) for i in range(10)]
+
+    assert [future.result(timeout=5) for future in futures] == [
+        i * i for i in range(10)
+    ]
+    pool.dispose()
+
+
+def test_submit_captures_exception():
+    pool = ThreadPool(num_threads=1)
+
+    def failing_task():
+        raise ValueError("boom")
+
+    future = pool.submit(failing_task)
+
+    assert isinstance(future.exception(timeout=5), ValueError)
+    with pytest.raises(ValueError):
+        future.result()
+
+    # The worker must survive the exception and keep processing tasks
+    assert pool.submit(lambda: 42).result(timeout=5) == 42
+    pool.dispose()
+
+
+def test_submit_done_callback():
+    pool = ThreadPool(num_threads=2)
+    results = []
+    done = threading.Event()
+
+    def callback(future):
+        results.append(future.result())
+        done.set()
+
+    pool.submit(lambda x, y=0: x + y, 1, y=2).add_done_callback(callback)
+
+    assert done.wait(timeout=5)
+    assert results == [3]
+    pool.dispose()
+
+
+def test_submit_after_dispose_raises():
+    pool = ThreadPool(num_threads=1)
+    pool.dispose()
+
+    with pytest.raises(RuntimeError):
+        pool.submit(lambda: None)
+
+
+def test_work_stealing_runs_nested_tasks():
+    pool = ThreadPool(num_threads=4, work_stealing=True)
+    executed = []
+    depth_limit = 8
+
+    def task(depth):
+        executed.append(depth)
+        if depth < depth_limit:
+            pool.enqueue(lambda: task(depth + 1))
+            pool.enqueue(lambda: task(depth + 1))
+
+    pool.enqueue(lambda: task(0))
+    time.sleep(1)
+    pool.dispose()
+
+    assert len(executed) == 2 ** (depth_limit + 1) - 1
+
+
+def test_work_stealing_idle_workers_steal():
+    pool = ThreadPool(num_threads=4, work_stealing=True)
+    thread_names = set()
+    release = threading.Event()
+
+    def child():
+        thread_names.add(threading.current_thread().name)
+        release.wait(timeout=5)
+
+    def parent():
+        # Children land in the local deque of this worker and must be stolen
+        return [pool.submit(child) for _ in range(3)]
+
+    children = pool.submit(parent).result(timeout=5)
+    time.sleep(0.5)
+    release.set()
+    for future in children:
+        future.result(timeout=5)
+    pool.dispose()
+
+    assert len(thread_names) > 1
+
+
+def test_work_stealing_keeps_shared_tasks_in_order():
+    pool = ThreadPool(num_threads=1, work_stealing=True)
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def blocker():
+        started.set()
+        release.wait(timeout=5)
+
+    pool.enqueue(blocker)
+    started.wait(timeout=5)
+
+    def first():
+        order.append(0)
+        # Must not wait behind the less urgent task below
+        pool.enqueue(lambda: order.append("urgent"), priority=-5)
+
+    pool.enqueue(first)
+    for i in range(1, 8):
+        pool.enqueue(lambda i=i: order.append(i))
+    done = threading.Event()
+    pool.enqueue(lambda: (order.append("low"), done.set()), priority=5)
+    release.set()
+    done.wait(timeout=5)
+    pool.dispose()
+
+    assert order == list(range(8)) + ["urgent", "low"]
+
+
+def test_work_stealing_dispose_drains_local_queues():
+    pool = ThreadPool(num_threads=2, work_stealing=True)
+    results = []
+
+    def parent():
+        for i in range(100):
+            pool.enqueue(lambda i=i: results.append(i))
+
+    pool.submit(parent).result(timeout=5)
+    pool.dispose()
+
+    assert sorted(results) == list(range(100))
+
+
+def test_enqueue_many_runs_all_tasks():
+    pool = ThreadPool(num_threads=3)
+    results = []
+
+    pool.enqueue_many((lambda i=i: results.append(i) for i in range(1000)), 64)
+    pool.dispose()
+
+    assert sorted(results) == list(range(1000))
+
+
+def test_map_ordered():
+    pool = ThreadPool(num_threads=4)
+
+    assert list(pool.map(lambda x: x * 2, range(100), chunksize=7)) == [
+        x * 2 for x in range(100)
+    ]
+    pool.dispose()
+
+
+def test_map_as_completed():
+    pool = ThreadPool(num_threads=4)
+
+    def slow_first(x):
+        if x == 0:
+            time.sleep(0.3)
+        return x
+
+    results = list(pool.map(slow_first, range(20), chunksize=1, ordered=False))
+
+    assert sorted(results) == list(range(20))
+    assert results[-1] == 0
+    pool.dispose()
+
+
+def test_map_streams_generator_lazily():
+    pool = ThreadPool(num_threads=2)
+    consumed = []
+
+    def source():
+        for i in range(10_000):
+            consumed.append(i)
+            yield i
+
+    results = pool.map(lambda x: x, source(), chunksize=10)
+    assert next(results) == 0
+
+    # Only a bounded window of chunks may have been read from the generator
+    assert len(consumed) < 1000
+    results.close()
+    pool.dispose()
+
+
+def test_map_propagates_exceptions():
+    pool = ThreadPool(num_threads=2)
+
+    def fail_on_five(x):
+        if x == 5:
+            raise ValueError("five")
+        return x
+
+    with pytest.raises(ValueError):
+        list(pool.map(fail_on_five, range(10), chunksize=2))
+    with pytest.raises(ValueError):
+        list(pool.map(abs, [], chunksize=0))
+    pool.dispose()
+
+
+def test_priority_order():
+    pool = ThreadPool(num_threads=1)
+    order = []
+    release = threading.Event()
+
+    # Occupy the single worker while the queue fills up
+    pool.enqueue(lambda: release.wait(timeout=5))
+    time.sleep(0.1)
+    for i in range(3):
+        pool.enqueue(lambda i=i: order.append(("bulk", i)), priority=10)
+    pool.enqueue(lambda: order.append(("urgent", 0)), priority=-1)
+    pool.enqueue(lambda: order.append(("normal", 0)))
+    release.set()
+    pool.dispose()
+
+    assert order == [
+        ("urgent", 0),
+        ("normal", 0),
+        ("bulk", 0),
+        ("bulk", 1),
+        ("bulk", 2),
+    ]
+
+
+def test_deadline_expired_tasks_are_dropped():
+    pool = ThreadPool(num_threads=1)
+    executed = []
+    release = threading.Event()
+
+    pool.enqueue(lambda: release.wait(timeout=5))
+    time.sleep(0.1)
+    expired = pool.schedule(
+        lambda: executed.append("late"), deadline=time.monotonic() + 0.1
+    )
+    in_time = pool.schedule(
+        lambda: executed.append("in time"), deadline=time.monotonic() + 60
+    )
+    time.sleep(0.3)
+    release.set()
+
+    assert in_time.result(timeout=5) is None
+    with pytest.raises(TimeoutError):
+        expired.result(timeout=5)
+    pool.dispose()
+
+    assert executed == ["in time"]
+    assert pool.tasks_expired == 1
+    assert pool.tasks_run == 2
+
+
+def test_elastic_pool_grows_under_burst_and_shrinks_when_idle():
+    pool = ThreadPool(num_threads=1, max_threads=4, idle_timeout=0.2)
+
+    futures = [pool.submit(time.sleep, 0.05) for _ in range(40)]
+    time.sleep(0.1)
+    assert pool.worker_count == 4
+
+    for future in futures:
+        future.result(timeout=5)
+    # Extra workers retire after being idle for idle_timeout
+    deadline = time.monotonic() + 5
+    while pool.worker_count > 1 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool.worker_count == 1
+    assert len(pool.threads) == 1
+    assert pool.tasks_run == 40
+    pool.dispose()
+
+
+def test_elastic_pool_grows_under_batches():
+    pool = ThreadPool(num_threads=1, max_threads=8)
+
+    pool.enqueue_many(partial(time.sleep, 0.01) for _ in range(200))
+    assert pool.worker_count == 8
+    pool.dispose()
+
+    pool = ThreadPool(num_threads=1, max_threads=4)
+    results = pool.map(lambda x: time.sleep(0.01) or x, range(40))
+    assert next(results) == 0
+    assert pool.worker_count == 4
+    assert list(results) == list(range(1, 40))
+    pool.dispose()
+
+
+def test_elastic_pool_stays_small_under_light_load():
+    pool = ThreadPool(num_threads=1, max_threads=4, idle_timeout=0.2)
+
+    for _ in range(10):
+        pool.submit(lambda: None).result(timeout=5)
+        time.sleep(0.01)
+
+    assert pool.worker_count == 1
+    pool.dispose()
+
+
+def test_elastic_pool_respects_spawn_threshold():
+    pool = ThreadPool(num_threads=1, max_threads=8, spawn_threshold=5)
+    release = threading.Event()
+
+    pool.enqueue(lambda: release.wait(timeout=5))
+    time.sleep(0.1)
+    for _ in range(5):
+        pool.enqueue(lambda: release.wait(timeout=5))
+    assert pool.worker_count == 1
+
+    pool.enqueue(lambda: release.wait(timeout=5))
+    assert pool.worker_count == 2
+    release.set()
+    pool.dispose()
+
+    with pytest.raises(ValueError):
+        ThreadPool(num_threads=2, max_threads=1)
+
+
+def _blocked_pool(**kwargs):
+    """Returns a single-thread pool whose worker waits for the returned event."""
+    pool = ThreadPool(num_threads=1, **kwargs)
+    release = threading.Event()
+    pool.enqueue(lambda: release.wait(timeout=5))
+    time.sleep(0.1)
+    return pool, release
+
+
+def test_bounded_queue_blocks_producer():
+    pool, release = _blocked_pool(max_queue_size=2)
+    pool.enqueue(lambda: None)
+    pool.enqueue(lambda: None)
+
+    unblocked = threading.Event()
+
+    def producer():
+        pool.enqueue(lambda: None)
+        unblocked.set()
+
+    threading.Thread(target=producer).start()
+    assert not unblocked.wait(timeout=0.3)
+
+    release.set()
+    assert unblocked.wait(timeout=5)
+    pool.dispose()
+    assert pool.tasks_run == 4
+
+
+def test_bounded_queue_block_timeout():
+    pool, release = _blocked_pool(max_queue_size=1, queue_timeout=0.1)
+    pool.enqueue(lambda: None)
+
+    with pytest.raises(queue.Full):
+        pool.enqueue(lambda: None)
+    release.set()
+    pool.dispose()
+
+
+def test_bounded_queue_raise_policy():
+    pool, release = _blocked_pool(max_queue_size=1, reject_policy="raise")
+    pool.enqueue(lambda: None)
+
+    with pytest.raises(queue.Full):
+        pool.submit(lambda: None)
+    release.set()
+    pool.dispose()
+
+    with pytest.raises(ValueError):
+        ThreadPool(num_threads=1, reject_policy="unknown")
+
+
+def test_bounded_queue_drop_oldest_policy():
+    pool, release = _blocked_pool(max_queue_size=2, reject_policy="drop_oldest")
+    results = []
+
+    futures = [pool.submit(results.append, i) for i in range(5)]
+    release.set()
+    pool.dispose()
+
+    assert results == [3, 4]
+    assert all(future.cancelled() for future in futures[:3])
+    assert pool.tasks_dropped == 3
+
+
+def test_bounded_queue_caller_runs_policy():
+    pool, release = _blocked_pool(max_queue_size=1, reject_policy="caller_runs")
+    callers = []
+
+    def task():
+        callers.append(threading.current_thread())
+
+    pool.enqueue(task)
+    pool.enqueue(task)
+    pool.enqueue_many([task, task])
+    assert callers == [threading.current_thread()] * 3
+
+    release.set()
+    pool.dispose()
+    assert len(callers) == 4
+    assert pool.tasks_run == 5
+
+
+def test_exceptions_do_not_kill_workers():
+    pool = ThreadPool(num_threads=1)
+
+    def failing_task():
+        raise RuntimeError("boom")
+
+    for _ in range(3):
+        pool.enqueue(failing_task)
+    assert pool.submit(lambda: "alive").result(timeout=5) == "alive"
+    pool.dispose()
+
+    assert pool.metrics().exceptions == 3
+    assert pool.tasks_run == 4
+
+
+def test_metrics_snapshot():
+    pool = ThreadPool(num_threads=2, collect_metrics=True)
+    release = threading.Event()
+
+    for _ in range(4):
+        pool.enqueue(lambda: release.wait(timeout=5))
+    time.sleep(0.2)
+
+    metrics = pool.metrics()
+    assert metrics.workers == 2
+    assert metrics.busy_workers == 2
+    assert metrics.queue_depth == 2
+
+    release.set()
+    pool.dispose()
+
+    metrics = pool.metrics()
+    assert metrics.busy_workers == 0
+    assert metrics.queue_depth == 0
+    assert metrics.tasks_run == 4
+    assert metrics.run_time.count == 4
+    assert metrics.wait_time.count == 4
+    # The last two tasks waited in the queue while the first two ran
+    assert metrics.wait_time.percentile(100) >= 0.1
+    assert metrics.run_time.mean > 0
+
+
+def test_before_and_after_hooks():
+    pool = ThreadPool(num_threads=1)
+    events = []
+
+    def task():
+        events.append("task")
+
+    def failing_task():
+        raise ValueError("boom")
+
+    pool.add_hooks(
+        before=lambda fn: events.append(("before", fn)),
+        after=lambda fn, error: events.append(("after", fn, type(error))),
+    )
+    pool.enqueue(task)
+    pool.enqueue(failing_task)
+    pool.dispose()
+
+    assert events == [
+        ("before", task),
+        "task",
+        ("after", task, type(None)),
+        ("before", failing_task),
+        ("after", failing_task, ValueError),
+    ]
+
+
+def _square(x):
+    return x * x
+
+
+def _fail(message):
+    raise ValueError(message)
+
+
+def _append_to_file(path, line):
+    with open(path, "a") as file:
+        file.write(f"{line}\n")
+
+
+def _sum_shared(buffer):
+    return sum(buffer.buf)
+
+
+def _fill_shared(buffer, value):
+    buffer.buf[:] = bytes([value]) * buffer.size
+
+
+def test_process_pool_submit_and_map():
+    pool = ProcessPool(num_processes=2)
+
+    assert pool.submit(_square, 7).result(timeout=10) == 49
+    assert list(pool.map(_square, range(50), chunksize=8)) == [x * x for x in range(50)]
+    assert sorted(pool.map(_square, range(20), ordered=False)) == [
+        x * x for x in range(20)
+    ]
+    pool.dispose()
+
+    assert all(not process.is_alive() for process in pool.processes)
+
+
+def test_process_pool_exceptions():
+    pool = ProcessPool(num_processes=1)
+
+    with pytest.raises(ValueError, match="boom"):
+        pool.submit(_fail, "boom").result(timeout=10)
+    # Unpicklable tasks are rejected in the calling thread
+    with pytest.raises(Exception):
+        pool.submit(lambda: None)
+    pool.dispose()
+
+    with pytest.raises(RuntimeError):
+        pool.submit(_square, 1)
+
+
+def test_process_pool_enqueue_completes_on_dispose(tmp_path):
+    path = tmp_path / "lines.txt"
+    pool = ProcessPool(num_processes=2)
+
+    pool.enqueue(partial(_append_to_file, path, -1))
+    pool.enqueue_many((partial(_append_to_file, path, i) for i in range(20)), 4)
+    pool.dispose()
+
+    lines = sorted(int(line) for line in path.read_text().split())
+    assert lines == [-1] + list(range(20))
+
+
+def test_process_pool_shared_memory():
+    pool = ProcessPool(num_processes=2)
+
+    data = pool.share(bytes(range(256)) * 4)
+    assert pool.submit(_sum_shared, data).result(timeout=10) == sum(range(256)) * 4
+
+    # Workers write into the same memory the parent reads
+    out = pool.allocate(16)
+    pool.submit(_fill_shared, out, 7).result(timeout=10)
+    assert bytes(out.buf) == bytes([7]) * 16
+    pool.dispose()
+
+
+def test_async_bridge_requires_submit():
+    class Incomplete(_AsyncBridge):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_async_run():
+    pool = ThreadPool(num_threads=2)
+
+    async def main():
+        results = await asyncio.gather(*(pool.run(pow, i, 2) for i in range(10)))
+        with pytest.raises(ValueError):
+            await pool.run(_fail, "boom")
+        return results
+
+    assert asyncio.run(main()) == [i * i for i in range(10)]
+    pool.dispose()
+
+
+def test_async_run_does_not_block_event_loop():
+    pool = ThreadPool(num_threads=1)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(pool.run(time.sleep, 0.2), ticker())
+
+    asyncio.run(main())
+    pool.dispose()
+
+    assert len(ticks) == 5
+    assert ticks[-1] - ticks[0] < 0.15
+
+
+@pytest.mark.parametrize("reject_policy", ["block", "caller_runs"])
+def test_async_run_with_full_queue_does_not_block_event_loop(reject_policy):
+    pool, release = _blocked_pool(max_queue_size=1, reject_policy=reject_policy)
+    pool.enqueue(lambda: None)
+    ticks = []
+    threads = []
+
+    def task():
+        threads.append(threading.current_thread())
+        time.sleep(0.2)
+
+    async def ticker():
+        for _ in range(10):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        threads.append(threading.current_thread())
+        ticking = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0)
+        await asyncio.gather(pool.run(task), ticking)
+
+    timer = threading.Timer(0.2, release.set)
+    timer.start()
+    asyncio.run(main())
+    timer.join()
+    pool.dispose()
+
+    assert len(ticks) == 10
+    assert ticks[-1] - ticks[0] < 0.18
+    assert threads[1] is not threads[0]
+
+
+def test_async_completions():
+    pool = ThreadPool(num_threads=3)
+
+    async def main():
+        futures = [
+            pool.submit(lambda d=delay: time.sleep(d) or d) for delay in (0.3, 0.1, 0.2)
+        ]
+        return [future.result() async for future in pool.completions(futures)]
+
+    assert asyncio.run(main()) == [0.1, 0.2, 0.3]
+    pool.dispose()
+
+
+def test_dispose_cancel_pending_with_million_tasks():
+    pool = ThreadPool(num_threads=2)
+    release = threading.Event()
+    for _ in range(2):
+        pool.enqueue(lambda: release.wait(timeout=10))
+    pool.enqueue_many(itertools.repeat(lambda: None, 1_000_000))
+
+    # The running tasks finish shortly after the shutdown begins
+    threading.Timer(0.1, release.set).start()
+    start = time.perf_counter()
+    assert pool.dispose(cancel_pending=True)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 1.0, f"Shutdown took {elapsed:.2f}s"
+    assert pool.tasks_run == 2
+    assert pool.metrics().queue_depth == 0
+
+
+def test_dispose_cancels_pending_futures():
+    pool = ThreadPool(num_threads=1)
+    running = pool.submit(time.sleep, 0.2)
+    time.sleep(0.05)
+    pending = [pool.submit(lambda: None) for _ in range(10)]
+
+    assert pool.dispose(cancel_pending=True)
+    assert running.done() and not running.cancelled()
+    assert all(future.cancelled() for future in pending)
+
+
+def test_dispose_without_wait_and_with_timeout():
+    pool = ThreadPool(num_threads=1)
+    release = threading.Event()
+    pool.enqueue(lambda: release.wait(timeout=5))
+    time.sleep(0.05)
+
+    start = time.perf_counter()
+    assert not pool.dispose(wait=False)
+    assert not pool.dispose(timeout=0.1)
+    assert time.perf_counter() - start < 1.0
+
+    release.set()
+    assert pool.dispose()
+
+
+def test_context_manager():
+    results = []
+    with ThreadPool(num_threads=2) as pool:
+        for i in range(10):
+            pool.enqueue(lambda i=i: results.append(i))
+
+    assert sorted(results) == list(range(10))
+    assert all(not thread.is_alive() for thread in pool.threads)
+
+
+def test_process_pool_dispose_cancel_pending():
+    with ProcessPool(num_processes=1) as pool:
+        running = pool.submit(time.sleep, 0.3)
+        pending = [pool.submit(_square, i) for i in range(100)]
+        time.sleep(0.1)
+        assert pool.dispose(cancel_pending=True, timeout=10)
+
+    assert all(future.cancelled() for future in pending)
+    # The task that had started completes, like in ThreadPool
+    assert not running.cancelled()
+    assert running.result(timeout=5) is None
+    assert all(not process.is_alive() for process in pool.processes)
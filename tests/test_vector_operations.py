@@ -5,7 +5,18 @@ import sys
 import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from project.vector_operations import scalar_multiply, vector_length, angle_vectors
+from project import vector_operations
+from project.vector_operations import (
+    angle_vectors,
+    batch_angle_vectors,
+    batch_scalar_multiply,
+    batch_vector_length,
+    scalar_multiply,
+    vector_length,
+)
+
+
+pytestmark = pytest.mark.numpy_modules(vector_operations)
 
 
 def test_scalar_multiply():
@@ -71,3 +82,88 @@ def test_angle_vectors():
         pass
     else:
         assert False, "Expected ValueError for zero-length vector"
+
+    # Mismatched dimensions
+    try:
+        angle_vectors([1, 2], [1, 2, 3])
+    except ValueError:
+        pass
+    else:
+        assert False, "Expected ValueError for mismatched sizes"
+
+
+def test_batch_scalar_multiply(backend, random_lists):
+    vectors, others = random_lists(20, 5, 1), random_lists(20, 5, 2)
+    query = others[0]
+
+    assert batch_scalar_multiply(vectors, query) == pytest.approx(
+        [scalar_multiply(v, query) for v in vectors]
+    )
+    assert batch_scalar_multiply(vectors, others) == pytest.approx(
+        [scalar_multiply(v, w) for v, w in zip(vectors, others)]
+    )
+    assert batch_scalar_multiply([[1, 2, 3], [0, 1, 0]], [4, 5, 6]) == [32, 5]
+    assert batch_scalar_multiply([], [1, 2]) == []
+
+    with pytest.raises(ValueError):
+        batch_scalar_multiply([[1, 2], [3, 4]], [1, 2, 3])
+    with pytest.raises(ValueError):
+        batch_scalar_multiply([[1, 2], [3, 4]], [[1, 2]])
+    with pytest.raises(ValueError):
+        batch_scalar_multiply([[1, 2], [3, 4, 5]], [[1, 2], [3, 4]])
+
+
+def test_batch_vector_length(backend, random_lists):
+    vectors = random_lists(20, 5, 1)
+
+    assert batch_vector_length(vectors) == pytest.approx(
+        [vector_length(v) for v in vectors]
+    )
+    assert batch_vector_length([[3, 4], [0, 0], [-3, -4]]) == [5, 0, 5]
+    assert batch_vector_length([]) == []
+
+    with pytest.raises(ValueError):
+        batch_vector_length([[]])
+    with pytest.raises(ValueError):
+        batch_vector_length([[1, 2], [1]])
+
+
+def test_batch_angle_vectors(backend, random_lists):
+    vectors, others = random_lists(20, 5, 1), random_lists(20, 5, 2)
+    query = others[0]
+
+    assert batch_angle_vectors(vectors, query) == pytest.approx(
+        [angle_vectors(v, query) for v in vectors]
+    )
+    assert batch_angle_vectors(vectors, others) == pytest.approx(
+        [angle_vectors(v, w) for v, w in zip(vectors, others)]
+    )
+    assert batch_angle_vectors([[1, 0], [-1, 0], [2, 2]], [1, 0]) == pytest.approx(
+        [0, math.pi, math.pi / 4]
+    )
+    assert batch_angle_vectors([], [1, 0]) == []
+
+    with pytest.raises(ValueError):
+        batch_angle_vectors([[1, 0], [0, 0]], [1, 1])
+    with pytest.raises(ValueError):
+        batch_angle_vectors([[1, 0]], [0, 0])
+    with pytest.raises(ValueError):
+        batch_angle_vectors([[]], [])
+    with pytest.raises(ValueError):
+        batch_angle_vectors([[1, 0], [0, 1]], [[1, 0]])
+
+
+def test_batch_numpy_arrays(random_lists):
+    numpy = pytest.importorskip("numpy")
+    vectors = numpy.array(random_lists(20, 5, 1))
+    query = vectors[3]
+
+    assert batch_scalar_multiply(vectors, query) == pytest.approx(
+        [scalar_multiply(list(v), list(query)) for v in vectors]
+    )
+    assert batch_vector_length(vectors) == pytest.approx(
+        [vector_length(list(v)) for v in vectors]
+    )
+    assert batch_angle_vectors(vectors, vectors[::-1]) == pytest.approx(
+        [angle_vectors(list(v), list(w)) for v, w in zip(vectors, vectors[::-1])]
+    )